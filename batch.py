@@ -0,0 +1,203 @@
+# This module evaluates strategies in bulk, from the command line. Strategies
+# are read from a JSON file (a list of strategies) or a JSONL file (one strategy
+# per line). A strategy is either in the format lines.JSONtoLines() accepts, or a
+# list of the Instrument Panel's {"inst": ..., "inst_config": ...} configs (see
+# engine.configsToLines()). Each is analysed at expiry as engine.analyse() does,
+# in a process pool, and the results are written as JSONL, one line per strategy
+# in input order (with the "line" of the input it came from), as soon as they
+# are ready. An --output file ending in .npz is written in storage.py's binary
+# format instead (see storage.saveBatchResults()), which loads memory-mapped.
+#
+# JSONL files are streamed: records are parsed a line at a time and grouped into
+# fixed size chunks, and only a few chunks are in flight at once, so memory stays
+# flat however large the file is. The strategies of a chunk are analysed
+# together, with the same few array operations (see engine.analyseMany()).
+# Malformed records (a leg which is incomplete or invalid, or no legs at all)
+# are reported in the results (as {"index": ..., "line": ..., "error": ...})
+# rather than stopping the run.
+#
+# e.g.
+#	python batch.py strategies.jsonl --prices 45 50 55 --output results.jsonl --processes 8
+#	python batch.py strategies.jsonl --prices 45 50 55 --output results.npz
+import argparse
+import json
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from engine import analyseMany, configToLine
+from lines import JSONtoLines
+from storage import saveBatchResults
+
+# the number of strategies sent to a worker process at once
+CHUNK_SIZE = 256
+
+# the number of chunks queued per worker process, this bounds the memory used
+CHUNKS_IN_FLIGHT = 2
+
+
+def readStrategies(path):
+	"""
+	Yield (line number, record) for every strategy in the JSON or JSONL file at 
+	$path. A JSONL line which isn't valid JSON yields it's decoding error in 
+	place of the record. JSON files are decoded whole, so very large dumps 
+	should be JSONL.
+	"""
+	with open(path) as file:
+		if path.endswith(".jsonl"):
+			for number, line in enumerate(file, 1):
+				if not line.strip():
+					continue
+				try:
+					yield number, json.loads(line)
+				except json.JSONDecodeError as error:
+					yield number, error
+		else:
+			for number, record in enumerate(json.load(file), 1):
+				yield number, record
+
+
+def chunked(iterable, size):
+	""" Yield lists of $size consecutive items from $iterable (the last may be shorter) """
+	iterator = iter(iterable)
+	while True:
+		chunk = list(islice(iterator, size))
+		if not chunk:
+			return
+		yield chunk
+
+
+def recordToLines(record, calculatable_position=None):
+	"""
+	Return the Lines of the strategy $record, in either format (see the top of
+	this module). Empty Instrument Panel rows are skipped, any other leg the
+	Instrument Panel wouldn't graph raises a ValueError naming it, as does a
+	strategy without legs.
+	"""
+	legs = list(record.values()) if isinstance(record, dict) else record
+	if legs and isinstance(legs[0], dict) and "inst" in legs[0]:
+		lines = []
+		for i, leg in enumerate(legs):
+			if leg.get("inst") is None:
+				continue
+			line = configToLine(leg, calculatable_position)
+			if line is None:
+				raise ValueError(f"leg {i} is incomplete or invalid")
+			lines.append(line)
+	else:
+		lines = JSONtoLines(record, calculatable_position)
+
+	if not lines:
+		raise ValueError("the strategy has no legs")
+	return lines
+
+
+def evaluateChunk(chunk, prices=None):
+	"""
+	Evaluate a list of (index, line number, record), returning a list of their
+	results: the breakevens, max profit and max loss of each strategy (and
+	with $prices, it's profit at each), with unbounded profits and losses
+	written as null. The chunk's strategies are analysed together (see
+	engine.analyseMany()). Records which can't be evaluated get an error
+	result instead.
+	"""
+	results = [None] * len(chunk)
+	strategies, evaluated = [], []
+	for i, (index, number, record) in enumerate(chunk):
+		try:
+			if isinstance(record, Exception):
+				raise record
+			strategies.append(recordToLines(record))
+		except (ValueError, KeyError, TypeError, AttributeError, IndexError) as error:
+			results[i] = {"index": index, "line": number, "error": f"{type(error).__name__}: {error}"}
+			continue
+		evaluated.append(i)
+
+	for i, analysis in zip(evaluated, analyseMany(strategies, prices) if strategies else []):
+		index, number, record = chunk[i]
+		result = {
+			"index": index,
+			"line": number,
+			"breakevens": analysis["breakevens"].tolist(),
+			"max_profit": _finite(analysis["max_profit"]),
+			"max_loss": _finite(analysis["max_loss"]),
+		}
+		if prices is not None:
+			result["profit_at"] = dict(zip(map(str, prices), analysis["profit_at"].tolist()))
+		results[i] = result
+
+	return results
+
+
+def evaluateStream(path, prices=None, processes=None, chunk_size=CHUNK_SIZE):
+	"""
+	Yield the result of every strategy in the file at $path, in order. Chunks of
+	$chunk_size strategies are evaluated in $processes worker processes (every
+	core by default, or in this process if $processes is 1).
+	"""
+	records = ((index, number, record) for index, (number, record) in enumerate(readStrategies(path)))
+	chunks = chunked(records, chunk_size)
+
+	if processes == 1:
+		for chunk in chunks:
+			yield from evaluateChunk(chunk, prices)
+		return
+
+	with ProcessPoolExecutor(max_workers=processes) as executor:
+		# keep a bounded queue of chunks in flight, and yield the oldest as it completes
+		in_flight = deque()
+		limit = (processes or os.cpu_count() or 1) * CHUNKS_IN_FLIGHT
+
+		for chunk in chunks:
+			in_flight.append(executor.submit(evaluateChunk, chunk, prices))
+			if len(in_flight) >= limit:
+				yield from in_flight.popleft().result()
+
+		while in_flight:
+			yield from in_flight.popleft().result()
+
+
+def evaluateFile(path, output, prices=None, processes=None):
+	"""
+	Evaluate every strategy in the file at $path, writing the results to the file
+	$output as they complete. Return (strategies evaluated, malformed strategies).
+	"""
+	count, errors = 0, 0
+	for result in evaluateStream(path, prices, processes):
+		output.write(json.dumps(result) + "\n")
+		count += 1
+		errors += "error" in result
+
+	return count, errors
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Evaluate strategies from a JSON or JSONL file.")
+	parser.add_argument("path", help="JSON (a list of strategies) or JSONL (a strategy per line) file")
+	parser.add_argument("--prices", type=float, nargs="+", help="prices to evaluate each strategy's profit at")
+	parser.add_argument("--output", help="JSONL (or binary .npz) file to write the results to (default: stdout)")
+	parser.add_argument("--processes", type=int, help="number of worker processes (default: every core)")
+	args = parser.parse_args(argv)
+
+	if args.output and args.output.endswith(".npz"):
+		results = list(evaluateStream(args.path, args.prices, args.processes))
+		saveBatchResults(args.output, results)
+		count, errors = len(results), sum("error" in result for result in results)
+	elif args.output:
+		with open(args.output, "w") as output:
+			count, errors = evaluateFile(args.path, output, args.prices, args.processes)
+	else:
+		count, errors = evaluateFile(args.path, sys.stdout, args.prices, args.processes)
+
+	print(f"evaluated {count} strategies, {errors} malformed", file=sys.stderr)
+
+
+def _finite(value):
+	return value if math.isfinite(value) else None
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,278 @@
+# This module benchmarks Instrumentium's hot paths: the payoff kernels in
+# inst_functions.py, x grid creation (lines._createXInputs) at several price
+# scales, ProfitLine with 2 to 500 legs, and Instrumentium.updateGraph drawing
+# onto an off-screen (Agg) canvas. Every benchmark records it's best and median
+# time per call and the peak memory it allocated, and the results are written
+# as JSON.
+#
+# Results can be saved as a baseline and later runs compared against it, a
+# benchmark slower than the baseline, or with a higher peak memory, by more
+# than the tolerance is reported as a regression (and the exit status is 1).
+# Timings are only comparable on the machine the baseline was saved on, so
+# no baseline is committed: record one on your machine (from the commit you
+# want to compare against) before comparing. A comparison without a baseline
+# fails (exit status 2) rather than passing silently, use --no-compare to
+# only time the benchmarks.
+#
+# e.g.
+#	git checkout main && python benchmark.py --save-baseline && git checkout -
+#	python benchmark.py --output results.json		# compares against benchmark_baseline.json
+#	python benchmark.py --no-compare profit_line
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+
+import inst_functions as inst_fncs
+from lines import Option, Asset, ProfitLine, _createXInputs, updateLargestX, updateSmallestX
+
+BASELINE_PATH = "benchmark_baseline.json"
+
+# a benchmark this much slower than it's baseline (0.25 = 25%), or allocating this much more memory at it's
+# peak, is a regression
+TOLERANCE = 0.25
+
+# peak memory may grow by this many bytes without being a regression, as small allocations vary between runs
+MEMORY_SLACK = 64 * 1024
+
+# the time each benchmark is timed for, in each of REPEATS repeats
+TARGET_SECONDS = 0.1
+REPEATS = 5
+
+
+def timeCall(function, setup=None, repeats=REPEATS, target=TARGET_SECONDS):
+	"""
+	Return {"best", "median", "calls", "peak_bytes"} for function(): the best
+	and median seconds per call over $repeats repeats, each calling it enough
+	times to take about $target seconds. $setup (if given) is called before
+	every call, outside of the timing.
+	"""
+	def run(number):
+		elapsed = 0
+		for i in range(number):
+			if setup is not None:
+				setup()
+			start = time.perf_counter()
+			function()
+			elapsed += time.perf_counter() - start
+		return elapsed
+
+	# calibrate the number of calls per repeat
+	number = 1
+	while run(number) < target / 10 and number < 10 ** 6:
+		number *= 10
+	number = max(int(number * target / max(run(number), 1e-9)), 1)
+
+	times = [run(number) / number for i in range(repeats)]
+
+	# the peak memory allocated during a single call
+	if setup is not None:
+		setup()
+	tracemalloc.start()
+	function()
+	peak_bytes = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	return {"best": min(times), "median": statistics.median(times), "calls": number, "peak_bytes": peak_bytes}
+
+
+def randomLegs(legs, seed=0):
+	""" Return $legs random Options and Assets, the same ones for the same $seed """
+	rng = np.random.default_rng(seed)
+	lines = []
+	for i in range(legs):
+		position = int(rng.integers(1, 3))
+		if rng.random() < 0.8:
+			strike = int(rng.integers(20, 120))
+			lines.append(Option(int(rng.integers(1, 3)), position, round(float(rng.uniform(0.5, strike * 0.2)), 2),
+				strike, None))
+		else:
+			lines.append(Asset(int(rng.integers(20, 120)), position, None))
+	return lines
+
+
+def benchKernels():
+	results = {}
+	for points in (1000, 100000):
+		x = np.linspace(0, 200, points)
+		for name in ("longCallArray", "shortPutArray"):
+			kernel = getattr(inst_fncs, name)
+			results[f"kernels/{name}/{points}"] = timeCall(lambda: kernel(x, 5, 100))
+		results[f"kernels/longStockArray/{points}"] = timeCall(lambda: inst_fncs.longStockArray(x, 100))
+	return results
+
+
+def benchXInputs():
+	results = {}
+	for scale in (10, 100, 1000, 10000):
+		begin, end = int(scale * 0.6), int(scale * 1.3)
+		breakpoints = [scale * 0.9, scale, scale * 1.1]
+		for mode in ("breakpoints", "dense"):
+			results[f"x_inputs/{mode}/{scale}"] = timeCall(lambda: _createXInputs(begin, end, breakpoints, mode))
+	return results
+
+
+def benchProfitLine():
+	results = {}
+	for legs in (2, 10, 50, 100, 500):
+		lines = randomLegs(legs)
+		max_x = updateLargestX(lines)
+		min_x = updateSmallestX(lines, max_x)
+		results[f"profit_line/{legs}"] = timeCall(lambda: ProfitLine(lines, min_x, max_x, 50))
+	return results
+
+
+def headlessUI():
+	"""
+	Return an Instrumentium holding only the state updateGraph() uses, drawing
+	onto an Agg canvas, so the graph pipeline runs without a window or a display
+	"""
+	from instrumentium import Instrumentium
+	from render import GraphRenderer
+
+	class Task():
+		def run(self, *args, **kwargs):
+			pass
+		def cancel(self):
+			pass
+
+	# Instrumentium.initState() defines everything updateGraph() reads but the widgets, which are stubbed here
+	ui = Instrumentium.__new__(Instrumentium)
+	ui.initState()
+	ui.surfaceTask = Task()
+	ui.simulationTask = Task()
+	ui.enableOverallPosition = lambda: None
+	ui.disableOverallPosition = lambda: None
+
+	ui.fig = Figure(figsize=ui.FIGURE_SIZE)
+	ui.ax = ui.fig.add_subplot(111)
+	ui.graphCanvas = FigureCanvasAgg(ui.fig)
+	ui.renderer = GraphRenderer(ui.ax, ui.MONEY_GREEN_RGB, canvas=ui.graphCanvas, blit=ui.BLIT, value_color=ui.AQUA)
+	return ui
+
+
+def benchUpdateGraph():
+	results = {}
+	for legs in (2, 5, 50):
+		ui = headlessUI()
+		rng = np.random.default_rng(legs)
+		for i in range(legs):
+			ui.lines.append({"inst": "option", "inst_config": {"option_type": ("call", "put")[i % 2],
+				"position": ("long", "short")[i % 3 == 0], "price": int(rng.integers(1, 10)),
+				"strike": int(rng.integers(30, 70))}})
+		ui.updateGraph()
+
+		# an edit: one leg's premium moves, as when a price scale is dragged
+		edit = {"price": 1}
+		def update(ui=ui, edit=edit):
+			edit["price"] = edit["price"] % 9 + 1
+			ui.lines[0]["inst_config"]["price"] = edit["price"]
+			ui.updateGraph()
+
+		results[f"update_graph/edit/{legs}"] = timeCall(update)
+		results[f"update_graph/full_draw/{legs}"] = timeCall(ui.updateGraph, setup=ui.renderer.invalidate)
+	return results
+
+
+BENCHMARKS = {
+	"kernels": benchKernels,
+	"x_inputs": benchXInputs,
+	"profit_line": benchProfitLine,
+	"update_graph": benchUpdateGraph,
+}
+
+
+def runBenchmarks(names=None):
+	""" Run the benchmark groups in $names (all of them by default), returning their results """
+	results = {}
+	for name in names or BENCHMARKS:
+		results.update(BENCHMARKS[name]())
+
+	return {
+		"machine": {"python": platform.python_version(), "numpy": np.__version__,
+			"matplotlib": matplotlib.__version__, "platform": platform.platform()},
+		"results": results,
+	}
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+	"""
+	Return a list of (name, metric, baseline value, value, change) of every
+	benchmark whose best time ("best", in seconds) or peak memory
+	("peak_bytes") is more than $tolerance above it's value in $baseline.
+	Peak memory growing by less than MEMORY_SLACK bytes is ignored.
+	"""
+	regressions = []
+	for name, result in results["results"].items():
+		if name not in baseline["results"]:
+			continue
+		for metric in ("best", "peak_bytes"):
+			# baselines saved before peak memory was recorded only have timings
+			before = baseline["results"][name].get(metric)
+			if before is None:
+				continue
+			after = result[metric]
+			if metric == "peak_bytes" and after - before <= MEMORY_SLACK:
+				continue
+			change = after / max(before, 1e-12) - 1
+			if change > tolerance:
+				regressions.append((name, metric, before, after, change))
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark Instrumentium's payoff engine and graph pipeline.")
+	parser.add_argument("groups", nargs="*", help=f"benchmark groups to run: {', '.join(BENCHMARKS)} (default: all)")
+	parser.add_argument("--output", help="JSON file to write the results to")
+	parser.add_argument("--baseline", default=BASELINE_PATH, help=f"baseline JSON file (default: {BASELINE_PATH})")
+	parser.add_argument("--save-baseline", action="store_true", help="save the results as the baseline")
+	parser.add_argument("--no-compare", action="store_true", help="don't compare the results against a baseline")
+	parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="slowdown reported as a regression")
+	args = parser.parse_args(argv)
+	for group in args.groups:
+		if group not in BENCHMARKS:
+			parser.error(f"unknown benchmark group: {group}")
+
+	results = runBenchmarks(args.groups)
+	for name, result in results["results"].items():
+		print(f"{name:40} {result['best'] * 1e6:12.1f} us {result['peak_bytes'] / 1024:10.1f} KiB")
+
+	if args.output:
+		with open(args.output, "w") as file:
+			json.dump(results, file, indent=1)
+
+	if args.save_baseline:
+		with open(args.baseline, "w") as file:
+			json.dump(results, file, indent=1)
+		return 0
+	if args.no_compare:
+		return 0
+
+	try:
+		with open(args.baseline) as file:
+			baseline = json.load(file)
+	except FileNotFoundError:
+		print(f"error: no baseline at {args.baseline} to compare against. Record one on this machine with "
+			"'python benchmark.py --save-baseline', or pass --no-compare", file=sys.stderr)
+		return 2
+
+	regressions = compare(results, baseline, args.tolerance)
+	for name, metric, before, after, change in regressions:
+		if metric == "best":
+			print(f"REGRESSION {name}: {before * 1e6:.1f} us -> {after * 1e6:.1f} us (+{change:.0%})")
+		else:
+			print(f"REGRESSION {name}: {before / 1024:.1f} KiB -> {after / 1024:.1f} KiB peak (+{change:.0%})")
+	return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,110 @@
+# This module memoises per-leg payoff arrays. The same legs are evaluated over
+# and over: a preset is reloaded, a scale is dragged back to a value it was at a
+# moment ago, or every leg is rebuilt when one changes. PAYOFF_CACHE keeps the
+# most recently used arrays, keyed by what determines them (the leg's
+# signature, see strategy.legSignature(), and the grid it was evaluated on), so
+# a repeated state costs a dictionary lookup instead of a recompute.
+#
+# Cached arrays are shared between everyone who asks for them, so they are
+# returned read-only. put() caches a frozen copy, so the caller's array stays
+# writable and later writes to it can't reach the cache.
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+# the default memory budget of a PayoffCache, in bytes
+MAX_BYTES = 64 * 1024 * 1024
+
+
+class PayoffCache():
+	"""
+	A least recently used cache of NumPy arrays, holding at most $max_bytes of
+	array data. Counts it's hits, misses and evictions.
+	"""
+	def __init__(self, max_bytes=MAX_BYTES):
+		self.max_bytes = max_bytes
+		self.nbytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._arrays = OrderedDict()
+
+	def __len__(self):
+		return len(self._arrays)
+
+	def __contains__(self, key):
+		return key in self._arrays
+
+	def get(self, key):
+		""" Return the array cached under $key, or None """
+		array = self._arrays.get(key)
+		if array is None:
+			self.misses += 1
+			return None
+
+		self._arrays.move_to_end(key)
+		self.hits += 1
+		return array
+
+	def put(self, key, array):
+		""" 
+		Cache a read-only copy of $array under $key, evicting the least recently
+		used arrays to stay within budget. Return the copy.
+		"""
+		array = np.array(array, copy=True)
+		array.setflags(write=False)
+
+		if key in self._arrays:
+			self.nbytes -= self._arrays.pop(key).nbytes
+
+		if array.nbytes > self.max_bytes:
+			# it could never fit, don't empty the cache for it
+			return array
+
+		self._arrays[key] = array
+		self.nbytes += array.nbytes
+
+		while self.nbytes > self.max_bytes:
+			_, evicted = self._arrays.popitem(last=False)
+			self.nbytes -= evicted.nbytes
+			self.evictions += 1
+
+		return array
+
+	def getOrCompute(self, key, compute):
+		""" Return the array cached under $key, calling compute() to create it on a miss """
+		array = self.get(key)
+		if array is None:
+			array = self.put(key, compute())
+		return array
+
+	def clear(self):
+		""" Empty the cache, keeping the counters """
+		self._arrays.clear()
+		self.nbytes = 0
+
+	def stats(self):
+		""" Return a dictionary of the cache's counters and size """
+		lookups = self.hits + self.misses
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions,
+			"hit_rate": self.hits / lookups if lookups else 0.0,
+			"arrays": len(self._arrays),
+			"nbytes": self.nbytes,
+		}
+
+
+def gridKey(x):
+	""" 
+	Return a hashable key identifying the grid $x: it's shape and dtype and a
+	digest of it's bytes (unlike hash(), a digest collision is out of reach)
+	"""
+	x = np.ascontiguousarray(x, dtype=float)
+	return (x.shape, x.dtype.str, hashlib.blake2b(x.tobytes(), digest_size=16).digest())
+
+
+# the cache shared by the Lines (see lines.py) and StrategyModels (see strategy.py)
+PAYOFF_CACHE = PayoffCache()
@@ -0,0 +1,299 @@
+# This module stores option chains on disk as typed columns, for workflows
+# which build Option legs from market quotes. CSV snapshots (one contract per
+# row: strike, expiry, type, bid, ask and iv) are ingested into a directory
+# holding one .npy file per column and a small JSON header. Rows are sorted by
+# expiry, then type, then strike, so every (expiry, type) is a contiguous run
+# of increasing strikes, and finding a contract is a few binary searches.
+#
+# Every ingest writes a new generation of column files next to the old ones,
+# then swaps in a header naming it (a single os.replace), and only then
+# removes the old generation. A store is always read through it's header, so
+# an ingest that fails part way leaves the store as it was (apart from stray
+# files of the unfinished generation, which the next ingest writes over). A
+# ChainStore opened before an ingest should be opened again after it.
+#
+# A ChainStore only reads the header when it's opened. Columns are memory-mapped
+# the first time they are used, and lookups only touch the pages their binary
+# searches land on, so a store of hundreds of thousands of contracts opens
+# instantly and only the expiries that are looked at are read into memory.
+#
+# e.g.
+#	ingestChain("spx_chain", "snapshot.csv")
+#	store = ChainStore("spx_chain")
+#	store.quote("2026-12-18", 1, 4500)			# the 4500 call
+#	scanner.scanChain(store.chain("2026-12-18"))
+#
+#	python chainstore.py ingest spx_chain snapshot_1.csv snapshot_2.csv
+#	python chainstore.py info spx_chain
+import argparse
+import csv
+import datetime
+import json
+import os
+from itertools import islice
+
+import numpy as np
+
+from convert import toFloat
+
+FORMAT = "instrumentium-chain"
+VERSION = 1
+
+HEADER_FILE = "header.json"
+
+# the dtype of every column file
+COLUMNS = {
+	"expiry": "datetime64[D]",
+	"type": np.int8,			# 1 = call; 2 = put
+	"strike": np.float64,
+	"bid": np.float64,
+	"ask": np.float64,
+	"iv": np.float64,			# implied volatility, annual as a decimal (NaN when not quoted)
+}
+
+# the CSV columns an ingested snapshot needs, "iv" is optional
+REQUIRED_COLUMNS = ("strike", "expiry", "type", "bid", "ask")
+
+OPTION_TYPE_CODES = {"c": 1, "call": 1, "1": 1, "p": 2, "put": 2, "2": 2}
+
+# the number of CSV rows parsed into arrays at once
+CHUNK_SIZE = 65536
+
+
+def readSnapshot(path, chunk_size=CHUNK_SIZE):
+	"""
+	Return the contracts in the CSV snapshot at $path as a dictionary of column
+	name to array (see COLUMNS). Rows are parsed $chunk_size at a time.
+	"""
+	chunks = {name: [] for name in COLUMNS}
+	with open(path, newline="") as file:
+		reader = csv.DictReader(file)
+		fields = {field.strip().lower(): field for field in reader.fieldnames or ()}
+		missing = [name for name in REQUIRED_COLUMNS if name not in fields]
+		if missing:
+			raise ValueError(f"{path} has no {', '.join(missing)} column")
+
+		while True:
+			rows = list(islice(reader, chunk_size))
+			if not rows:
+				break
+
+			for name in ("strike", "bid", "ask", "iv"):
+				chunks[name].append(np.array([toFloat(row[fields[name]]) if name in fields else np.nan
+					for row in rows]))
+			chunks["expiry"].append(np.array([row[fields["expiry"]].strip() for row in rows], dtype="datetime64[D]"))
+			try:
+				chunks["type"].append(np.array([OPTION_TYPE_CODES[row[fields["type"]].strip().lower()] for row in rows],
+					dtype=np.int8))
+			except KeyError as error:
+				raise ValueError(f"{path} has an unknown option type: {error.args[0]}") from None
+
+	return {name: np.concatenate(parts).astype(COLUMNS[name]) if parts else np.empty(0, dtype=COLUMNS[name])
+		for name, parts in chunks.items()}
+
+
+def ingestChain(path, *snapshots, chunk_size=CHUNK_SIZE):
+	"""
+	Ingest the CSV $snapshots into the store in the directory at $path
+	(created if it doesn't exist). Contracts already in the store are kept,
+	and where a snapshot quotes one again, the later quote replaces it.
+	Snapshots are read $chunk_size rows at a time (see readSnapshot()).
+	Return the number of contracts in the store.
+	"""
+	parts = []
+	generation = None
+	if os.path.exists(os.path.join(path, HEADER_FILE)):
+		store = ChainStore(path)
+		generation = store.generation
+		parts.append({name: np.array(store.column(name)) for name in COLUMNS})
+		del store
+	parts.extend(readSnapshot(snapshot, chunk_size) for snapshot in snapshots)
+
+	columns = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+
+	# sort by expiry, then type, then strike. the sort is stable, so the latest quote of a contract comes last
+	order = np.lexsort((columns["strike"], columns["type"], columns["expiry"]))
+	columns = {name: values[order] for name, values in columns.items()}
+
+	# keep the last quote of every contract
+	key = np.stack((columns["expiry"].astype(np.int64), columns["type"].astype(np.int64)), axis=1)
+	last = np.ones(len(order), dtype=bool)
+	if len(order):
+		last[:-1] = np.any(key[1:] != key[:-1], axis=1) | (columns["strike"][1:] != columns["strike"][:-1])
+	columns = {name: values[last] for name, values in columns.items()}
+
+	# write the new generation beside the old one, nothing reads it until the header names it
+	os.makedirs(path, exist_ok=True)
+	new_generation = (generation or 0) + 1
+	for name, values in columns.items():
+		np.save(_columnPath(path, name, new_generation), values)
+
+	header = {"format": FORMAT, "version": VERSION, "generation": new_generation, "rows": int(last.sum()),
+		"expiries": [str(expiry) for expiry in np.unique(columns["expiry"])]}
+	temporary = os.path.join(path, f"{HEADER_FILE}.tmp")
+	with open(temporary, "w") as file:
+		json.dump(header, file)
+	os.replace(temporary, os.path.join(path, HEADER_FILE))
+
+	# the store now reads the new generation, older ones can go
+	_removeGenerations(path, new_generation)
+
+	return header["rows"]
+
+
+class ChainStore():
+	"""
+	An option chain stored in the directory at $path by ingestChain(). Only
+	the header is read on opening, columns are memory-mapped when first used.
+	"""
+	def __init__(self, path):
+		self.path = path
+		with open(os.path.join(path, HEADER_FILE)) as file:
+			header = json.load(file)
+		if header.get("format") != FORMAT:
+			raise ValueError(f"{path} isn't an {FORMAT} store")
+		if header["version"] > VERSION:
+			raise ValueError(f"{path} was saved by a newer version (format version {header['version']})")
+
+		self.generation = header.get("generation")		# None for stores written before generations
+		self.rows = header["rows"]
+		self.expiries = [np.datetime64(expiry, "D") for expiry in header["expiries"]]
+		self._columns = {}
+
+	def __len__(self):
+		return self.rows
+
+	def column(self, name):
+		""" Return the (read-only, memory-mapped) column $name, see COLUMNS """
+		if name not in self._columns:
+			self._columns[name] = np.load(_columnPath(self.path, name, self.generation), mmap_mode="r")
+		return self._columns[name]
+
+	def segment(self, expiry, option_type):
+		""" Return (start, stop): the rows of the $option_type (1 = call; 2 = put) contracts expiring on $expiry """
+		expiries = self.column("expiry")
+		expiry = np.datetime64(expiry, "D")
+		start, stop = np.searchsorted(expiries, expiry, "left"), np.searchsorted(expiries, expiry, "right")
+
+		types = self.column("type")[start:stop]
+		return (int(start + np.searchsorted(types, option_type, "left")),
+			int(start + np.searchsorted(types, option_type, "right")))
+
+	def strikes(self, expiry, option_type):
+		""" Return the sorted strikes of the $option_type contracts expiring on $expiry """
+		start, stop = self.segment(expiry, option_type)
+		return self.column("strike")[start:stop]
+
+	def find(self, expiry, option_type, strike):
+		""" Return the row of the contract, or None if the store doesn't have it """
+		start, stop = self.segment(expiry, option_type)
+		strikes = self.column("strike")[start:stop]
+		i = int(np.searchsorted(strikes, strike))
+		if i < len(strikes) and strikes[i] == strike:
+			return start + i
+		return None
+
+	def strikeRange(self, expiry, option_type, low, high):
+		""" Return (start, stop): the rows of the $option_type contracts expiring on $expiry with $low <= strike <= $high """
+		start, stop = self.segment(expiry, option_type)
+		strikes = self.column("strike")[start:stop]
+		return (start + int(np.searchsorted(strikes, low, "left")),
+			start + int(np.searchsorted(strikes, high, "right")))
+
+	def quote(self, expiry, option_type, strike):
+		""" Return {"bid", "ask", "iv"} of the contract, or None if the store doesn't have it """
+		row = self.find(expiry, option_type, strike)
+		if row is None:
+			return None
+		return {name: float(self.column(name)[row]) for name in ("bid", "ask", "iv")}
+
+	def chain(self, expiry):
+		"""
+		Return the contracts expiring on $expiry as the chain scanner.scanChain()
+		takes: strikes with their call and put bid/ask (NaN where a strike has
+		only one of them)
+		"""
+		calls, puts = self.segment(expiry, 1), self.segment(expiry, 2)
+		call_strikes, put_strikes = self.column("strike")[slice(*calls)], self.column("strike")[slice(*puts)]
+		strikes = np.union1d(call_strikes, put_strikes)
+
+		chain = {"strike": strikes}
+		for prefix, (start, stop), own_strikes in (("call", calls, call_strikes), ("put", puts, put_strikes)):
+			at = np.searchsorted(strikes, own_strikes)
+			for name in ("bid", "ask"):
+				column = np.full(len(strikes), np.nan)
+				column[at] = self.column(name)[start:stop]
+				chain[f"{prefix}_{name}"] = column
+
+		return chain
+
+	def leg(self, expiry, option_type, strike, position, today=None, rate=None):
+		"""
+		Return the instrument config (see Instrumentium.lines) of a $position
+		("long" or "short") in the contract, priced at the ask when long and
+		the bid when short, or None if the store doesn't have it. With $rate,
+		it's valued before expiry (see pricing.py) with it's implied volatility
+		and the time from $today (by default, the current date) to $expiry.
+		"""
+		quote = self.quote(expiry, option_type, strike)
+		if quote is None:
+			return None
+
+		inst_config = {"option_type": "call" if option_type == 1 else "put", "position": position,
+			"price": quote["ask"] if position == "long" else quote["bid"], "strike": strike}
+
+		if rate is not None and not np.isnan(quote["iv"]):
+			today = np.datetime64(today or datetime.date.today(), "D")
+			days = (np.datetime64(expiry, "D") - today).astype(int)
+			inst_config.update(time_to_expiry=max(int(days), 0) / 365, volatility=quote["iv"], rate=rate)
+
+		return {"inst": "option", "inst_config": inst_config}
+
+
+def _removeGenerations(path, current):
+	"""
+	Remove the column files of every generation of the store at $path but
+	$current. Windows can't remove a file which is still memory-mapped (by a
+	ChainStore opened before the ingest), those are left for the next ingest
+	to remove.
+	"""
+	for filename in os.listdir(path):
+		# (files of stores written before generations are "<name>.npy")
+		name, _, rest = filename.partition(".")
+		if name not in COLUMNS or not filename.endswith(".npy") or rest == f"{current}.npy":
+			continue
+		try:
+			os.unlink(os.path.join(path, filename))
+		except PermissionError:
+			pass
+
+
+def _columnPath(path, name, generation):
+	""" Return the path of the column $name's file in the $generation of the store at $path """
+	if generation is None:
+		return os.path.join(path, f"{name}.npy")
+	return os.path.join(path, f"{name}.{generation}.npy")
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Ingest and inspect option chain stores.")
+	commands = parser.add_subparsers(dest="command", required=True)
+	ingest = commands.add_parser("ingest", help="ingest CSV snapshots into a store")
+	ingest.add_argument("store", help="store directory (created if it doesn't exist)")
+	ingest.add_argument("snapshots", nargs="+", help="CSV files with the columns strike, expiry, type, bid, ask, iv")
+	info = commands.add_parser("info", help="list a store's expiries")
+	info.add_argument("store", help="store directory")
+	args = parser.parse_args(argv)
+
+	if args.command == "ingest":
+		rows = ingestChain(args.store, *args.snapshots)
+		print(f"{args.store} holds {rows} contracts")
+	else:
+		store = ChainStore(args.store)
+		print(f"{store.rows} contracts")
+		for expiry in store.expiries:
+			print(f"{expiry}  {len(store.strikes(expiry, 1))} calls  {len(store.strikes(expiry, 2))} puts")
+
+
+if __name__ == "__main__":
+	main()
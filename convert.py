@@ -0,0 +1,27 @@
+# This module holds the small value conversions shared by the modules which read
+# numbers from text (CSV chains, saved strategies) and print them (the command
+# line tools), so they all treat empty, non-numeric and unbounded values alike.
+import math
+
+import numpy as np
+
+
+def toFloat(value):
+	""" Return $value as a float, or NaN if it's empty or isn't a number """
+	try:
+		return float(value)
+	except (TypeError, ValueError):
+		return np.nan
+
+
+def toNumber(value):
+	""" Return the number $value as an int or float (as the IP's entries show it), or None if it's NaN """
+	value = float(value)
+	if math.isnan(value):
+		return None
+	return int(value) if value.is_integer() else value
+
+
+def formatAmount(value):
+	""" Return $value formatted to 2 decimal places in a 9 character column, or as inf/nan """
+	return f"{value:9.2f}" if math.isfinite(value) else f"{value:>9}"
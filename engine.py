@@ -0,0 +1,259 @@
+# This module is Instrumentium's GUI-free engine. It turns instrument configs
+# (the {"inst": ..., "inst_config": ...} dictionaries the Instrument Panel
+# stores in Instrumentium.lines) into Lines, and evaluates and analyses the
+# strategies they make up. It only depends on NumPy, so batch jobs and
+# services can import it without Tkinter, matplotlib or a display.
+#
+# e.g.
+#	lines = configsToLines([{"inst": "option", "inst_config": {"option_type": "call",
+#		"position": "long", "price": 5, "strike": 50}}])
+#	x, y = evaluate(lines)
+#	analyse(lines, prices=[45, 60])["profit_at"]
+import numpy as np
+
+from lines import Option, Asset, Futures, createStrategyXInputs, updateLargestX, updateSmallestX
+from piecewise import analysePayoffs, sumPayoffs
+from strategy import linesToStrategy
+
+# the inputs an option needs to be valued before expiry
+VALUATION_KEYS = ("time_to_expiry", "volatility", "rate")
+
+# the optional size of any instrument (both 1 when not given)
+SIZE_KEYS = ("quantity", "multiplier")
+
+# the number of time slices valueSurface() values a strategy at by default
+TIME_SLICES = 60
+
+
+def isNumber(value):
+	""" Return True if $value can be read as a number """
+	try:
+		float(value)
+	except (TypeError, ValueError):
+		return False
+	else:
+		return True
+
+
+def configToLine(line, calculatable_position=None, valuation=None):
+	"""
+	Return the Option, Asset or Futures described by the instrument config $line, or
+	None if the config is incomplete or invalid (the Instrument Panel doesn't
+	graph these either).
+
+	Options are valued before expiry (see pricing.py) when their config has a 
+	"time_to_expiry", "volatility" and "rate", or when $valuation is a 
+	dictionary of those three keys to apply to every option. Any instrument's
+	config may have a "quantity" and a "multiplier".
+	"""
+	if line is None or line.get("inst") is None:
+		return None
+
+	inst_config = line["inst_config"]
+	position = 1 if inst_config["position"] == "long" else 2
+
+	# a size that was set must be a number above zero, like a price the Instrument Panel marks it red otherwise
+	size = {key: inst_config[key] for key in SIZE_KEYS if inst_config.get(key) is not None}
+	if not all(isNumber(value) and float(value) > 0 for value in size.values()):
+		return None
+	size = {key: float(value) for key, value in size.items()}
+
+	if line["inst"] == "option":
+		# an option needs a price and a strike, and the price must be below the strike
+		if not (isNumber(inst_config["price"]) and isNumber(inst_config["strike"])):
+			return None
+		price = float(inst_config["price"])
+		strike = float(inst_config["strike"])
+		if price >= strike:
+			return None
+
+		option_type = 1 if inst_config["option_type"] == "call" else 2
+
+		if all(isNumber(inst_config.get(key)) for key in VALUATION_KEYS):
+			valuation = {key: float(inst_config[key]) for key in VALUATION_KEYS}
+		if valuation is not None:
+			return Option(option_type, position, price, strike, calculatable_position, expire_now=False,
+				**valuation, **size)
+		return Option(option_type, position, price, strike, calculatable_position, **size)
+	elif line["inst"] == "stock":
+		if not isNumber(inst_config["price"]):
+			return None
+		return Asset(float(inst_config["price"]), position, calculatable_position, **size)
+	elif line["inst"] == "futures":
+		if not isNumber(inst_config["delivery_price"]):
+			return None
+		return Futures(float(inst_config["delivery_price"]), position, calculatable_position, **size)
+
+	return None
+
+
+def configsToLines(lines_config, calculatable_position=None, valuation=None):
+	"""
+	Return a dictionary of index to Line for every complete instrument config
+	in the list $lines_config (incomplete configs are skipped).
+	"""
+	lines = {}
+	for i, line in enumerate(lines_config):
+		instrument = configToLine(line, calculatable_position, valuation)
+		if instrument is not None:
+			lines[i] = instrument
+
+	return lines
+
+
+class LineBuilder():
+	"""
+	Builds Lines like configsToLines(), but keeps the Line built for every row,
+	so building the same configs again only builds the rows which changed
+	"""
+	def __init__(self):
+		self._built = {}		# row -> (configKey(), Line or None)
+
+	def build(self, lines_config, calculatable_position=None, valuation=None):
+		""" Return a dictionary of index to Line for every complete config in $lines_config, see configsToLines() """
+		lines, built = {}, {}
+		for i, line in enumerate(lines_config):
+			key = configKey(line, calculatable_position, valuation)
+			previous = self._built.get(i)
+			if previous is not None and previous[0] == key:
+				instrument = previous[1]
+			else:
+				instrument = configToLine(line, calculatable_position, valuation)
+
+			built[i] = (key, instrument)
+			if instrument is not None:
+				lines[i] = instrument
+
+		self._built = built
+		return lines
+
+	def clear(self):
+		self._built = {}
+
+
+def configKey(line, calculatable_position=None, valuation=None):
+	""" Return a tuple which is equal for configs configToLine() builds the same Line from """
+	if line is None or line.get("inst") is None:
+		return None
+	inst_config = tuple(sorted((line["inst_config"] or {}).items()))
+	return (line["inst"], inst_config, calculatable_position, tuple(sorted(valuation.items())) if valuation else None)
+
+
+def strategyRange(lines):
+	""" Return the (min_x, max_x) range shared by all $lines, as the graph uses """
+	max_x = updateLargestX(lines)
+	return updateSmallestX(lines, max_x), max_x
+
+
+def evaluate(lines, x=None):
+	"""
+	Return (x, y): the overall payoff of the Lines in $lines (a list or
+	dictionary), on $x if given, else on the strategy's own range.
+	"""
+	lines = _asList(lines)
+	if x is None:
+		min_x, max_x = strategyRange(lines)
+		x = createStrategyXInputs(lines, min_x, max_x)
+
+	x = np.asarray(x, dtype=float)
+	return x, linesToStrategy(lines).payoff(x)
+
+
+def valueCurve(lines, x=None):
+	"""
+	Return (x, y): the overall profit today of the Lines in $lines (a list or 
+	dictionary), valuing options which don't expire now with Black-Scholes. 
+	Without $x, a dense grid over the strategy's own range is used, as the 
+	curve isn't piecewise linear.
+	"""
+	lines = _asList(lines)
+	if x is None:
+		min_x, max_x = strategyRange(lines)
+		x = createStrategyXInputs(lines, min_x, max_x, mode="dense")
+
+	x = np.asarray(x, dtype=float)
+	return x, linesToStrategy(lines).value(x)
+
+
+def valueSurface(lines, slices=TIME_SLICES, x=None):
+	"""
+	Return (x, elapsed, surface): the overall profit of the Lines in $lines (a 
+	list or dictionary) at $slices times, evenly spaced from today (elapsed = 0) 
+	to the last option's expiry. surface[i] is the profit curve on $x after 
+	elapsed[i] years. Without $x, a dense grid over the strategy's own range is 
+	used.
+	"""
+	lines = _asList(lines)
+	if x is None:
+		min_x, max_x = strategyRange(lines)
+		x = createStrategyXInputs(lines, min_x, max_x, mode="dense")
+
+	x = np.asarray(x, dtype=float)
+	strategy = linesToStrategy(lines)
+	elapsed = np.linspace(0, strategy.expiry(), slices)
+	return x, elapsed, strategy.valueSurface(x, elapsed)
+
+
+def greekCurves(lines, greek, x=None):
+	"""
+	Return (x, total, per_leg): the overall $greek (see pricing.GREEKS) of the 
+	Lines in $lines (a list or dictionary), and a list of each leg's $greek 
+	(for all of it's units). Without $x, a dense grid over the strategy's own 
+	range is used.
+	"""
+	lines = _asList(lines)
+	if x is None:
+		min_x, max_x = strategyRange(lines)
+		x = createStrategyXInputs(lines, min_x, max_x, mode="dense")
+
+	x = np.asarray(x, dtype=float)
+	strategy = linesToStrategy(lines)
+	matrix = strategy.greekMatrix(x, greek) * strategy.quantities[:, np.newaxis]
+	return x, matrix.sum(axis=0), list(matrix)
+
+
+def analyse(lines, prices=None):
+	"""
+	Return the analysis of the strategy made of $lines (a list or dictionary)
+	as a dictionary: exact breakevens, max profit and max loss (+/-inf when
+	unbounded), and the profit at every price in $prices.
+	"""
+	payoff = sumPayoffs([line.payoff for line in _asList(lines)])
+
+	analysis = {
+		"breakevens": payoff.breakevens(),
+		"max_profit": payoff.maxProfit(),
+		"max_loss": payoff.maxLoss(),
+	}
+	if prices is not None:
+		analysis["profit_at"] = payoff(np.asarray(prices, dtype=float))
+
+	return analysis
+
+
+def analyseMany(strategies, prices=None):
+	"""
+	Analyse every strategy in $strategies (a list of lists or dictionaries of
+	Lines) as analyse() does, all at once (see piecewise.analysePayoffs()).
+	Return a list of analyses, in the order of $strategies.
+	"""
+	analysis = analysePayoffs([[line.payoff for line in _asList(lines)] for lines in strategies], prices)
+
+	analyses = []
+	for i, breakevens in enumerate(analysis["breakevens"]):
+		result = {
+			"breakevens": breakevens,
+			"max_profit": float(analysis["max_profit"][i]),
+			"max_loss": float(analysis["max_loss"][i]),
+		}
+		if prices is not None:
+			result["profit_at"] = analysis["profit_at"][i]
+		analyses.append(result)
+
+	return analyses
+
+
+def _asList(lines):
+	if isinstance(lines, dict):
+		return list(lines.values())
+	return list(lines)
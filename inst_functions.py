@@ -1,131 +1,131 @@
 import numpy as np
 
-def longCall(input_x_list, price, strike):
+# Vectorised payoff kernels. Each kernel takes a grid of x values (anything 
+# np.asarray accepts, ideally an np.ndarray) and returns an np.ndarray of 
+# payoffs, replacing the per-element loops with a single np.where and one 
+# bulk rounding step. As with the original piecewise functions, only the 
+# sloped part of an option payoff is rounded, the flat premium is not.
+
+def longCallArray(x, price, strike):
 	"""
 	payoff = -(price), x <= strike &= (x - strike) - price, x > strike
 	"""
-	y = []
-	
-	for x in input_x_list:
-		# piecewise function
-		if x <= strike:
-			payoff = -(price)
-			y.append(payoff)
-		elif x > strike:
-			payoff = x - strike - price
-			payoff = round(payoff, 2)
-			y.append(payoff)
+	x = np.asarray(x, dtype=float)
+	return np.where(x <= strike, -price, np.round(x - strike - price, 2))
 
-	return y
 
-
-def shortCall(input_x_list, price, strike):
+def shortCallArray(x, price, strike):
 	""" 
 	payoff = price, x <= strike &= price - (x - strike), x > strike
 	"""
-	y = []
+	x = np.asarray(x, dtype=float)
+	return np.where(x <= strike, price, np.round(price - x + strike, 2))
 
-	for x in input_x_list:
-		if x <= strike:
-			payoff = price
-			y.append(payoff)
-		elif x > strike:
-			payoff = price - x + strike
-			payoff = round(payoff, 2)
-			y.append(payoff)
 
-	return y
+def longPutArray(x, price, strike):
+	""" 
+	payoff = strike - x - price, x < strike &= -(price), x > strike
+	"""
+	x = np.asarray(x, dtype=float)
+	return np.where(x < strike, np.round(strike - x - price, 2), -price)
 
 
-def longPut(input_x_list, price, strike):
+def shortPutArray(x, price, strike):
 	""" 
-	payoff = strike - x - price, x < strike &= -(price), x > strike
+	payoff = price - (strike - x), x < strike &= price, x > strike
 	"""
-	y = []
+	x = np.asarray(x, dtype=float)
+	return np.where(x < strike, np.round(price + x - strike, 2), price)
 
-	for x in input_x_list:
-		if x < strike:
-			payoff = strike - x - price
-			payoff = round(payoff, 2)
-			y.append(payoff)
-		elif x >= strike:
-			payoff = -(price)
-			y.append(payoff)
 
-	return y
+def longStockArray(x, price):
+	""" 
+	payoff = x - price
+	"""
+	x = np.asarray(x, dtype=float)
+	return np.round(x - price, 2)
 
 
-def shortPut(input_x_list, price, strike):
+def shortStockArray(x, price):
+	"""
+	payoff = price - x
+	"""
+	x = np.asarray(x, dtype=float)
+	return np.round(price - x, 2)
+
+
+def longFuturesArray(x, delivery_price):
 	""" 
-	payoff = price - (strike - x), x < strike &= price, x > strike
+	payoff = x - delivery_price
 	"""
-	y = []
+	x = np.asarray(x, dtype=float)
+	return np.round(x - delivery_price, 2)
 
-	for x in input_x_list:
-		if x < strike:
-			payoff = price + x - strike
-			payoff = round(payoff, 2)
-			y.append(payoff)
-		elif x >= strike:
-			payoff = price
-			y.append(payoff)
 
-	return y
+def shortFuturesArray(x, delivery_price):
+	"""
+	payoff = delivery_price - x
+	"""
+	x = np.asarray(x, dtype=float)
+	return np.round(delivery_price - x, 2)
 
 
-def longStock(input_x_list, price):
+# List based wrappers kept for existing callers, they return the same values 
+# as the kernels above as a Python list.
+
+def longCall(input_x_list, price, strike):
+	"""
+	payoff = -(price), x <= strike &= (x - strike) - price, x > strike
+	"""
+	return longCallArray(input_x_list, price, strike).tolist()
+
+
+def shortCall(input_x_list, price, strike):
 	""" 
-	payoff = x - price
+	payoff = price, x <= strike &= price - (x - strike), x > strike
 	"""
-	y = []
+	return shortCallArray(input_x_list, price, strike).tolist()
 
-	for x in input_x_list:
-		payoff = x - price
-		payoff = round(payoff, 2)
-		y.append(payoff)
 
-	return y
+def longPut(input_x_list, price, strike):
+	""" 
+	payoff = strike - x - price, x < strike &= -(price), x > strike
+	"""
+	return longPutArray(input_x_list, price, strike).tolist()
 
 
-def shortStock(input_x_list, price):
+def shortPut(input_x_list, price, strike):
+	""" 
+	payoff = price - (strike - x), x < strike &= price, x > strike
 	"""
-	payoff = price - x
+	return shortPutArray(input_x_list, price, strike).tolist()
+
+
+def longStock(input_x_list, price):
+	""" 
+	payoff = x - price
 	"""
-	y = []
+	return longStockArray(input_x_list, price).tolist()
 
-	for x in input_x_list:
-		payoff = price - x
-		payoff = round(payoff, 2)
-		y.append(payoff)
 
-	return y
+def shortStock(input_x_list, price):
+	"""
+	payoff = price - x
+	"""
+	return shortStockArray(input_x_list, price).tolist()
 
 def longFutures(input_x_list, delivery_price):
 	""" 
 	payoff = x - delivery_price
 	"""
-	y = []
-
-	for x in input_x_list:
-		payoff = x - delivery_price
-		payoff = round(payoff, 2)
-		y.append(payoff)
-
-	return y
+	return longFuturesArray(input_x_list, delivery_price).tolist()
 
 
 def shortFutures(input_x_list, delivery_price):
 	"""
 	payoff = delivery_price - x
 	"""
-	y = []
-
-	for x in input_x_list:
-		payoff = delivery_price - x
-		payoff = round(payoff, 2)
-		y.append(payoff)
-
-	return y
+	return shortFuturesArray(input_x_list, delivery_price).tolist()
 
 
 def lineType(line_instance):
@@ -1,12 +1,23 @@
-from win32api import GetSystemMetrics
 import math
+import os
+
+import numpy as np
 
 import tkinter as tk
 import tkinter.font as font
+from tkinter import filedialog, messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
-from lines import Option, Asset, Futures, ProfitLine, updateSmallestX, updateLargestX, updateInstruments
+from engine import LineBuilder, configsToLines, valueCurve, valueSurface
+from lines import createRangeXInputs, createStrategyXInputs, updateSmallestX, updateLargestX
+from redraw import BackgroundTask, RedrawScheduler, ResizeManager
+from profiling import Profiler, profiled
+from render import GraphRenderer
+from scanner import describe, impliedSpot, loadChain, scanChain
+from simulation import simulate
+from storage import loadStrategy, saveStrategy
+from strategy import StrategyModel
 
 
 
@@ -16,24 +27,10 @@ class Instrumentium():
 		self.master = master
 		self.master.update() # update the root to calibrate size values
 
-		# define lines list (IP and graph derive values from here)
-		self.lines = []
-		self.profit = None
-		self.FONT_FAMILY = "Cascadia Code"
+		# define the state which doesn't need a window
+		self.initState()
 
-		# colors
-		self.GREY_THEME = "#262626"
-		self.MONEY_GREEN = "#89b05d"#"#81a658"
-		self.MONEY_GREEN_RGB = (137/255, 176/255, 93/255)
-		self.DIM_GREEN = "#475c30"#"#5b753e"#"#617d42"#"#708f4d"
-		self.WHITE_THEME = "#f5f5f5"
-		self.LIGHTER_GREY = "#424242"
-		self.RED_MONEY = "#ff3a2f"
-		self.AQUA = "#5abeb6"
-		self.AQUA_DIM = "#3c7d78"
-		self.PLACEHOLDER_WHITE = "#737373"
-		self.DARKER_GREY = "#7a7a7a"
-		self.DISABLED_PLACEHOLDER = "#3d3d3d"
+		self.FONT_FAMILY = "Cascadia Code"
 
 		# create master frame - everything must be packed onto master frame to enable menus
 		self.masterFrame = tk.Frame(master=self.master,
@@ -55,6 +52,7 @@ class Instrumentium():
 		self.instMenu = False
 		self.posMenu = False
 		self.helpMenu = False
+		self.scanMenu = False
 
 		# special characters
 		self.ARROW = "▼"
@@ -63,8 +61,7 @@ class Instrumentium():
 		self.RESET = "⟳"
 
 		# create screen size constants
-		self.SCREEN_WIDTH = GetSystemMetrics(0)
-		self.SCREEN_HEIGHT = GetSystemMetrics(1)
+		self.SCREEN_WIDTH, self.SCREEN_HEIGHT = screenSize(self.master)
 
 		# define window panel constants
 		self.HEADER_PANEL_MULTIPLIER = 0.06 	# header panel % of window height
@@ -108,8 +105,10 @@ class Instrumentium():
 		# draw the instrument panel
 		self.drawIP()
 
-		# create row list for future reference
+		# create row list for future reference. there are only NUMBER_OF_ROWS rows of widgets, they show the
+		# instruments of $self.lines from $self.rowOffset onwards and are reused as the IP is scrolled
 		self.rows = []
+		self.rowOffset = 0
 
 		# define row height so that, regardless of the number of instruments, they always align with the base of the graph panel
 		self.IP_ROW_HEIGHT = self._generateRowHeight()
@@ -123,6 +122,12 @@ class Instrumentium():
 
 		# define IP entry constants
 		self.ENTRY_HEIGHT = int(self.IP_config_header_frame["height"]/2 * 0.85)
+		self.SIZE_ENTRY_WIDTH_MULTIPLIER = 0.16
+		self.ENTRY_FILLER_WIDTH_MULTIPLIER = 0.02
+
+		# the entries which aren't paired to a scale, and the placeholders of entries not named by their key
+		self.SIZE_ENTRIES = ("quantity", "multiplier")
+		self.ENTRY_PLACEHOLDERS = {"delivery_price": "delivery price", "quantity": "qty", "multiplier": "mult"}
 
 		# define analysis panel multipliers
 		self.ANALYSIS_ROW_LABEL_FRAME_WIDTH_MULTIPLIER = 0.35
@@ -134,19 +139,12 @@ class Instrumentium():
 		self.analysisPanelLabelFont = font.Font(family=self.FONT_FAMILY, size=14, weight="bold")
 		self.analysisPanelButtonFont = font.Font(family=self.FONT_FAMILY, size=15, weight="bold")
 
-		# define position value attribute which is referenced in determine overall position at certain S_T
-		self.calculatable_position = None
-
 		# draw the IP analysis panel
 		self.drawAnalysisPanel()
 
 		# draw the graph panel windows
 		self.drawGraphPanel()
 
-		# define graph constants
-		self.FIGURE_SIZE = (7.5, 4.5) 
-		self.TICK_SIZE_MULTIPLIER = 0.07 # % of y_max lim which tick occupies
-
 		# draw the graph
 		self.drawFigure()
 
@@ -160,6 +158,105 @@ class Instrumentium():
 		self.scale1 = None
 		self.scale2 = None
 
+		# scale drags emit many values per second: coalesce their graph updates
+		# into at most one redraw per frame
+		self.REDRAW_FPS = 30
+		self.redrawScheduler = RedrawScheduler(self.master, self.updateGraph, fps=self.REDRAW_FPS)
+
+		# the strategy's value surface, simulation and chain scans are computed in the background (see initState())
+		self.surfaceTask = BackgroundTask(self.master)
+		self.simulationTask = BackgroundTask(self.master)
+		self.scanTask = BackgroundTask(self.master, error_callback=self._scanFailed)
+
+		# <Configure> events arrive in storms while the window is resized: lay the panels
+		# out at most once per idle loop, and resize the graph once the resize settles
+		self.resizeManager = ResizeManager(self.master, self.resize, self._resizeGraph)
+
+
+	def initState(self):
+		""" 
+		define the strategy, it's models, the colors and the graph's settings: the state which doesn't 
+		need a widget. kept out of __init__ so the graph pipeline can run without a window (see 
+		benchmark.headlessUI()) 
+		"""
+		# define lines list (IP and graph derive values from here)
+		self.lines = []
+		self.profit = None
+
+		# persistent strategy model which caches each leg's payoff (see strategy.py), and the
+		# Lines built from $self.lines, so that only edited rows are rebuilt (see engine.py)
+		self.strategyModel = StrategyModel()
+		self.lineBuilder = LineBuilder()
+
+		# opt-in timing of updateGraph, moveScale and resize and their phases (see profiling.py), 
+		# enabled by the INSTRUMENTIUM_PROFILE environment variable or toggled with the "p" key
+		self.profiler = Profiler(enabled=bool(os.environ.get("INSTRUMENTIUM_PROFILE")))
+		self.PROFILE_REPORT_PATH = "instrumentium_profile.txt"
+		self.PROFILE_TRACE_PATH = "instrumentium_trace.json"
+
+		# colors
+		self.GREY_THEME = "#262626"
+		self.MONEY_GREEN = "#89b05d"#"#81a658"
+		self.MONEY_GREEN_RGB = (137/255, 176/255, 93/255)
+		self.DIM_GREEN = "#475c30"#"#5b753e"#"#617d42"#"#708f4d"
+		self.WHITE_THEME = "#f5f5f5"
+		self.LIGHTER_GREY = "#424242"
+		self.RED_MONEY = "#ff3a2f"
+		self.AQUA = "#5abeb6"
+		self.AQUA_DIM = "#3c7d78"
+		self.PLACEHOLDER_WHITE = "#737373"
+		self.DARKER_GREY = "#7a7a7a"
+		self.DISABLED_PLACEHOLDER = "#3d3d3d"
+
+		# define position value attribute which is referenced in determine overall position at certain S_T
+		self.calculatable_position = None
+
+		# when set, options are also valued before expiry and today's value is drawn over
+		# the expiry payoff (toggled with the "v" key, see self.toggleValuation())
+		self.valuation = None
+		self.DEFAULT_VALUATION = {"time_to_expiry": 0.25, "volatility": 0.2, "rate": 0.01}
+
+		# the graph's y-axis shows the profit, or one of the strategy's Greeks (cycled
+		# with the "g" key, see self.cycleGraphMode()). each Greek has it's own model
+		# which caches every leg's Greek, so editing one leg only recomputes that leg
+		self.GRAPH_MODES = ["profit", "delta", "gamma", "theta", "vega", "rho"]
+		self.graphMode = "profit"
+		self.greekModels = {greek: StrategyModel(greek) for greek in self.GRAPH_MODES[1:]}
+
+		# define graph constants
+		self.FIGURE_SIZE = (7.5, 4.5) 
+		self.BLIT = True 		# redraw only the graph's lines during edits (see render.py)
+		self.TICK_SIZE_MULTIPLIER = 0.07 # % of y_max lim which tick occupies
+
+		# while a scale is held, the graph limits only change when the lines leave them
+		# (or shrink below DRAG_LIMIT_SHRINK of them), so the graph can be blitted
+		self.scaleDragging = False
+		self.DRAG_LIMIT_SHRINK = 0.5
+
+		# the time scale scrubs the strategy's value from today to expiry (toggled with 
+		# the "t" key, see self.toggleTimeScale()). the value at every time slice is 
+		# computed at once in the background, so scrubbing only swaps the value line's data
+		self.timeScale = None
+		self.TIME_SLICES = 60
+		self.surface = None
+
+		# when simulating, the distribution of the strategy's profit is simulated over
+		# SIMULATION_PATHS terminal prices (toggled with the "m" key, see 
+		# self.toggleSimulation()) in the background, and drawn as a histogram
+		self.simulating = False
+		self.SIMULATION_PATHS = 200000
+		self.SIMULATION_SEED = 0
+		self.HISTOGRAM_WIDTH_MULTIPLIER = 0.25 # % of the x-range the histogram's tallest bar occupies
+
+		# a simulation only starts once the strategy has been left unchanged for SIMULATION_DELAY ms (and never
+		# while a scale is dragged), and a running one is stopped between chunks when the strategy changes again
+		self.SIMULATION_DELAY = 250
+		self.simulationAfterId = None
+
+		# an option chain is scanned for the best spreads in the background (opened with 
+		# the "c" key, see self.openChain()), the best SCAN_RESULTS are listed in a menu
+		self.SCAN_RESULTS = 8
+
 
 	def drawPanels(self):
 		""" draw the main window panels """
@@ -310,12 +407,21 @@ class Instrumentium():
 		IP_pos_col_label.pack(side=tk.LEFT)
 		IP_config_col_label.pack(side=tk.LEFT)
 
+		# create the row count label, it shows which rows are in view once there are more than fit
+		self.IP_row_count_label = tk.Label(master=self.IP_reset_header_frame,
+			text="",
+			font=self.ipSelectorFont,
+			background=self.GREY_THEME,
+			foreground=self.DIM_GREEN)
+		self.IP_row_count_label.pack()
+		self.IP_row_count_label.place(relx=0.5, rely=0.5, anchor="center")
+
 		# bind the title and button labels to functions
 		IP_title_label.bind("<Button-1>", self.openStrategyPresetMenu__)
 
 
 	def drawRows(self):
-		""" draw five rows of empty instruments """
+		""" draw the rows of the IP, which $self.lines is shown through (starting as empty instruments) """
 		for i in range(self.NUMBER_OF_ROWS):
 			# the rows position (row) in the IP grid is (i + 2)
 			grid_row = i + 2
@@ -382,7 +488,7 @@ class Instrumentium():
 			selector.place(relx=0.5, rely=0.5, anchor="center")
 
 			# bind the selector
-			selector.bind("<Button-1>", lambda event, row=i: self.selectorClick(event, row))
+			selector.bind("<Button-1>", lambda event, slot=i: self.selectorClick(event, self.rowOffset + slot))
 
 			# create the type label
 			selectLabel = tk.Label(master=rowTypeFrame,
@@ -412,14 +518,19 @@ class Instrumentium():
 			reset.place(relx=0.5, rely=0.5, anchor="center")
 
 			# bind the reset to a row reset
-			reset.bind("<Button-1>", lambda event, row=i: self.rowReset(event, row))
+			reset.bind("<Button-1>", lambda event, slot=i: self.rowReset(event, self.rowOffset + slot))
 
 			# add an empty instrument to $self.lines
 			emptyInst = {"inst": None, "inst_config": None}
 			self.lines.append(emptyInst)
 
 			# bind the type labels
-			selectLabel.bind("<Button-1>", lambda event, row=i: self.openInstMenu__(event, row))
+			selectLabel.bind("<Button-1>", lambda event, slot=i: self.openInstMenu__(event, self.rowOffset + slot))
+
+		# scroll the rows with the mouse wheel (Button-4 and Button-5 on X11)
+		self.master.bind_all("<MouseWheel>", self.scrollRows)
+		self.master.bind_all("<Button-4>", self.scrollRows)
+		self.master.bind_all("<Button-5>", self.scrollRows)
 
 
 	def drawAnalysisPanel(self):
@@ -787,7 +898,7 @@ class Instrumentium():
 			# reset all frames in that row
 			# we are reseting the selector frame
 			# reset it's colour
-			selector = list(self.rows[i][0].children.values())[0]
+			selector = list(self._rowFrames(i)[0].children.values())[0]
 			selector.configure(foreground=self.DIM_GREEN)
 
 			# if this row is selected, it may have active scales. if it is selected, call self.removeScales
@@ -804,7 +915,7 @@ class Instrumentium():
 				selector.configure(text=self.UNCLICKED) 
 
 			# reset the type frame
-			typeFrameChildren = list(self.rows[i][1].children.values())
+			typeFrameChildren = list(self._rowFrames(i)[1].children.values())
 			selectLabel = typeFrameChildren[0]
 			arrowLabel = typeFrameChildren[1]
 
@@ -812,12 +923,12 @@ class Instrumentium():
 			arrowLabel.configure(foreground=self.DIM_GREEN)
 
 			# if there are any labels in the position frame, destroy() them
-			posFrameChildren = list(self.rows[i][2].children.values())
+			posFrameChildren = list(self._rowFrames(i)[2].children.values())
 			posFrameChildren[0].destroy()
 			posFrameChildren[1].destroy()
 
 			# if there are any frames in the config frame, destroy() them
-			configFrameChilren = list(self.rows[i][3].children.values())
+			configFrameChilren = list(self._rowFrames(i)[3].children.values())
 			for frame in configFrameChilren:
 				frame.destroy()
 
@@ -828,6 +939,10 @@ class Instrumentium():
 			newInst = {"inst": None, "inst_config": None}
 			self.lines[i] = newInst
 
+			# drop the empty rows this may have left at the end, scrolling back if they were in view
+			if self._fitLines():
+				self._drawVisibleRows()
+
 			# update the graph
 			self.updateGraph()
 
@@ -924,10 +1039,10 @@ class Instrumentium():
 		row = the (grid) row of the instrument which was selected
 		"""
 		# first, store access to the type column of the selected row
-		rowSelFrame = self.rows[row][0]
-		rowTypeFrame = self.rows[row][1]
-		rowPosFrame = self.rows[row][2]
-		rowResetFrame = self.rows[row][4]
+		rowSelFrame = self._rowFrames(row)[0]
+		rowTypeFrame = self._rowFrames(row)[1]
+		rowPosFrame = self._rowFrames(row)[2]
+		rowResetFrame = self._rowFrames(row)[4]
 		
 		# store frame children to alter later
 		typeFrameChildren = list(rowTypeFrame.children.values())
@@ -957,6 +1072,9 @@ class Instrumentium():
 		elif chosenInst == "futures":
 			self.lines[row] = {"inst": "futures", "inst_config": {"position": None, "delivery_price": None}}
 
+		# if this was the last row, add an empty one after it
+		self._fitLines()
+
 		# update the position column of the row to allow for the position menu
 		# create the labels
 		if len(rowPosFrame.children) != 2:
@@ -995,7 +1113,7 @@ class Instrumentium():
 				lambda event, inst=chosenInst, row=row: self.openPosMenu__(event, row))
 
 		# destroy any entries, if they exist
-		configFrameChildren = list(self.rows[row][3].children.values())
+		configFrameChildren = list(self._rowFrames(row)[3].children.values())
 		for frame in configFrameChildren:
 			frame.destroy()
 		
@@ -1320,7 +1438,7 @@ class Instrumentium():
 	def selectedPos(self, row, inst, pos, posMenuBorder, posMenu):
 		""" handle a selected position on a instrument row """
 		# access the position frame of the row
-		posFrame = self.rows[row][2]
+		posFrame = self._rowFrames(row)[2]
 
 		# the position chosen must be displayed to the IP
 		selectedPos = None
@@ -1369,7 +1487,7 @@ class Instrumentium():
 		arrowLabel.configure(foreground=self.MONEY_GREEN)
 
 		# destroy any entries in the row if they exist
-		configFrameChildren = list(self.rows[row][3].children.values())
+		configFrameChildren = list(self._rowFrames(row)[3].children.values())
 		if len(configFrameChildren) > 0:
 			for child in configFrameChildren:
 				child.destroy()
@@ -1503,8 +1621,7 @@ class Instrumentium():
 		{"inst": "stock", "inst_config": {"position": position, "price": price}}
 		"""
 		# reset the IP
-		for i in range(self.NUMBER_OF_ROWS):
-			self.lines[i] = {"inst": None, "inst_config": None}
+		self.lines = [{"inst": None, "inst_config": None} for i in range(self.NUMBER_OF_ROWS)]
 
 		if strategy == 1:
 			# bear put strategy selected
@@ -1554,6 +1671,19 @@ class Instrumentium():
 			self.lines[0] = longPut
 			self.lines[1] = longStock
 
+		# draw the strategy to the IP and graph it
+		self.redrawLines()
+
+		# close the menu
+		self.closeMenu(event=None, menuBorder=menuBorder, menu=menu, menuType="preset")
+
+
+	def redrawLines(self):
+		""" redraw the IP and the graph after $self.lines was replaced (e.g. a preset or a file was loaded) """
+		# show the new instruments from the first
+		self.rowOffset = 0
+		self._fitLines()
+
 		# reset the IP grid
 		self.resetRows()
 
@@ -1571,13 +1701,164 @@ class Instrumentium():
 		# (ultimately) update the graph
 		self.updateGraph()
 
+
+	def saveFile(self, event=None):
+		""" save the strategy, with it's computed payoffs, to a file chosen by the user (see storage.py) """
+		path = filedialog.asksaveasfilename(defaultextension=".npz",
+			filetypes=[("Instrumentium strategy", "*.npz")])
+		if not path:
+			return
+
+		try:
+			saveStrategy(path, self.lines, self.strategyModel)
+		except OSError as error:
+			messagebox.showerror("Couldn't save the strategy", str(error), parent=self.master)
+
+
+	def openFile(self, event=None):
+		""" load a strategy saved by self.saveFile() """
+		path = filedialog.askopenfilename(filetypes=[("Instrumentium strategy", "*.npz")])
+		if not path:
+			return
+
+		try:
+			lines_config, curves = loadStrategy(path)
+
+			# reuse the saved payoffs, so that the graph update doesn't recompute them. restore() copies them
+			# out of the file's memory maps, so the file can be saved over while it's open
+			if curves is not None:
+				legs = configsToLines(lines_config)
+				leg_keys = [int(key) for key in curves["leg_keys"]]
+				if all(key in legs for key in leg_keys) and curves["leg_y"].shape == (len(leg_keys), len(curves["x"])):
+					self.strategyModel.restore(legs, curves["x"], leg_keys, curves["leg_y"])
+		except (OSError, ValueError) as error:
+			messagebox.showerror("Couldn't open the strategy", str(error), parent=self.master)
+			return
+
+		self.lines = lines_config
+
+		self.redrawLines()
+
+
+	def openChain(self):
+		""" scan an option chain CSV file chosen by the user for the best spreads (see scanner.py) """
+		if self._isMenuOpen():
+			return
+
+		path = filedialog.askopenfilename(filetypes=[("Option chain", "*.csv")])
+		if not path:
+			return
+
+		try:
+			chain = loadChain(path)
+			impliedSpot(chain)
+		except (OSError, ValueError) as error:
+			messagebox.showerror("Couldn't scan the option chain", str(error), parent=self.master)
+			return
+
+		self.scanTask.run(lambda cancelled: scanChain(chain, top=self.SCAN_RESULTS, cancelled=cancelled),
+			self.openScanMenu__, cancellable=True)
+
+
+	def _scanFailed(self, error):
+		""" the scan raised in the background, show why """
+		messagebox.showerror("Couldn't scan the option chain", str(error), parent=self.master)
+
+
+	def openScanMenu__(self, results):
+		""" open a menu of the best spreads found by self.openChain(), a click draws one to the IP """
+		if self._isMenuOpen():
+			return
+
+		# set the scan menu flag
+		self.scanMenu = True
+
+		# set the focus to the root window to blur any active entries
+		self.master.focus()
+
+		# create the menu frames
+		scanMenuBorder = tk.Frame(master=self.master,
+			width=self.MENU_WIDTH + 5,
+			height=self.MENU_HEIGHT + 5,
+			background=self.RED_MONEY)
+		scanMenu = tk.Frame(master=self.master,
+			width=self.MENU_WIDTH,
+			height=self.MENU_HEIGHT,
+			background=self.LIGHTER_GREY)
+
+		# pack and place the menu frames
+		scanMenuBorder.pack()
+		scanMenuBorder.place(relx=0.5, rely=0.5, anchor="center")
+		scanMenu.pack()
+		scanMenu.place(relx=0.5, rely=0.5, anchor="center")
+
+		# create, place and bind the menu exit cross
+		exitCross = tk.Label(master=scanMenu,
+			text=self.EXIT_CROSS,
+			font=self.menuExitCrossFont,
+			background=self.LIGHTER_GREY,
+			foreground=self.RED_MONEY)
+		exitCross.pack()
+		exitCross.place(relx=0.96, rely=0.03, anchor="center")
+		exitCross.bind("<Button-1>", 
+			lambda event, menuBorder=scanMenuBorder, menu=scanMenu, menuType="scan": self.closeMenu(event, menuBorder, menu, menuType))
+
+		# create and place the scan menu title
+		title = tk.Label(master=scanMenu,
+			text="--- Best Spreads ---",
+			font=font.Font(family=self.FONT_FAMILY, size=25, weight="bold"),
+			background=self.LIGHTER_GREY,
+			foreground=self.RED_MONEY)
+		title.pack()
+		title.place(relx=0.5, rely=0.075, anchor="center")
+
+		if not results:
+			empty = tk.Label(master=scanMenu,
+				text="No spreads found",
+				font=self.menuBtnFont,
+				background=self.LIGHTER_GREY,
+				foreground=self.WHITE_THEME)
+			empty.pack()
+			empty.place(relx=0.5, rely=0.25, anchor="center")
+
+		# create a button for every result, best first
+		for i, result in enumerate(results):
+			resultBtn = tk.Button(master=scanMenu,
+				text=f"{describe(result).title()}  ({result['expected_profit']:+.2f} expected)",
+				border=0,
+				font=self.menuBtnFont,
+				background=self.LIGHTER_GREY,
+				foreground=self.AQUA,
+				command= lambda result=result: self.drawScanResult(result, scanMenuBorder, scanMenu))
+			resultBtn.pack()
+			resultBtn.place(relx=0.5, rely=0.18 + i * 0.07, anchor="center")
+
+
+	def drawScanResult(self, result, menuBorder, menu):
+		""" draw the legs of a spread found by self.openChain() to the IP """
+		self.lines = [{"inst": line["inst"], "inst_config": dict(line["inst_config"])} for line in result["lines_config"]]
+
+		# draw the spread to the IP and graph it
+		self.redrawLines()
+
 		# close the menu
-		self.closeMenu(event=None, menuBorder=menuBorder, menu=menu, menuType="preset")
+		self.closeMenu(event=None, menuBorder=menuBorder, menu=menu, menuType="scan")
 
 
 	def resetRows(self):
 		""" reset every row """
+		self._clearRows()
+
+		# ensure the overall position calculator is empty and $self.calculatable_position is None
+		self.analysisClearBtnClick(None)
+
+		# reset analysis panel breakeven point info
+		self.analysis_breakeven_label.configure(foreground=self.GREY_THEME)
+		self.analysis_breakeven_result.configure(text="")
+
 
+	def _clearRows(self):
+		""" reset the widgets of every row to an empty instrument, leaving $self.lines as it is """
 		for row in self.rows:
 			# reset the selector
 			selector = list(row[0].children.values())[0]
@@ -1606,29 +1887,22 @@ class Instrumentium():
 			reset = list(row[4].children.values())[0]
 			reset.configure(foreground=self.AQUA_DIM)
 
-		# ensure the overall position calculator is empty and $self.calculatable_position is None
-		self.analysisClearBtnClick(None)
-
-		# reset analysis panel breakeven point info
-		self.analysis_breakeven_label.configure(foreground=self.GREY_THEME)
-		self.analysis_breakeven_result.configure(text="")
-
 
 	def drawPresetIP(self):
 		""" 
-		this is only called when a preset is selected. loops through self.lines 
-		to create a preset strategy 
+		draw the instruments of $self.lines which are in view to the IP rows, 
+		called when a preset or file is loaded, or the rows are scrolled 
 		"""
-		for i in range(len(self.lines)):
+		for i in range(self.rowOffset, min(self.rowOffset + self.NUMBER_OF_ROWS, len(self.lines))):
 			if self.lines[i]["inst"]:
 				# if the line at i has a value in it, draw it to the IP grid
 				# set the selector to active
-				selector = list(self.rows[i][0].children.values())[0]
+				selector = list(self._rowFrames(i)[0].children.values())[0]
 				selector.configure(foreground=self.MONEY_GREEN)
 
 				# update the type frame
 				instType = self.lines[i]["inst"]
-				typeFrameChildren = list(self.rows[i][1].children.values())
+				typeFrameChildren = list(self._rowFrames(i)[1].children.values())
 				typeSelectLabel = typeFrameChildren[0]
 				typeArrowLabel = typeFrameChildren[1]
 
@@ -1636,71 +1910,137 @@ class Instrumentium():
 					text=f"{instType.title()}")
 				typeArrowLabel.configure(foreground=self.MONEY_GREEN)
 
-				# update the position frame
-				if instType == "option":
-					# update the position frame for an option -- the pos menu must be correctly bound
-					optionPosition = self.lines[i]["inst_config"]["position"]
-					optionType = self.lines[i]["inst_config"]["option_type"]
-					position = f"{optionPosition.title()} {optionType.title()}"
-
-					# create the position labels
-					positionLabel = tk.Label(master=self.rows[i][2],
-						text=position,
-						font=self.ipRowFont,
-						background=self.GREY_THEME,
-						foreground=self.MONEY_GREEN)
-					arrowLabel = tk.Label(master=self.rows[i][2],
-						text=self.ARROW,
-						font=self.ipArrowFont,
-						background=self.GREY_THEME,
-						foreground=self.MONEY_GREEN)
-
-					# pack the labels
-					positionLabel.pack(side=tk.LEFT)
-					arrowLabel.pack(side=tk.LEFT)
-
-					# bind the labels
-					positionLabel.bind("<Button-1>", 
-						lambda event, row=i: self.openPosMenu__(event, row))
-					arrowLabel.bind("<Button-1>", 
-						lambda event, row=i: self.openPosMenu__(event, row))
-
-					# draw the entries for the instrument
-					self.drawEntries(row=i, inst="option")
-				elif instType == "stock": 
-					# update the position frame for an option
-					position = self.lines[i]["inst_config"]["position"]
-
-					# create the position labels
-					positionLabel = tk.Label(master=self.rows[i][2],
-						text=f"{position.title()}",
-						font=self.ipRowFont,
-						background=self.GREY_THEME,
-						foreground=self.MONEY_GREEN)
-					arrowLabel = tk.Label(master=self.rows[i][2],
-						text=self.ARROW,
-						font=self.ipArrowFont,
-						background=self.GREY_THEME,
-						foreground=self.MONEY_GREEN)
-
-					# pack the labels
-					positionLabel.pack(side=tk.LEFT)
-					arrowLabel.pack(side=tk.LEFT)
-
-					# bind the labels
-					positionLabel.bind("<Button-1>", 
-						lambda event, row=i: self.openPosMenu__(event, row))
-					arrowLabel.bind("<Button-1>", 
-						lambda event, row=i: self.openPosMenu__(event, row))
-
-					# draw the entries for the instrument
-					self.drawEntries(row=i, inst="stock")
+				# update the position frame, a row may not have had it's position chosen yet
+				inst_config = self.lines[i]["inst_config"]
+				position = inst_config["position"]
+				if position is None:
+					position = "Select"
+					positionColour = self.DIM_GREEN
+				elif instType == "option":
+					position = f"{position.title()} {inst_config['option_type'].title()}"
+					positionColour = self.MONEY_GREEN
+				else:
+					position = position.title()
+					positionColour = self.MONEY_GREEN
+
+				# create the position labels
+				positionLabel = tk.Label(master=self._rowFrames(i)[2],
+					text=position,
+					font=self.ipRowFont,
+					background=self.GREY_THEME,
+					foreground=positionColour)
+				arrowLabel = tk.Label(master=self._rowFrames(i)[2],
+					text=self.ARROW,
+					font=self.ipArrowFont,
+					background=self.GREY_THEME,
+					foreground=positionColour)
+
+				# pack the labels
+				positionLabel.pack(side=tk.LEFT)
+				arrowLabel.pack(side=tk.LEFT)
+
+				# bind the labels
+				positionLabel.bind("<Button-1>", 
+					lambda event, row=i: self.openPosMenu__(event, row))
+				arrowLabel.bind("<Button-1>", 
+					lambda event, row=i: self.openPosMenu__(event, row))
+
+				# draw the entries for the instrument, once it has a position
+				if inst_config["position"] is not None:
+					self.drawEntries(row=i, inst=instType)
 
 				# update the reset label
-				reset = list(self.rows[i][4].children.values())[0]
+				reset = list(self._rowFrames(i)[4].children.values())[0]
 				reset.configure(foreground=self.AQUA)
 
 
+	def scrollRows(self, event):
+		""" scroll the IP rows by one instrument on a mouse wheel over the IP """
+		if self._isMenuOpen():
+			return
+
+		# only scroll when the pointer is over the IP
+		widget = self.master.winfo_containing(event.x_root, event.y_root)
+		ipWindow = str(self.ipWindow)
+		if widget is None or not (str(widget) == ipWindow or str(widget).startswith(ipWindow + ".")):
+			return
+
+		if event.num == 4 or event.delta > 0:
+			step = -1
+		else:
+			step = 1
+
+		# take the focus from any entry first, it's blur saves it's input into the row it's on. the
+		# blur is an event, so the rows are redrawn once it has been handled
+		self.master.focus()
+		self.master.after_idle(lambda: self.showRows(self.rowOffset + step))
+
+
+	@profiled()
+	def showRows(self, offset):
+		""" show the instruments of $self.lines from $offset onwards in the IP rows """
+		offset = max(0, min(offset, len(self.lines) - self.NUMBER_OF_ROWS))
+		if offset == self.rowOffset:
+			return
+
+		# the scales belong to the selected row, unselect it rather than scroll them out of view with it
+		if self._selectedRow() != -1:
+			for row in self.rows:
+				selector = list(row[0].children.values())[0]
+				selector.configure(text=self.UNCLICKED)
+			self.removeScales()
+
+			self.analysis_breakeven_label.configure(foreground=self.GREY_THEME)
+			self.analysis_breakeven_result.configure(text="")
+
+		self.rowOffset = offset
+		self._drawVisibleRows()
+
+
+	def _drawVisibleRows(self):
+		""" redraw the IP rows from $self.lines, after $self.rowOffset moved """
+		self._clearRows()
+		self.drawPresetIP()
+		self._updateRowCount()
+
+
+	def _fitLines(self):
+		"""
+		keep exactly one empty instrument after the last one in $self.lines (and 
+		at least enough to fill the IP), so that another can always be added. 
+		return True if $self.rowOffset had to move back as rows were dropped
+		"""
+		empty = {"inst": None, "inst_config": None}
+		while len(self.lines) > self.NUMBER_OF_ROWS and not self.lines[-1]["inst"] and not self.lines[-2]["inst"]:
+			self.lines.pop()
+		if not self.lines or self.lines[-1]["inst"]:
+			self.lines.append(dict(empty))
+		while len(self.lines) < self.NUMBER_OF_ROWS:
+			self.lines.append(dict(empty))
+
+		moved = False
+		if self.rowOffset > len(self.lines) - self.NUMBER_OF_ROWS:
+			self.rowOffset = len(self.lines) - self.NUMBER_OF_ROWS
+			moved = True
+
+		self._updateRowCount()
+		return moved
+
+
+	def _updateRowCount(self):
+		""" show the last row in view out of all of them (e.g. "7/9") in the IP header, if they don't all fit """
+		if len(self.lines) > self.NUMBER_OF_ROWS:
+			last = min(self.rowOffset + self.NUMBER_OF_ROWS, len(self.lines))
+			self.IP_row_count_label.configure(text=f"{last}/{len(self.lines)}")
+		else:
+			self.IP_row_count_label.configure(text="")
+
+
+	def _rowFrames(self, row):
+		""" return the frames of the IP row showing the instrument $row of $self.lines """
+		return self.rows[row - self.rowOffset]
+
+
 	def drawEntries(self, row, inst):
 		""" 
 		draws responsive entries to the row 
@@ -1708,23 +2048,23 @@ class Instrumentium():
 		the way we draw entries changes depending on the inst type
 		"""
 		# store the config frame in a variable
-		configFrame = self.rows[row][3]
+		configFrame = self._rowFrames(row)[3]
 
 		if inst == "option":
 			# we are creating two entries: price and strike
 			# create the entry frames
 			priceEntryFrame = tk.Frame(master=configFrame,
-				width=int(configFrame["width"] * 0.485),
+				width=int(configFrame["width"] * self._entryWidthMultipliers(inst)[0]),
 				height=self.ENTRY_HEIGHT,
 				highlightbackground=self.MONEY_GREEN,
 				highlightcolor=self.MONEY_GREEN,
 				highlightthickness=1,
 				background=self.GREY_THEME)
 			fillerEntryFrame = tk.Frame(master=configFrame,
-				width=int(configFrame["width"] * 0.03),
+				width=int(configFrame["width"] * self.ENTRY_FILLER_WIDTH_MULTIPLIER),
 				background=self.GREY_THEME)
 			strikeEntryFrame = tk.Frame(master=configFrame,
-				width=int(configFrame["width"] * 0.485),
+				width=int(configFrame["width"] * self._entryWidthMultipliers(inst)[2]),
 				height=self.ENTRY_HEIGHT,
 				highlightbackground=self.MONEY_GREEN,
 				highlightcolor=self.MONEY_GREEN,
@@ -1778,7 +2118,7 @@ class Instrumentium():
 		elif inst == "stock":
 			# we are creating one entry: price
 			priceEntryFrame = tk.Frame(master=configFrame,
-				width=configFrame["width"],
+				width=int(configFrame["width"] * self._entryWidthMultipliers(inst)[0]),
 				height=self.ENTRY_HEIGHT,
 				highlightbackground=self.MONEY_GREEN,
 				highlightcolor=self.MONEY_GREEN,
@@ -1815,7 +2155,7 @@ class Instrumentium():
 		elif inst == "futures":
 			# we are creating one entry: delivery price
 			deliveryPriceEntryFrame = tk.Frame(master=configFrame,
-				width=configFrame["width"],
+				width=int(configFrame["width"] * self._entryWidthMultipliers(inst)[0]),
 				height=self.ENTRY_HEIGHT,
 				highlightbackground=self.MONEY_GREEN,
 				highlightcolor=self.MONEY_GREEN,
@@ -1850,6 +2190,63 @@ class Instrumentium():
 			deliveryPriceEntry.bind("<FocusOut>", 
 				lambda event, row=row, entryName="delivery_price": self.entryWidgetBlur(event, row, entryName))
 
+		# every instrument is sized by a quantity and a multiplier, drawn after it's other entries
+		self._drawSizeEntries(row, configFrame)
+
+
+	def _drawSizeEntries(self, row, configFrame):
+		""" draw the quantity and multiplier entries of the row at the end of it's config frame """
+		for entryName in self.SIZE_ENTRIES:
+			# each entry is spaced from the one before it by a filler frame
+			fillerEntryFrame = tk.Frame(master=configFrame,
+				width=int(configFrame["width"] * self.ENTRY_FILLER_WIDTH_MULTIPLIER),
+				background=self.GREY_THEME)
+			sizeEntryFrame = tk.Frame(master=configFrame,
+				width=int(configFrame["width"] * self.SIZE_ENTRY_WIDTH_MULTIPLIER),
+				height=self.ENTRY_HEIGHT,
+				highlightbackground=self.MONEY_GREEN,
+				highlightcolor=self.MONEY_GREEN,
+				highlightthickness=1,
+				background=self.GREY_THEME)
+
+			# pack and pack_propagate the frames
+			fillerEntryFrame.pack(side=tk.LEFT)
+			sizeEntryFrame.pack(side=tk.LEFT)
+			sizeEntryFrame.pack_propagate(0)
+
+			# create and pack the entry
+			sizeEntry = tk.Entry(master=sizeEntryFrame,
+				width=sizeEntryFrame["width"],
+				background=self.GREY_THEME, 
+				foreground=self.WHITE_THEME,
+				font=self.entryFont,
+				insertbackground=self.WHITE_THEME)
+			sizeEntry.pack()
+
+			# fill the entry on inception, sizes are only in $self.lines once they were set
+			self._fillEntry(entryWidget=sizeEntry, entryName=self.ENTRY_PLACEHOLDERS[entryName],
+				instConfigValue=self.lines[row]["inst_config"].get(entryName))
+
+			# bind the entry to a click, focus and blur event
+			sizeEntry.bind("<Button-1>", self.entryWidgetFocus)
+			sizeEntry.bind("<FocusIn>", self.entryWidgetFocus)
+			sizeEntry.bind("<FocusOut>", 
+				lambda event, row=row, entryName=entryName: self.entryWidgetBlur(event, row, entryName))
+
+
+	def _entryWidthMultipliers(self, inst):
+		""" 
+		return the width multipliers (of the config frame's width) of every frame in the config frame of an $inst row,
+		in the order they are packed: it's entries and their fillers, then the size entries and their fillers
+		"""
+		sizeWidths = [self.ENTRY_FILLER_WIDTH_MULTIPLIER, self.SIZE_ENTRY_WIDTH_MULTIPLIER] * len(self.SIZE_ENTRIES)
+		remainingWidth = 1 - sum(sizeWidths)
+		if inst == "option":
+			# the price and strike entries share what the size entries leave
+			entryWidth = (remainingWidth - self.ENTRY_FILLER_WIDTH_MULTIPLIER) / 2
+			return [entryWidth, self.ENTRY_FILLER_WIDTH_MULTIPLIER, entryWidth] + sizeWidths
+		return [remainingWidth] + sizeWidths
+
 
 	def entryWidgetFocus(self, event):
 		""" handles a click or a focus on a entry """
@@ -1871,17 +2268,17 @@ class Instrumentium():
 		entryInput = event.widget.get()
 		instType = self.lines[row]["inst"]
 
+		# only the price and strike entries are paired to a scale, the size entries aren't
+		paired = entryName not in self.SIZE_ENTRIES
+
 		if len(entryInput.strip()) == 0:
 			# the entry is empty or only has spaces, print a placeholder
-			if entryName == "delivery_price":
-				self._printPlaceholder(event.widget, "delivery price")
-			else:
-				self._printPlaceholder(event.widget, entryName)
+			self._printPlaceholder(event.widget, self.ENTRY_PLACEHOLDERS.get(entryName, entryName))
 
 			self.lines[row]["inst_config"][entryName] = None
 
 			# if it is connected to a scale (it's in an active row), update it's paired scale (set it to dark mode)
-			if self._selectedRow() == row:
+			if paired and self._selectedRow() == row:
 				if instType == "option":
 					if entryName == "price":
 						# the entry is on a selected row and is the price entry, set it to dark mode
@@ -1902,11 +2299,12 @@ class Instrumentium():
 			event.widget.insert(0, value)
 
 			# if the value is greater than or equal to zero, print it as white, else print it as red
-			if value >= 0 and value <= 1_000_000:
+			# (a size must be above zero, a quantity or multiplier of zero would erase the instrument)
+			if value >= 0 and value <= 1_000_000 and (paired or value > 0):
 				event.widget.configure(foreground=self.WHITE_THEME)
 
 				# if this entry is paired with an active scale, update the scale
-				if self._selectedRow() == row:
+				if paired and self._selectedRow() == row:
 					# this row is selected, and thus it has an active scale
 					# first, determine the instrument type
 					if instType == "option":
@@ -1928,7 +2326,7 @@ class Instrumentium():
 				event.widget.configure(foreground=self.RED_MONEY)
 
 				# if this entry is paired to an active scale, update the scale
-				if self._selectedRow() == row:
+				if paired and self._selectedRow() == row:
 					# this row is selected, thus it has an active scale. disable it for invalid input
 					if instType == "option":
 						if entryName == "price":
@@ -1955,7 +2353,7 @@ class Instrumentium():
 			self.lines[row]["inst_config"][entryName] = entryInput
 
 			# if this entry is on a row that is selected, it has an active, paired scale. update it
-			if self._selectedRow() == row:
+			if paired and self._selectedRow() == row:
 				if instType == "option":
 					if entryName == "price":
 						self.setScaleDarkMode(self.scale1)
@@ -2060,7 +2458,7 @@ class Instrumentium():
 		for i in range(self.NUMBER_OF_ROWS):
 			rowSelector = list(self.rows[i][0].children.values())[0]
 			if rowSelector["text"] == self.CLICKED:
-				return i
+				return self.rowOffset + i
 		return -1
 
 
@@ -2079,6 +2477,8 @@ class Instrumentium():
 			self.posMenu = False
 		elif menuType == "help":
 			self.helpMenu = False
+		elif menuType == "scan":
+			self.scanMenu = False
 
 
 	def _isMenuOpen(self):
@@ -2088,7 +2488,8 @@ class Instrumentium():
 		if (self.presetMenu
 			or self.instMenu
 			or self.posMenu
-			or self.helpMenu):
+			or self.helpMenu
+			or self.scanMenu):
 			return True
 		else:
 			return False
@@ -2127,6 +2528,7 @@ class Instrumentium():
 			facecolor=self.GREY_THEME)
 		self.ax = self.fig.add_subplot(111)
 
+
 		# config axes spine
 		self.ax.spines['left'].set_position('zero')	
 		self.ax.spines['left'].set_linewidth(1.5)	
@@ -2148,11 +2550,16 @@ class Instrumentium():
 		self.ax.tick_params(axis="y", colors=self.WHITE_THEME)
 		
 		# set axis labels
-		self.ax.set_ylabel("profit", fontsize=13, color=self.WHITE_THEME)
+		self.ax.set_ylabel(self.graphMode, fontsize=13, color=self.WHITE_THEME)
 		self.ax.set_title(r"$S_T$", fontsize=13, color=self.WHITE_THEME)
 
 		self.graphCanvas = FigureCanvasTkAgg(figure=self.fig, 
 			master=self.masterGraphFrame)
+
+		# the renderer creates the graph's artists once and then updates them. with
+		# blitting, interactive edits only redraw the artists over a cached background
+		self.renderer = GraphRenderer(self.ax, self.MONEY_GREEN_RGB, canvas=self.graphCanvas, blit=self.BLIT,
+			value_color=self.AQUA)
 		self.graphCanvas.draw()
 		
 		self.graphCanvasWidget = self.graphCanvas.get_tk_widget()
@@ -2163,32 +2570,36 @@ class Instrumentium():
 
 
 	def _resizeIP(self):
-		""" called to resize all of IP """
+		""" 
+		called to resize all of IP. every widget resized here is drawn in __init__, before the window 
+		can be resized, but a widget destroyed while the IP is redrawn raises a tk.TclError, which is 
+		skipped until the next resize
+		"""
 		# resize the IP frames
 		try:
 			self.IP_title_frame.configure(width=self.ipWindow["width"])
-		except:
+		except tk.TclError:
 			pass
 		# resize the IP header frames
 		try:
 			self.IP_sel_header_frame.configure(width=self._getColumnWidths(0))
-		except:
+		except tk.TclError:
 			pass
 		try:	
 			self.IP_type_header_frame.configure(width=self._getColumnWidths(1))
-		except:
+		except tk.TclError:
 			pass
 		try:
 			self.IP_pos_header_frame.configure(width=self._getColumnWidths(2))
-		except:
+		except tk.TclError:
 			pass
 		try:
 			self.IP_config_header_frame.configure(width=self._getColumnWidths(3))
-		except:
+		except tk.TclError:
 			pass
 		try:
 			self.IP_reset_header_frame.configure(width=self._getColumnWidths(4))
-		except:
+		except tk.TclError:
 			pass
 
 		# resize the row frames
@@ -2197,78 +2608,64 @@ class Instrumentium():
 			try:
 				row[0].configure(width=self.IP_sel_header_frame["width"],
 								height=rowHeight)
-			except:
+			except tk.TclError:
 				pass
 			try:
 				row[1].configure(width=self.IP_type_header_frame["width"],
 								height=rowHeight)
-			except:
+			except tk.TclError:
 				pass
 			try:
 				row[2].configure(width=self.IP_pos_header_frame["width"],
 								height=rowHeight)
-			except:
+			except tk.TclError:
 				pass
 			try:
 				row[3].configure(width=self.IP_config_header_frame["width"],
 								height=rowHeight)
-			except:
+			except tk.TclError:
 				pass
 			try:	
 				row[4].configure(width=self.IP_reset_header_frame["width"],
 								height=rowHeight)
-			except:
+			except tk.TclError:
 				pass
 			configChildren = list(row[3].children.values())
 			if len(configChildren) > 0:
 				# we have active entries in the config frame of this row
 				configFrameWidth = row[3]["width"]
-				if len(configChildren) == 3:
-					# resize the option's config frame's entry frames
-					configChildren[0].configure(width=int(configFrameWidth * 0.485))
-					configChildren[1].configure(width=int(configFrameWidth * 0.03))
-					configChildren[2].configure(width=int(configFrameWidth * 0.485))
-
-					# resize the entries
-					priceEntry = list(configChildren[0].children.values())[0]
-					strikeEntry = list(configChildren[2].children.values())[0]
+				inst = "option" if len(configChildren) == 3 + 2 * len(self.SIZE_ENTRIES) else "stock"
 
-					priceEntry.configure(width=configChildren[0]["width"])
-					strikeEntry.configure(width=configChildren[2]["width"])
-				elif len(configChildren) == 1:
-					# resize the stock/future's config frame's entry frame
-					configChildren[0].configure(width=configFrameWidth)
+				# resize the entry frames (and their fillers) of the row's instrument, then the entries in them
+				for child, widthMultiplier in zip(configChildren, self._entryWidthMultipliers(inst)):
+					child.configure(width=int(configFrameWidth * widthMultiplier))
 
-					# resize the stock/future entry
-					entry = list(configChildren[0].children.values())[0]
-
-					entry.configure(width=configChildren[0]["width"])
+					entries = list(child.children.values())
+					if len(entries) > 0:
+						entries[0].configure(width=child["width"])
 
 		# resize the IP divider
 		try:
 			self.IP_divider_frame.configure(width=self.ipWindow["width"])
-		except:
+		except tk.TclError:
 			pass
 
 		# set analysis row frame height for fast reference
 		analysis_row_frame_height = self._generateAnalysisFramesHeight()
-		try:
-			ipWindow_width = self.ipWindow["width"]
-		except:
-			pass
+		ipWindow_width = self.ipWindow["width"]
 
 		# resize analysis title frame
 		try:
 			self.analysis_title_frame.configure(width=ipWindow_width,
 				height=self.ANALYSIS_TITLE_FRAME_HEIGHT)
-		except:
+		except tk.TclError:
 			pass
 		
 		# resize the analysis panel "Overall Position" row frame
 		try:
 			self.analysis_overall_position_frame.configure(width=self.ipWindow["width"],
 				height=analysis_row_frame_height)
-		except:
+		except tk.TclError:
 			pass
 
 		# resize the "Overall Position" row frames
@@ -2281,7 +2678,7 @@ class Instrumentium():
 			else:
 				self.analysis_position_label.configure(text="Overall Position")
 				self.analysis_breakeven_label.configure(text="Breakeven Point")
-		except:
+		except tk.TclError:
 			pass
 		try:
 			self.analysis_position_entry_frame.configure(width=int(ipWindow_width * self.ANALYSIS_POSITION_ENTRY_FRAME_WIDTH_MULTIPLIER),
@@ -2289,37 +2686,37 @@ class Instrumentium():
 
 			# resize entry, too
 			self.analysis_position_entry.configure(width=self._generatePositionEntryWidth())
-		except:
+		except tk.TclError:
 			pass
 		try:
 			self.analysis_position_enter_btn_frame.configure(width=int(ipWindow_width * self.ANALYSIS_POSITION_BTN_FRAME_WIDTH_MULTIPLIER),
 				height=analysis_row_frame_height)
-		except:
+		except tk.TclError:
 			pass
 		try:
 			self.analysis_position_clear_btn_frame.configure(width=(self.analysis_overall_position_frame["width"] - self.analysis_position_label_frame["width"] -
 				self.analysis_position_entry_frame["width"] - self.analysis_position_enter_btn_frame["width"]),
 				height=analysis_row_frame_height)
-		except:
+		except tk.TclError:
 			pass
 
 		# resize the analysis panel "Breakeven Point" row frames
 		try:
 			self.analysis_breakeven_point_frame.configure(width=ipWindow_width, 
 				height=analysis_row_frame_height)
-		except:
+		except tk.TclError:
 			pass
 
 		# resuze the "Breakeven Point" row frames
 		try:
 			self.analysis_breakeven_label_frame.configure(width=int(ipWindow_width * self.ANALYSIS_ROW_LABEL_FRAME_WIDTH_MULTIPLIER),
 				height=analysis_row_frame_height)
-		except:
+		except tk.TclError:
 			pass
 		try:
 			self.analysis_breakeven_result_frame.configure(width=int(ipWindow_width * self.ANALYSIS_BREAKEVEN_RESULT_FRAME_WIDTH_MULTIPLIER),
 				height=analysis_row_frame_height)
-		except:
+		except tk.TclError:
 			pass
 
 
@@ -2330,18 +2727,17 @@ class Instrumentium():
 			height=self.graphWindow["height"] - self.masterGraphFrame["height"])
 
 
+	@profiled()
 	def updateGraph(self):
 		""" update the graph """
 		# determine min and max x & y values to dynamically determine graph limits
 		max_x, max_y = 0, 0
 		min_x, min_y = 0, 0
 
-		# reset the graph so that a the updated version can be drawn
-		self.graphReset()
-
 		# $lines is where we append each instrument (line) instance (i.e. Option, Asset, etc...), 
-		#	and this is derived from $self.lines
+		#	and this is derived from $self.lines. $legs maps the row of each instrument to it
 		lines = []
+		legs = {}
 
 		# everytime we update the graph containing options, we have to place ticks  
 		ticks = []
@@ -2352,160 +2748,93 @@ class Instrumentium():
 		spots = []
 		delivery_prices = []
 
-		for line in self.lines:
-			if line["inst"] is not None:
-				instConfig = line["inst_config"]
-
-				if line["inst"] == "option":
-					# we've encountered a option instrument
-
-					# if it has a price and a strike, we can graph it
-					if self._isNumber(instConfig["price"]) and self._isNumber(instConfig["strike"]):
-						# the line has all the values we require, graph it
-						# configure the option details
-						price = float(instConfig["price"])
-						strike = float(instConfig["strike"])
-
-						option_type = None
-						if instConfig["option_type"] == "call":
-							option_type = 1
-						else:
-							option_type = 2
-
-						position = None
-						if instConfig["position"] == "long":
-							position = 1
-						else:
-							position = 2
-
-						if price < strike:
-							# create the option
-							option = Option(option_type, position, price, strike, self.calculatable_position)
-
-							# add the option to the lines list
-							lines.append(option)
-
-							x, y = option.x, option.y
-
-						if max(x) > max_x:
-							max_x = max(x)
-						if max(y) > max_y:
-							max_y = max(y)
-
-						if min(x) < min_x:
-							min_x = min(x)
-						if min(y) < min_y:
-							min_y = min(y)
-
-						# append strike info to $strikes
-						strikes.append(strike)
-						ticks.append(strike)
-
-
-
-				elif line["inst"] == "stock":
-					# we are creating a stock for the graph
-
-					# if the stock line has a valid number price, we can graph it
-					if self._isNumber(instConfig["price"]):
-						# configure stock values
-						price = float(instConfig["price"])
-
-						position = None
-						if instConfig["position"] == "long":
-							position = 1
-						else:
-							position = 2
-
-						# create the instrument
-						stock = Asset(price, position, self.calculatable_position)
-
-						# add the stock to lines
-						lines.append(stock)
+		# Greeks need options valued before expiry, so use the default valuation if none is set
+		valuation = self.valuation
+		if self.graphMode != "profit" and not valuation:
+			valuation = self.DEFAULT_VALUATION
+
+		# build the instruments from their configs (see engine.py), skipping incomplete rows. rows
+		# which haven't changed since the last update keep their instruments
+		for row, instrument in self.lineBuilder.build(self.lines, self.calculatable_position, valuation).items():
+			lines.append(instrument)
+			legs[row] = instrument
+
+			x, y = instrument.x, instrument.y
+
+			if max(x) > max_x:
+				max_x = max(x)
+			if max(y) > max_y:
+				max_y = max(y)
+
+			if min(x) < min_x:
+				min_x = min(x)
+			if min(y) < min_y:
+				min_y = min(y)
+
+			# append the strike, spot or delivery price info to it's list
+			instType = self.lines[row]["inst"]
+			if instType == "option":
+				strikes.append(instrument.strike)
+				ticks.append(instrument.strike)
+			elif instType == "stock":
+				spots.append(instrument.price)
+				ticks.append(instrument.price)
+			elif instType == "futures":
+				delivery_prices.append(instrument.delivery_price)
+				ticks.append(instrument.delivery_price)
+
+		self.profiler.lap("build_lines")
 
-						x, y = stock.x, stock.y
-
-						if max(x) > max_x:
-							max_x = max(x)
-						if max(y) > max_y:
-							max_y = max(y)
-
-						if min(x) < min_x:
-							min_x = min(x)
-						if min(y) < min_y:
-							min_y = min(y)
-
-						# append the spot info to $spots
-						spots.append(price)
-						ticks.append(price)
-
-				elif line["inst"] == "futures":
-					# we are creating a futures for the graph
-					
-					# if the futures line has a valid number delivery price, we can graph it
-					if self._isNumber(instConfig["delivery_price"]):
-						# configure futures values
-						delivery_price = float(instConfig["delivery_price"])
-
-						position = None
-						if instConfig["position"] == "long":
-							position = 1
-						else:
-							position = 2
-
-						# create the instrument
-						futures = Asset(delivery_price, position, self.calculatable_position)
-
-						# add the stock to lines
-						lines.append(futures)
+		if len(lines) != 0:
+			# align all of the minimum and maximum x-values
+			max_x_range = updateLargestX(lines)
+			min_x_range = updateSmallestX(lines, max_x_range)
 
-						x, y = futures.x, futures.y
+			if self.graphMode == "profit":
+				# update the strategy model so that all lines share the same x range. only
+				# the legs which changed since the last update are recomputed
+				self._updateStrategyModel(legs, lines, min_x_range, max_x_range)
+				self.profit = self.strategyModel
+				self.profiler.lap("strategy_model")
+
+				# plot all instruments in $lines, reusing their lines from the last update
+				# each leg is drawn on the grid it's array is on, see StrategyModel
+				x = self.strategyModel.x
+				leg_x = self.strategyModel.leg_x
+				self.renderer.setLegs({row: (leg_x[row], y) for row, y in self.strategyModel.leg_y.items()})
+
+				# if there is more than one line, plot a profit line (thick black), else just plot the payoff function with a dashed line
+				if len(lines) > 1:
+					self.renderer.setProfit(x, self.strategyModel.y)
+				else:
+					self.renderer.hideProfit()
 
-						if max(x) > max_x:
-							max_x = max(x)
-						if max(y) > max_y:
-							max_y = max(y)
+				# overlay today's value of the strategy when valuing before expiry
+				if self.valuation:
+					dense_x = createStrategyXInputs(lines, min_x_range, max_x_range, mode="dense")
+					self.renderer.setValue(*valueCurve(lines, dense_x))
 
-						if min(x) < min_x:
-							min_x = min(x)
-						if min(y) < min_y:
-							min_y = min(y)
+					# revalue every time slice for the time scale, in the background
+					if self.timeScale is not None:
+						self.surfaceTask.run(valueSurface, self._surfaceReady, lines, self.TIME_SLICES, dense_x)
+				else:
+					self.renderer.hideValue()
 
-						# append the forward info to $futures
-						delivery_prices.append(delivery_price)
-						ticks.append(delivery_price)
+				# update the graphs x-limits from the lowest of x to the 110% of the largest x
+				self._setGraphLimit(self.ax.get_xlim, self.ax.set_xlim, min_x_range, int(max_x * 1.1))
 
-		if len(lines) != 0:
-			# align all of the minimum and maximum x-values
-			# updateInstruments() updates all lines so that they have the same x ranges
-			max_x_range = updateLargestX(lines)
-			min_x_range = updateSmallestX(lines, max_x_range)
-			updateInstruments(lines, min_x_range, max_x_range)
-
-			# plot all instruments in $lines
-			for line in lines:
-				x, y = line.x, line.y
-				self.ax.plot(x, y, color=(0, 0, 0), linestyle='--', dashes=(8,5), linewidth=0.8)
-
-			# if there is more than one line, plot a profit line (thick black), else just plot the payoff function with a dashed line
-			if len(lines) > 1:
-				self.profit = ProfitLine(lines, min_x=min_x_range, max_x=max_x_range, calculatable_position=self.calculatable_position)
-				x, y = self.profit.x, self.profit.y
-				self.ax.plot(x, y, linewidth=2.75, color=(0, 0, 0))
-			elif len(lines) == 1:
-				self.profit = lines[0]
-
-			# update the graphs x-limits from the lowest of x to the 110% of the largest x
-			self.ax.set_xlim(min_x_range, int(max_x * 1.1))
-
-			# we want the graph's y-limit to encompass all important imformation.
-			# 	thus, the y-limit should be set from -max_y to +max_y if abs(max_y) is larger than
-			# 	abs(min_y), else the y-limit should be -min_y to +min_y
-			if abs(max_y) > abs(min_y):
-				self.ax.set_ylim(-max_y, max_y)
+				# we want the graph's y-limit to encompass all important imformation.
+				# 	thus, the y-limit should be set from -max_y to +max_y if abs(max_y) is larger than
+				# 	abs(min_y), else the y-limit should be -min_y to +min_y
+				if abs(max_y) > abs(min_y):
+					self._setGraphLimit(self.ax.get_ylim, self.ax.set_ylim, -max_y, max_y)
+				else:
+					min_y = abs(min_y)
+					self._setGraphLimit(self.ax.get_ylim, self.ax.set_ylim, -min_y, min_y)
+				self.profiler.lap("plot_lines")
 			else:
-				min_y = abs(min_y)
-				self.ax.set_ylim(-min_y, min_y)
+				self._plotGreek(legs, lines, min_x_range, max_x_range, max_x)
+				self.profiler.lap("greeks")
 
 			# get all $ticks duplicates
 			seen = {}
@@ -2518,91 +2847,232 @@ class Instrumentium():
 						duplicates.append(tick)
 					seen[tick] += 1
 
-			# plot strike ticks
+			# collect the ticks to plot as (x, height, annotation, alignment)
 			tick_height = self.ax.get_ylim()[1] * self.TICK_SIZE_MULTIPLIER
-			text_pos = tick_height * 1.4
+			tick_artists = []
+
+			# strike ticks
 			tick_counter = 1
 			for strike in strikes:
-				is_duplicate = [duplicate for duplicate in duplicates if strike == duplicate]
-				if len(is_duplicate) == 0:
-					# plot the strike tick
-					self.ax.plot([strike, strike], [0, tick_height],
-						color=(0, 0, 0), linewidth=1.75)
-
-					# plot the annotations
-					self.ax.annotate(fr"$K_{tick_counter}$", (strike, text_pos),
-						ha="center", fontsize=12)
+				if strike not in duplicates:
+					tick_artists.append((strike, tick_height, fr"$K_{tick_counter}$", "center"))
 
 					# increment tick counter 
 					tick_counter += 1
-			# plot spot price ticks
+			# spot price ticks
 			spot_counter = 0
 			for spot in spots:
-				is_duplicate = [duplicate for duplicate in duplicates if spot == duplicate]
-				if len(is_duplicate) == 0:
-					# plot the spot tick
-					self.ax.plot([spot, spot], [0, tick_height],
-						color=(0, 0, 0), linewidth=1.75)
-
-					# plot the annotation
-					self.ax.annotate(fr"$S_{spot_counter}$", (spot, text_pos),
-						ha="center", fontsize=12)
+				if spot not in duplicates:
+					tick_artists.append((spot, tick_height, fr"$S_{spot_counter}$", "center"))
 
 					#increment spot counter
 					spot_counter += 1
-			# plot the futures ticks
+			# futures ticks
 			futures_counter = 1
 			for delivery_price in delivery_prices:
-				# plot the forwards tick
-				self.ax.plot([delivery_price, delivery_price], [0, tick_height],
-					color=(0, 0, 0), linewidth=1.75)
-
-				# plot the annotation
-				self.ax.annotate(fr"$F_{futures_counter}$", (delivery_price, text_pos),
-					color=(0, 0, 0), fontsize=12)
+				tick_artists.append((delivery_price, tick_height, fr"$F_{futures_counter}$", "left"))
 
 				# increment the forwards counter
 				futures_counter += 1
 
+			# plot the ticks
+			self.renderer.setTicks(tick_artists)
+			self.profiler.lap("ticks")
+
+			# simulate the profit distribution in the background, from the calculated position
+			# (or the average tick) with the valuation's volatility, rate and time to expiry
+			self.cancelSimulation()
+			if self.simulating and self.graphMode == "profit" and not self.scaleDragging:
+				valuation = self.valuation or self.DEFAULT_VALUATION
+				spot = self.calculatable_position or float(np.mean(ticks))
+				self.simulationAfterId = self.master.after(self.SIMULATION_DELAY, self._startSimulation, lines, spot,
+					valuation)
+			else:
+				self.renderer.hideSimulation()
+
 			# plot the line for the calculated position (in the analysis panel)
-			if self.calculatable_position:
+			if self.calculatable_position and self.graphMode != "profit":
+				# present the strategy's Greek at the position
+				model = self.greekModels[self.graphMode]
+				calculated_position = round(float(np.interp(self.calculatable_position, model.x, model.y)), 4)
+				self.renderer.setPosition(self.calculatable_position, calculated_position)
+			elif self.calculatable_position:
 				# present profit (vertical) line for profit pattern
-				# hint: by design, the ProfitLine instance stores the position value in $profit.calculated_position
-
-				# plot a vertical line at the specified position
-				self.ax.plot([self.calculatable_position, self.calculatable_position], [self.ax.get_ylim()[0], self.ax.get_ylim()[1]],
-					color=(self.MONEY_GREEN_RGB[0], self.MONEY_GREEN_RGB[1], self.MONEY_GREEN_RGB[2]), linewidth=2)
-
-				# plot the annotation for the vertical line
-				self.ax.annotate(s=self.profit.calculated_position, xy=(self.calculatable_position * 1.01, self.ax.get_ylim()[1] * 0.88),
-					fontsize=16, color=(self.MONEY_GREEN_RGB[0], self.MONEY_GREEN_RGB[1], self.MONEY_GREEN_RGB[2]), fontweight="bold")
-					
-
+				# hint: the strategy model's exact payoff gives the profit at any position
+				calculated_position = round(self.profit.payoff(self.calculatable_position), 2)
+				self.renderer.setPosition(self.calculatable_position, calculated_position)
+			else:
+				self.renderer.hidePosition()
+			self.profiler.lap("position")
 
-			# reset figure axes spines
-			self.ax.spines['left'].set_position(('data', min_x_range))
-			self.graphCanvas.draw()
+			# reset figure axes spines. the left spine is pinned to the axes' left edge (min_x_range, unless the
+			# limits are held during a drag), so it never moves without the limits and the blitted background changing
+			self.ax.spines['left'].set_position(('axes', 0))
+			self.renderer.draw()
 			self.ax.spines["left"].set_color("black")
+			self.profiler.lap("draw")
 
 			# enable the analysis panel's overall position calculator
 			self.enableOverallPosition()
 		elif len(lines) == 0:
+			# hide every artist and return the axes to their empty state
+			self.renderer.hide()
+			self.cancelSimulation()
 			self.graphReset()
-			self.fig.clear(keep_observers=True)
-			self.drawFigure()
+			self.graphCanvas.draw()
+			self.profiler.lap("draw")
 
 			# disable the analysis panel's overall position calculator
 			self.disableOverallPosition()
 
-			# set $self.profit to None
+			# set $self.profit to None and empty the strategy models
 			self.profit = None
+			self.strategyModel.clear()
+			for model in self.greekModels.values():
+				model.clear()
+
+
+	def _plotGreek(self, legs, lines, min_x_range, max_x_range, max_x):
+		""" plot every leg's Greek and the strategy's overall Greek, for the current graph mode """
+		# the expiry payoff is still kept up to date, as the analysis panel reads it
+		self._updateStrategyModel(legs, lines, min_x_range, max_x_range)
+		self.profit = self.strategyModel
+
+		# Greeks are curved, so they are computed on a dense grid. it doesn't hold the strikes (a Greek
+		# has no kinks to keep sharp), so editing a leg keeps the grid and only recomputes that leg
+		model = self.greekModels[self.graphMode]
+		model.update(legs, createRangeXInputs(*model.gridRange(min_x_range, max_x_range)))
+
+		x = model.x
+		self.renderer.setLegs({row: (model.leg_x[row], y) for row, y in model.leg_y.items()})
+		if len(lines) > 1:
+			self.renderer.setProfit(x, model.y)
+		else:
+			self.renderer.hideProfit()
+		self.renderer.hideValue()
 
+		self._setGraphLimit(self.ax.get_xlim, self.ax.set_xlim, min_x_range, int(max_x * 1.1))
+
+		# the y-limit is symmetric around 0 and encompasses every leg and the total
+		largest = max(np.max(np.abs(y)) for y in list(model.leg_y.values()) + [model.y])
+		largest = largest * 1.1 if largest > 0 else 1
+		self._setGraphLimit(self.ax.get_ylim, self.ax.set_ylim, -largest, largest)
+
+
+	def _updateStrategyModel(self, legs, lines, min_x_range, max_x_range):
+		""" update the strategy model with $legs, on a grid which only changes range when the legs leave it """
+		min_x, max_x = self.strategyModel.gridRange(min_x_range, max_x_range)
+		self.strategyModel.update(legs, createStrategyXInputs(lines, min_x, max_x))
+
+
+	def _setGraphLimit(self, getLimit, setLimit, low, high):
+		""" 
+		set a graph axis limit to ($low, $high). while a scale is being dragged, the 
+		current limit is kept if it still contains the new one and isn't much larger, 
+		so that the graph's background stays the same and can be blitted 
+		"""
+		if self.scaleDragging:
+			current_low, current_high = getLimit()
+			contained = current_low <= low and high <= current_high
+			if contained and (high - low) >= (current_high - current_low) * self.DRAG_LIMIT_SHRINK:
+				return
+
+		setLimit(low, high)
+
+
+	def toggleValuation(self):
+		""" switch between showing only the expiry payoff, and also showing today's value """
+		if self.valuation:
+			self.valuation = None
+		else:
+			self.valuation = dict(self.DEFAULT_VALUATION)
+
+		self.updateGraph()
 
-	def graphReset(self):
-		""" Reset the graph """
-		# first, we must clear our plot
-		self.ax.clear()
 
+	def toggleSimulation(self):
+		""" switch simulating the strategy's profit distribution on or off """
+		self.simulating = not self.simulating
+		self.updateGraph()
+
+
+	def cancelSimulation(self):
+		""" drop a pending simulation, and stop a running one at it's next chunk """
+		if self.simulationAfterId is not None:
+			self.master.after_cancel(self.simulationAfterId)
+			self.simulationAfterId = None
+
+		self.simulationTask.cancel()
+
+
+	def _startSimulation(self, lines, spot, valuation):
+		""" simulate the profit distribution of $lines in the background, the strategy has settled """
+		self.simulationAfterId = None
+		self.simulationTask.run(lambda cancelled: simulate(lines, spot, paths=self.SIMULATION_PATHS,
+			seed=self.SIMULATION_SEED, cancelled=cancelled, **valuation), self._simulationReady, cancellable=True)
+
+
+	def _simulationReady(self, results):
+		""" the simulation finished in the background, draw it's histogram and statistics """
+		if results is None or not self.simulating or self.profit is None:
+			# the simulation was cancelled
+			return
+
+		x_min, x_max = self.ax.get_xlim()
+		edges, counts = results["histogram"]
+		self.renderer.setHistogram(edges, counts, x_min, (x_max - x_min) * self.HISTOGRAM_WIDTH_MULTIPLIER)
+
+		percentiles = results["percentiles"]
+		self.renderer.setStats(f"E[P&L] {results['expected_profit']:.2f}\n"
+			f"P(profit) {results['probability_of_profit']:.1%}\n"
+			f"5% {percentiles[5]:.2f}  50% {percentiles[50]:.2f}  95% {percentiles[95]:.2f}")
+		self.renderer.draw()
+
+
+	def toggleProfiling(self):
+		""" 
+		start profiling, or stop and write the timings' summary to self.PROFILE_REPORT_PATH and the 
+		timings to self.PROFILE_TRACE_PATH (open it in chrome://tracing or ui.perfetto.dev) 
+		"""
+		if not self.profiler.enabled:
+			self.profiler.reset()
+			self.profiler.enabled = True
+			return
+
+		self.profiler.enabled = False
+		try:
+			with open(self.PROFILE_REPORT_PATH, "w") as file:
+				file.write(self.profiler.report() + "\n")
+			self.profiler.dumpTrace(self.PROFILE_TRACE_PATH)
+		except OSError as error:
+			messagebox.showerror("Couldn't save the profile", str(error), parent=self.master)
+			return
+
+		messagebox.showinfo("Profile saved", f"The timings' summary was saved to {os.path.abspath(self.PROFILE_REPORT_PATH)} "
+			f"and the trace to {os.path.abspath(self.PROFILE_TRACE_PATH)}", parent=self.master)
+
+
+	def setGraphMode(self, mode):
+		""" show $mode (one of self.GRAPH_MODES) on the graph's y-axis """
+		self.graphMode = mode
+		self.ax.set_ylabel(mode, fontsize=13, color=self.WHITE_THEME)
+
+		# the y-label is part of the cached background
+		self.renderer.invalidate()
+		self.updateGraph()
+
+
+	def cycleGraphMode(self):
+		""" switch the graph's y-axis to the next of self.GRAPH_MODES """
+		i = self.GRAPH_MODES.index(self.graphMode)
+		self.setGraphMode(self.GRAPH_MODES[(i + 1) % len(self.GRAPH_MODES)])
+
+
+	def graphReset(self):
+		""" 
+		Reset the graph's limits and styling. The graph's artists are kept (see 
+		render.py), hide them with self.renderer.hide() 
+		"""
 		# reset graph characteristics
 		self.ax.spines['left'].set_position('zero')	
 		self.ax.spines['left'].set_linewidth(1.5)	
@@ -2617,7 +3087,7 @@ class Instrumentium():
 		xaxis[-1].set_visible(False)
 
 		# set axis labels
-		self.ax.set_ylabel("profit", fontsize=13, color=self.WHITE_THEME)
+		self.ax.set_ylabel(self.graphMode, fontsize=13, color=self.WHITE_THEME)
 		self.ax.set_title(r"$S_T$", fontsize=13, color=self.WHITE_THEME)
 
 		# config figure color
@@ -2644,6 +3114,7 @@ class Instrumentium():
 		self.masterScaleFrame.grid(row=1, column=0)
 
 
+	@profiled()
 	def _resizeGraph(self):
 		""" resize the graph """
 		try:
@@ -2664,6 +3135,11 @@ class Instrumentium():
 		self.scale1 = None
 		self.scale2 = None
 
+		# drop the time scale and it's value surface
+		self.timeScale = None
+		self.surface = None
+		self.surfaceTask.cancel()
+
 
 	def generateScales(self, row):
 		""" given a active row, generate it's scales """
@@ -2748,6 +3224,8 @@ class Instrumentium():
 			# bind the scale's movement to some function
 			priceScale.configure(command= lambda value, scale=priceScale: self.moveScale(value, scale))
 			strikeScale.configure(command= lambda value, scale=strikeScale: self.moveScale(value, scale))
+			self._bindScaleDrag(priceScale)
+			self._bindScaleDrag(strikeScale)
 
 			# on inception of the scales, determine if their respective entries have
 			# valid values stored in them (accessible via self.lines)
@@ -2814,6 +3292,7 @@ class Instrumentium():
 
 			# bind the scale's movement to some function
 			scale.configure(command= lambda value, scale=scale: self.moveScale(value, scale))
+			self._bindScaleDrag(scale)
 
 			# on inception, if the entry this scale is paired to is empty, set 
 			# it to dark mode, else set it to light mode and update its values
@@ -2870,6 +3349,7 @@ class Instrumentium():
 
 			# bind the scale's movement to some function
 			scale.configure(command= lambda value, scale=scale: self.moveScale(value, scale))
+			self._bindScaleDrag(scale)
 
 			# on inception, if the entry this scale is paired to is empty, set 
 			# it to dark mode, else set it to light mode and update its values
@@ -2918,7 +3398,7 @@ class Instrumentium():
 			# the scale we're updating belongs to an option entry
 			if scale.master.grid_info()["row"] == 0:
 				# we are updating the price scale of an option
-				entryFrame = list(self.rows[self._selectedRow()][3].children.values())[0]
+				entryFrame = list(self._rowFrames(self._selectedRow())[3].children.values())[0]
 				entry = list(entryFrame.children.values())[0]
 				entryInput = self._returnIntOrFloat(entry.get())
 
@@ -2926,7 +3406,7 @@ class Instrumentium():
 				newScaleValue = entryInput
 			else:
 				# we are updating the strike scale of an option
-				entryFrame = list(self.rows[self._selectedRow()][3].children.values())[2]
+				entryFrame = list(self._rowFrames(self._selectedRow())[3].children.values())[2]
 				entry = list(entryFrame.children.values())[0]
 				entryInput = self._returnIntOrFloat(entry.get())
 
@@ -2935,7 +3415,7 @@ class Instrumentium():
 		else:
 			# the scale we're updating belongs to a stock/futures entry
 			# set the scale according to it's paired entry
-			entryFrame = list(self.rows[self._selectedRow()][3].children.values())[0]
+			entryFrame = list(self._rowFrames(self._selectedRow())[3].children.values())[0]
 			entry = list(entryFrame.children.values())[0]
 			entryInput = self._returnIntOrFloat(entry.get())
 
@@ -2952,6 +3432,7 @@ class Instrumentium():
 		scale.set(newScaleValue)
 
 
+	@profiled()
 	def moveScale(self, value, scale):
 		""" manage a scale's movement """
 		selectedRow = self._selectedRow()
@@ -2962,7 +3443,7 @@ class Instrumentium():
 				# an option scale was moved
 				if scale.master.grid_info()["row"] == 0:
 					# the price scale was moved. update the value into the entry
-					priceEntryFrame = list(self.rows[selectedRow][3].children.values())[0]
+					priceEntryFrame = list(self._rowFrames(selectedRow)[3].children.values())[0]
 					priceEntry = list(priceEntryFrame.children.values())[0]
 
 					# delete any value in there currently
@@ -2975,7 +3456,7 @@ class Instrumentium():
 					self.lines[selectedRow]["inst_config"]["price"] = value
 				else:
 					# the strike scale was moved
-					strikeEntryFrame = list(self.rows[selectedRow][3].children.values())[2]
+					strikeEntryFrame = list(self._rowFrames(selectedRow)[3].children.values())[2]
 					strikeEntry = list(strikeEntryFrame.children.values())[0]
 
 					# delete any value in the entry currently
@@ -3000,7 +3481,7 @@ class Instrumentium():
 						self.analysis_breakeven_result.configure(text=breakeven)
 			else:
 				# the stock or futures scale was moved
-				entryFrame = list(self.rows[selectedRow][3].children.values())[0]
+				entryFrame = list(self._rowFrames(selectedRow)[3].children.values())[0]
 				entry = list(entryFrame.children.values())[0]
 
 				# delete any value in the entry currently
@@ -3015,8 +3496,134 @@ class Instrumentium():
 				else:
 					self.lines[selectedRow]["inst_config"]["delivery_price"] = value
 
-			# update the graph
+			self.profiler.lap("entries")
+
+			# schedule a graph update, the scheduler merges the rapid updates of a drag
+			self.redrawScheduler.request()
+
+
+	def _bindScaleDrag(self, scale):
+		""" track when $scale is pressed and released """
+		scale.bind("<ButtonPress-1>", self.scalePress)
+		scale.bind("<ButtonRelease-1>", self.scaleRelease)
+
+
+	def scalePress(self, event):
+		""" a scale is being dragged, keep the graph limits steady """
+		self.scaleDragging = True
+
+
+	def scaleRelease(self, event):
+		""" the scale drag finished, redraw the graph with exact limits """
+		self.scaleDragging = False
+		self.redrawScheduler.request()
+
+
+	def toggleTimeScale(self):
+		""" show (or remove) the time scale, which scrubs the strategy's value from today to expiry """
+		if self.timeScale is not None:
+			self.removeScales()
 			self.updateGraph()
+			return
+
+		# the strategy has to be valued before expiry to have a value over time
+		if not self.valuation:
+			self.valuation = dict(self.DEFAULT_VALUATION)
+
+		self.removeScales()
+
+		# define constants
+		masterWidth = self.masterScaleFrame["width"]
+		SCALE_WIDTH = int(masterWidth * self.SCALE_FRAME_WIDTH_MULTIPLIER)
+		masterHeight = self.masterScaleFrame["height"]
+
+		# create the time scale frames, laid out like a stock's price scale
+		timeScaleFrame = tk.Frame(master=self.masterScaleFrame,
+			width=SCALE_WIDTH,
+			height=masterHeight,
+			background=self.GREY_THEME)
+		timeLabelFrame = tk.Frame(master=self.masterScaleFrame,
+			width=masterWidth - SCALE_WIDTH,
+			height=masterHeight,
+			background=self.GREY_THEME)
+
+		# grid the frames
+		timeLabelFrame.grid(row=0, column=0)
+		timeScaleFrame.grid(row=0, column=1)
+
+		# create the days label
+		label = tk.Label(master=timeLabelFrame,
+			text="days",
+			font=self.scaleLabelFont,
+			background=self.GREY_THEME,
+			foreground=self.WHITE_THEME)
+
+		# pack and place the label
+		label.pack()
+		label.place(relx=0.75, rely=0.5, anchor="center")
+
+		# create the scale. it stays dark until the value surface is ready
+		scale = tk.Scale(master=timeScaleFrame,
+			orient=tk.HORIZONTAL,
+			background=self.GREY_THEME,
+			foreground=self.WHITE_THEME,
+			highlightbackground=self.GREY_THEME,
+			sliderrelief=tk.FLAT,
+			length=self.SCALE_LENGTH,
+			font=self.scaleFont)
+		self.setScaleDarkMode(scale)
+		self.timeScale = scale
+
+		# bind the scale's movement to the time scrubber
+		scale.configure(command=self.moveTimeScale)
+
+		# pack and place the scale
+		scale.pack()
+		scale.place(relx=0.075, rely=0.44, anchor="w")
+
+		# the graph update computes the value surface
+		self.updateGraph()
+
+
+	def _surfaceReady(self, surface):
+		""" the value surface was computed in the background, enable the time scale """
+		if self.timeScale is None:
+			return
+
+		self.surface = surface
+		x, elapsed, values = surface
+
+		# the scale counts the days passed since today, up to the last expiry
+		days = max(int(round(elapsed[-1] * 365)), 1)
+		if self.timeScale["state"] == "disabled":
+			self.setScaleLightMode(self.timeScale)
+			self.timeScale.configure(from_=0, to=days, resolution=1)
+			self.timeScale.set(0)
+		else:
+			self.timeScale.configure(to=days)
+
+		self._showTimeSlice()
+
+
+	def moveTimeScale(self, value):
+		""" manage the time scale's movement """
+		if self.timeScale is not None and self.timeScale["state"] == "active":
+			self._showTimeSlice()
+
+
+	@profiled()
+	def _showTimeSlice(self):
+		""" draw the strategy's value at the time slice nearest to the time scale's value """
+		if self.surface is None:
+			return
+
+		x, elapsed, values = self.surface
+		days = float(self.timeScale.get())
+		i = int(np.argmin(np.abs(elapsed * 365 - days)))
+
+		# only the value line's data changes, so the graph is blitted
+		self.renderer.setValue(x, values[i])
+		self.renderer.draw()
 
 
 	def _resizeScales(self):
@@ -3051,8 +3658,13 @@ class Instrumentium():
 							height=masterHeight)
 
 
-	def resize(self, event):
-		""" manages resizing widgets (frames mostly) """
+	@profiled()
+	def resize(self, event=None):
+		""" 
+		manages resizing widgets (frames mostly), called by self.resizeManager 
+		the graph is resized separately, once the window stops resizing. as in _resizeIP(), a 
+		tk.TclError from a widget which has been destroyed is skipped
+		"""
 		# resize master frame
 		self.masterFrame.configure(width=self.master.winfo_width(),
 			height=self.master.winfo_height())
@@ -3061,42 +3673,42 @@ class Instrumentium():
 		try:
 			self.headerPanel.configure(width=self.masterFrame["width"],
 				height=int(self.SCREEN_HEIGHT * self.HEADER_PANEL_MULTIPLIER))
-		except:
+		except tk.TclError:
 			pass
 		try:
 			self.windowDividerFrame.configure(width=self.masterFrame["width"])
-		except:
+		except tk.TclError:
 			pass
 		try:	
 			self.bodyPanel.configure(width=self.masterFrame["width"],
 				height=self.masterFrame["height"] - self.headerPanel["height"] - self.windowDividerFrame["height"])
-		except:
+		except tk.TclError:
 			pass
 
 		# resize body windows
 		try:
 			self.ipWindow.configure(width=int(self.bodyPanel["width"] * self.IP_WIDTH_MULTIPLIER),
 				height=self.bodyPanel["height"])
-		except:
+		except tk.TclError:
 			pass
 		try:
 			self.bodyDividerFrame.configure(height=self.bodyPanel["height"])
-		except:
+		except tk.TclError:
 			pass
 		try:
 			self.graphWindow.configure(width=self.bodyPanel["width"] - self.ipWindow["width"] - self.bodyDividerFrame["width"] ,
 				height=self.bodyPanel["height"])
-		except:
+		except tk.TclError:
 			pass
+		self.profiler.lap("panels")
 
 		# resize the IP with a helper method
 		self._resizeIP()
-
-		# resize the graph
-		self._resizeGraph()
+		self.profiler.lap("ip")
 
 		# resize scales
 		self._resizeScales()
+		self.profiler.lap("scales")
 
 
 
@@ -3176,40 +3788,79 @@ XML-STYLE NOTES FOR PROJECT STRUCTURE:
 
 
 
-root = tk.Tk()
-
-# manage the size of the window on program start-up
-screenWidth, screenHeight = GetSystemMetrics(0), GetSystemMetrics(1)
-windowWidth = int(screenWidth * 4/5)						# start-up width 4/5 screen
-windowHeight = int(screenHeight * 7/10)						# start-up height 7/10 screen
-windowLeft = int(screenWidth/2 - windowWidth/2)				# center x
-windowTop = int(screenHeight/2 - windowHeight/2 * 1.075)	# center y plus some more
-root.geometry(f"{windowWidth}x{windowHeight}+{windowLeft}+{windowTop}")
-
-# configure root window minsize
-root.minsize(1200, 660)
-
-# configure icon
-root.iconbitmap('instrumentium.ico')
-
-# define window title
-root.title("Instrumentium")
-
-# create Instrumentium UI instance
-ui = Instrumentium(root)
-
-# configure root window background with Instrumentium instance color
-root.configure(background=ui.GREY_THEME)
-
-# handle keypresses
-def keydown(event):
-	if event.char == "q" or event.char == "Q":
-		root.destroy()
-	elif event.keysym == "Return":
-		ui.master.focus()
-
-# bind root window to events
-root.bind("<KeyPress>", keydown)
-root.bind("<Configure>", ui.resize)
-
-root.mainloop()
\ No newline at end of file
+def screenSize(master):
+	""" return the (width, height) of the screen in pixels """
+	try:
+		from win32api import GetSystemMetrics
+	except ImportError:
+		# not on Windows, ask Tkinter instead
+		return master.winfo_screenwidth(), master.winfo_screenheight()
+	return GetSystemMetrics(0), GetSystemMetrics(1)
+
+
+def main():
+	""" create the Instrumentium window and run it """
+	root = tk.Tk()
+
+	# manage the size of the window on program start-up
+	screenWidth, screenHeight = screenSize(root)
+	windowWidth = int(screenWidth * 4/5)						# start-up width 4/5 screen
+	windowHeight = int(screenHeight * 7/10)						# start-up height 7/10 screen
+	windowLeft = int(screenWidth/2 - windowWidth/2)				# center x
+	windowTop = int(screenHeight/2 - windowHeight/2 * 1.075)	# center y plus some more
+	root.geometry(f"{windowWidth}x{windowHeight}+{windowLeft}+{windowTop}")
+
+	# configure root window minsize
+	root.minsize(1200, 660)
+
+	# configure icon. only Windows' Tk reads .ico files, elsewhere iconbitmap() raises and the default icon is kept
+	try:
+		root.iconbitmap(os.path.join(os.path.dirname(os.path.abspath(__file__)), "instrumentium.ico"))
+	except tk.TclError:
+		pass
+
+	# define window title
+	root.title("Instrumentium")
+
+	# create Instrumentium UI instance
+	ui = Instrumentium(root)
+
+	# configure root window background with Instrumentium instance color
+	root.configure(background=ui.GREY_THEME)
+
+	# handle keypresses
+	def keydown(event):
+		if event.char == "q" or event.char == "Q":
+			root.destroy()
+		elif event.keysym == "Return":
+			ui.master.focus()
+		elif (event.char == "v" or event.char == "V") and not isinstance(event.widget, tk.Entry):
+			# toggle valuing options before expiry
+			ui.toggleValuation()
+		elif (event.char == "g" or event.char == "G") and not isinstance(event.widget, tk.Entry):
+			# show the next Greek (or the profit) on the graph
+			ui.cycleGraphMode()
+		elif (event.char == "t" or event.char == "T") and not isinstance(event.widget, tk.Entry):
+			# show or remove the time scale
+			ui.toggleTimeScale()
+		elif (event.char == "p" or event.char == "P") and not isinstance(event.widget, tk.Entry):
+			# start or stop profiling
+			ui.toggleProfiling()
+		elif (event.char == "m" or event.char == "M") and not isinstance(event.widget, tk.Entry):
+			# simulate the strategy's profit distribution
+			ui.toggleSimulation()
+		elif (event.char == "c" or event.char == "C") and not isinstance(event.widget, tk.Entry):
+			# scan an option chain for spreads
+			ui.openChain()
+
+	# bind root window to events
+	root.bind("<KeyPress>", keydown)
+	root.bind("<Configure>", ui.resizeManager.onConfigure)
+	root.bind("<Control-s>", ui.saveFile)
+	root.bind("<Control-o>", ui.openFile)
+
+	root.mainloop()
+
+
+if __name__ == "__main__":
+	main()
@@ -1,23 +1,38 @@
 # This module is going to simulate a Option class and Asset class which we'll
 # ultimately use to create payoff patterns for these types of instruments.
+from json import loads
+
 import numpy as np
 
 import inst_functions as inst_fncs
+from piecewise import linePayoff, sumPayoffs
+from cache import PAYOFF_CACHE, gridKey
+from strategy import legSignature, linesToStrategy
 
 # set constant multipliers
 MAX_X_MULTIPLIER = 1.3
 MIN_X_MULTIPLIER = 0.6
 
+# set x-grid constants (see _createXInputs)
+GRID_MODE = "breakpoints"		# "breakpoints" = payoff kinks and range ends only; "dense" = evenly sampled
+MAX_GRID_POINTS = 2001			# point budget for "dense" grids
+
 class Option():
 	""" Represents an instance of a Option payoff pattern. """
 
-	def __init__(self, option_type, position, price, strike, calculatable_position, expire_now=True):
+	def __init__(self, option_type, position, price, strike, calculatable_position, expire_now=True,
+			time_to_expiry=0, volatility=0, rate=0, quantity=1, multiplier=1):
 		self.instrument_type = 1		# 1 = option; 2 = stock					# we use this property so that when we are looping all line objects we can determine options from stocks
 		self.option_type = option_type	# 1 = call; 2 = put
 		self.position = position		# 1 = long; 2 = short
 		self.price = price
 		self.strike = strike
-		self.expire_now = expire_now 	# can be expanded on later
+		self.expire_now = expire_now 	# when False, the option is also valued today (see pricing.py)
+		self.time_to_expiry = time_to_expiry	# in years
+		self.volatility = volatility	# annual, as a decimal (0.2 = 20%)
+		self.rate = rate				# annual risk-free rate, as a decimal
+		self.quantity = quantity		# number of contracts held
+		self.multiplier = multiplier	# units of the underlying per contract (e.g. 100 shares)
 		self.max_x = int(strike * MAX_X_MULTIPLIER)
 		self.min_x = int(strike * MIN_X_MULTIPLIER)
 		self.calculatable_position = calculatable_position
@@ -25,13 +40,15 @@ class Option():
 
 		self.x = []						# holds x-coorindate data (function inputs)
 		self.y = []						# holds y-coordinate data (function outputs)
+		self.value_x = []				# holds x-coordinate data of today's value (when not self.expire_now)
+		self.value_y = []				# holds today's profit at each of self.value_x
 
 		self._updateX()					# used to update self.x				
 		self._updateY()					# used to update self.y
 
 	def _updateX(self):
 		""" Update self.x dependent on self.max_x """
-		self.x = _createXInputs(self.min_x, self.max_x)
+		self.x = _createXInputs(self.min_x, self.max_x, lineBreakpoints(self))
 
 	def _updateY(self):
 		""" 
@@ -42,22 +59,17 @@ class Option():
 		Since self._updateY() is called on all option changes, we should 
 		calculate breakeven point here, too.
 		"""
-		if self.option_type == 1:
-			# Option is a call
-			if self.position == 1:
-				# Option is a long call
-				self.y = inst_fncs.longCall(self.x, self.price, self.strike)
-			elif self.position == 2:
-				# Option is a short call
-				self.y = inst_fncs.shortCall(self.x, self.price, self.strike)
-		elif self.option_type == 2:
-			# Option is a put
-			if self.position == 1:
-				# Option is a long put
-				self.y = inst_fncs.longPut(self.x, self.price, self.strike)
-			elif self.position == 2:
-				# Option is a short put
-				self.y = inst_fncs.shortPut(self.x, self.price, self.strike)
+		# exact piecewise linear payoff, used for analysis (see piecewise.py)
+		self.payoff = linePayoff(self)
+
+		# identical legs on an identical grid share one cached array (see cache.py)
+		self.y = PAYOFF_CACHE.getOrCompute(("payoff", legSignature(self), gridKey(self.x)), self._payoffArray)
+
+		if not self.expire_now:
+			# today's value is a curve, so it needs a dense grid
+			self.value_x = _createXInputs(self.min_x, self.max_x, lineBreakpoints(self), mode="dense")
+			self.value_y = PAYOFF_CACHE.getOrCompute(("value", legSignature(self), gridKey(self.value_x)),
+				lambda: linesToStrategy([self]).value(self.value_x))
 
 		if self.calculatable_position:
 			if self.option_type == 1:
@@ -77,16 +89,48 @@ class Option():
 					# we're calculating the profit of a short put at a specified position
 					self.calculated_position = inst_fncs.shortPut(input_x_list=[self.calculatable_position], price=self.price, strike=self.strike)[0]
 
+			# the kernels price a single unit
+			self.calculated_position *= self.quantity * self.multiplier
+
+	def _payoffArray(self):
+		""" Return the option's payoff at expiry at every value of self.x, for all of it's units """
+		if self.option_type == 1:
+			# Option is a call
+			if self.position == 1:
+				# Option is a long call
+				y = inst_fncs.longCallArray(self.x, self.price, self.strike)
+			elif self.position == 2:
+				# Option is a short call
+				y = inst_fncs.shortCallArray(self.x, self.price, self.strike)
+			else:
+				raise ValueError(f"unknown position: {self.position}")
+		elif self.option_type == 2:
+			# Option is a put
+			if self.position == 1:
+				# Option is a long put
+				y = inst_fncs.longPutArray(self.x, self.price, self.strike)
+			elif self.position == 2:
+				# Option is a short put
+				y = inst_fncs.shortPutArray(self.x, self.price, self.strike)
+			else:
+				raise ValueError(f"unknown position: {self.position}")
+		else:
+			raise ValueError(f"unknown option_type: {self.option_type}")
+
+		return y * (self.quantity * self.multiplier)
+
 
 class Asset():
 	""" 
 	Represents an instance of a financial Asset payoff (i.e. long/short stock 
 	position). 
 	"""
-	def __init__(self, price, position, calculatable_position):
+	def __init__(self, price, position, calculatable_position, quantity=1, multiplier=1):
 		self.instrument_type = 2		# 1 = option; 2 = stocks				# as mentioned in option class, this is to defferentiate between stocks and options in other functions
 		self.position = position		# 1 = long; 2 = short
 		self.price = price
+		self.quantity = quantity		# number of units held
+		self.multiplier = multiplier	# units of the underlying per unit (e.g. per contract)
 		self.max_x = int(price * MAX_X_MULTIPLIER)
 		self.min_x = int(price * MIN_X_MULTIPLIER)
 		self.calculatable_position = calculatable_position
@@ -100,7 +144,7 @@ class Asset():
 
 	def _updateX(self):
 		""" Update self.x dependent on self.max_x """
-		self.x = _createXInputs(self.min_x, self.max_x)
+		self.x = _createXInputs(self.min_x, self.max_x, lineBreakpoints(self))
 
 	def _updateY(self):
 		""" 
@@ -108,10 +152,11 @@ class Asset():
 		one of two functions that process a linear function) using self.x as 
 		input. 
 		"""
-		if self.position == 1:
-			self.y = inst_fncs.longStock(self.x, self.price)
-		else:
-			self.y = inst_fncs.shortStock(self.x, self.price)
+		# exact piecewise linear payoff, used for analysis (see piecewise.py)
+		self.payoff = linePayoff(self)
+
+		# identical legs on an identical grid share one cached array (see cache.py)
+		self.y = PAYOFF_CACHE.getOrCompute(("payoff", legSignature(self), gridKey(self.x)), self._payoffArray)
 
 		if self.calculatable_position:
 			if self.position == 1:
@@ -121,18 +166,32 @@ class Asset():
 				# calculate profit for short position in asset at price $self.calculatable_position
 				self.calculated_position = round((self.price - self.calculatable_position), 2)
 
+			self.calculated_position *= self.quantity * self.multiplier
+
+	def _payoffArray(self):
+		""" Return the position's payoff at every value of self.x, for all of it's units """
+		if self.position == 1:
+			y = inst_fncs.longStockArray(self.x, self.price)
+		elif self.position == 2:
+			y = inst_fncs.shortStockArray(self.x, self.price)
+		else:
+			raise ValueError(f"unknown position: {self.position}")
+		return y * (self.quantity * self.multiplier)
+
 
 class Futures():
 	""" 
-	Represents an instance of a financial Asset payoff (i.e. long/short stock 
-	position). 
+	Represents an instance of a Futures payoff (i.e. a long/short position in
+	a futures contract, settled against $delivery_price). 
 	"""
-	def __init__(self, delivery_price, position, calculatable_position):
+	def __init__(self, delivery_price, position, calculatable_position, quantity=1, multiplier=1):
 		self.instrument_type = 2		# 1 = option; 2 = stocks				# as mentioned in option class, this is to defferentiate between stocks and options in other functions
 		self.position = position		# 1 = long; 2 = short
 		self.delivery_price = delivery_price
-		self.max_x = int(price * MAX_X_MULTIPLIER)
-		self.min_x = int(price * MIN_X_MULTIPLIER)
+		self.quantity = quantity		# number of contracts held
+		self.multiplier = multiplier	# units of the underlying per contract
+		self.max_x = int(delivery_price * MAX_X_MULTIPLIER)
+		self.min_x = int(delivery_price * MIN_X_MULTIPLIER)
 		self.calculatable_position = calculatable_position
 		self.calculated_position = None
 
@@ -144,18 +203,39 @@ class Futures():
 
 	def _updateX(self):
 		""" Update self.x dependent on self.max_x """
-		self.x = _createXInputs(self.min_x, self.max_x)
+		self.x = _createXInputs(self.min_x, self.max_x, lineBreakpoints(self))
 
 	def _updateY(self):
 		""" 
-		Update self.y dependent on self.position and self.price (we call 
-		one of two functions that process a linear function) using self.x as 
-		input. 
+		Update self.y dependent on self.position and self.delivery_price (we
+		call one of two functions that process a linear function) using self.x
+		as input. 
 		"""
+		# exact piecewise linear payoff, used for analysis (see piecewise.py)
+		self.payoff = linePayoff(self)
+
+		# identical legs on an identical grid share one cached array (see cache.py)
+		self.y = PAYOFF_CACHE.getOrCompute(("payoff", legSignature(self), gridKey(self.x)), self._payoffArray)
+
+		if self.calculatable_position:
+			if self.position == 1:
+				# calculate profit for a long futures position at price $self.calculatable_position
+				self.calculated_position = round((self.calculatable_position - self.delivery_price), 2)
+			else:
+				# calculate profit for a short futures position at price $self.calculatable_position
+				self.calculated_position = round((self.delivery_price - self.calculatable_position), 2)
+
+			self.calculated_position *= self.quantity * self.multiplier
+
+	def _payoffArray(self):
+		""" Return the position's payoff at every value of self.x, for all of it's contracts """
 		if self.position == 1:
-			self.y = inst_fncs.longFutures(self.x, self.delivery_price)
+			y = inst_fncs.longFuturesArray(self.x, self.delivery_price)
+		elif self.position == 2:
+			y = inst_fncs.shortFuturesArray(self.x, self.delivery_price)
 		else:
-			self.y = inst_fncs.longFutures(self.x, self.delivery_price)
+			raise ValueError(f"unknown position: {self.position}")
+		return y * (self.quantity * self.multiplier)
 
 
 class ProfitLine():
@@ -169,7 +249,7 @@ class ProfitLine():
 		self.calculatable_position = calculatable_position
 		self.calculated_position = None
 
-		self.x = _createXInputs(min_x, max_x)
+		self.x = createStrategyXInputs(lines_list, min_x, max_x)
 		self.y = []
 
 		self._createProfitLineY()
@@ -177,69 +257,85 @@ class ProfitLine():
 	def _createProfitLineY(self):
 		""" 
 		Generate the overall profit position of a set of Lines and update the output 
-		variable, self.y. 
+		variable, self.y. All legs are evaluated together in one array pass by a 
+		Strategy (see strategy.py).
 		"""
-		if not self.calculatable_position:
-			# we don't have a specific calculated position to calculate
-			count = 0
-			y = []
+		self.y = linesToStrategy(self.lines_List).payoff(self.x)
 
-			while count < len(self.x):
-				payoff_at_x = 0
+		# the exact overall payoff gives the analysis values in closed form
+		self.payoff = sumPayoffs([line.payoff for line in self.lines_List])
+		self.breakevens = self.payoff.breakevens()
+		self.max_profit = self.payoff.maxProfit()
+		self.max_loss = self.payoff.maxLoss()
 
-				for line in self.lines_List:
-					payoff_at_x += line.y[count]
+		if self.calculatable_position:
+			# we must calculate profit at a certain position
+			self.calculated_position = round(self.payoff(self.calculatable_position), 2)
 
-				y.append(payoff_at_x)
-				count += 1
 
-			self.y = y
-		else:
-			# we must calculate profit at a certain position
-			count = 0
-			y = []
-			target = self.calculatable_position
 
-			search_flag = True
-			prior_value = None
+def _createXInputs(begin, end, breakpoints=None, mode=None):
+	""" 
+	Return a sorted Numpy array of x values from $begin to $end.
 
-			while count < len(self.x):
-				payoff_at_x = 0
+	In "breakpoints" mode only the range endpoints and the $breakpoints that 
+	fall inside the range are returned. Every payoff is piecewise linear with 
+	kinks at strikes, spot prices and delivery prices, so evaluating and 
+	plotting on these points alone is exact.
 
-				for line in self.lines_List:
-					payoff_at_x += line.y[count]
+	In "dense" mode the range is sampled at 1/10 intervals, capped at 
+	MAX_GRID_POINTS points, with the breakpoints merged in so kinks stay sharp.
+	"""
+	if mode is None:
+		mode = GRID_MODE
+
+	if breakpoints is None:
+		breakpoints = []
+
+	# only keep breakpoints inside of the range
+	breakpoints = np.asarray(breakpoints, dtype=float)
+	breakpoints = breakpoints[(breakpoints >= begin) & (breakpoints <= end)]
+
+	if mode == "breakpoints":
+		x = np.array([begin, end], dtype=float)
+	elif mode == "dense":
+		# linspace(start number, end number, numpy array length)
+		length = min(int((end - begin) * 10) + 1, MAX_GRID_POINTS)
+		x = np.linspace(begin, end, max(length, 2))
+	else:
+		raise ValueError(f"unknown grid mode: {mode}")
 
-				# search algorithm for desired profit value
-				if search_flag:
-					if self.x[count] >= target:
-						# we've just calculating the profit pattern point for 
-						# the desired profit position or have JUST passed it...
-						self.calculated_position = round(payoff_at_x, 2)
-						search_flag = False
+	# np.union1d sorts and removes duplicates
+	return np.union1d(x, breakpoints)
 
-				y.append(payoff_at_x)
-				count += 1
 
-			self.y = y
-		
+def lineBreakpoints(line):
+	""" Return the x values at which $line's payoff function has a kink """
+	if line.instrument_type == 1:
+		return [line.strike]
+	elif hasattr(line, "delivery_price"):
+		return [line.delivery_price]
+	else:
+		return [line.price]
 
 
-def _createXInputs(begin, end):
+def createStrategyXInputs(lines_list, min_x, max_x, mode=None):
 	""" 
-	Use np.linspace to return a Numpy array of decimals starting at $begin and 
-	ending at $end with 1/10 decimal intervals. 
+	Return the x values a strategy made of $lines_list is evaluated on: the 
+	strategy has a kink wherever any of it's lines does. See _createXInputs 
+	for $mode.
 	"""
-	# linspace(start number, end number, numpy array length)
-	if end <= 100:
-		length = end*10 + 1
-	elif end > 100 and end <= 500:
-		length = end + 1
-	elif end > 500 and end <= 1000:
-		length = int(end/10) + 1
-	else:
-		length = int(end/20) + 1
+	breakpoints = [x for line in lines_list for x in lineBreakpoints(line)]
+	return _createXInputs(min_x, max_x, breakpoints, mode)
+
 
-	return np.linspace(begin, end, end*10 + 1)
+def createRangeXInputs(min_x, max_x):
+	"""
+	Return evenly sampled x values from $min_x to $max_x, which only depend on
+	the range (not on any line's kinks). Used for curves, such as Greeks,
+	which don't have kinks to keep sharp.
+	"""
+	return _createXInputs(min_x, max_x, mode="dense")
 
 
 def updateSmallestX(lines_list, largest_x):
@@ -281,41 +377,37 @@ def updateInstruments(lines_list, min_x_range, max_x_range):
 		line._updateX()
 		line._updateY()
 
-def JSONtoLines(json):
+def JSONtoLines(json, calculatable_position=None):
 	""" 
-	Accept a JSON data, convert it to a Python Dictionary, and turn the data 
-	stored in it into a List of Lines 
+	Accept JSON data (a string, or the Dictionary or List it decodes to), and 
+	turn the lines stored in it into a List of Lines. Each line is a Dictionary
+	of the instrument's attributes, e.g.
+		{"instrument_type": 1, "option_type": 2, "position": 1, "price": 5, "strike": 55}
+		{"instrument_type": 2, "position": 2, "price": 45, "quantity": 10, "multiplier": 100}
+	where "quantity" and "multiplier" are optional (1 by default).
 	"""
+	if isinstance(json, str):
+		json = loads(json)
+	if isinstance(json, dict):
+		json = json.values()
+
 	lines = []
-	for line in json.values():
+	for line in json:
 		if line["instrument_type"] == 1:
 			# create a option
-			if line["option_type"] == 1:
-				if line["position"] == 1:
-					new_line = Option(option_type=1, position=1,
-						price=line["price"], strike=line["strike"])
-				else:
-					new_line = Option(option_type=1, position=2, 
-						price=line["price"], strike=line["strike"])
-			else:
-				if line["position"] == 1:
-					new_line = Option(option_type=2, position=1,
-						price=line["price"], strike=line["strike"])
-				else:
-					new_line = Option(option_type=2, position=2,
-						price=line["price"], strike=line["strike"])
+			new_line = Option(line["option_type"], line["position"], line["price"], line["strike"],
+				calculatable_position, quantity=line.get("quantity", 1), multiplier=line.get("multiplier", 1))
 		elif line["instrument_type"] == 2:
 			# create a stock
-			if line["position"] == 1:
-				new_line = Asset(price=line["price"], position=1)
-			else:
-				new_line = Asset(price=line["price"], position=2)
+			new_line = Asset(line["price"], line["position"], calculatable_position,
+				quantity=line.get("quantity", 1), multiplier=line.get("multiplier", 1))
+		else:
+			raise ValueError(f"unknown instrument_type: {line['instrument_type']}")
 		lines.append(new_line)
 
 	return lines
 
 
-
 if __name__ == "__main__":
 	test_no = 3
 	if test_no == 1:
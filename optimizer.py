@@ -0,0 +1,363 @@
+# This module searches for the strikes and quantities which make the best
+# strategy out of a template, e.g. the Instrument Panel's presets (see
+# Instrumentium.drawPreset()). Every combination of strikes from a strike grid
+# and quantities from a quantity grid is a candidate. Legs are priced with
+# Black-Scholes (see pricing.py), and candidates are scored in batches: every
+# candidate is a row of (candidates x legs) arrays, so a batch is evaluated with
+# the payoff kernels in inst_functions.py in a few array operations, never a
+# loop over candidates. Batches run in a process pool and each only returns
+# it's top results, which are merged at the end.
+#
+# e.g.
+#	results = optimize("bear_put_spread", spot=50, quantities=(1, 2, 3), max_loss=10)
+#	results[0]["lines_config"]		# ready to be drawn to the Instrument Panel
+#
+#	python optimizer.py bear_put_spread --spot 50 --quantities 1 2 3 --max-loss 10 --top 5
+import argparse
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, product
+
+import numpy as np
+
+import inst_functions as inst_fncs
+from convert import formatAmount, toNumber
+from lines import MAX_X_MULTIPLIER, MIN_X_MULTIPLIER
+from piecewise import MIN_PRICE
+from pricing import blackScholes
+
+# the legs of each template as (instrument, option type, position, strike).
+# strikes are numbered from the lowest a candidate uses, legs with the same
+# number share a strike. stocks are bought (or sold) at the spot price
+TEMPLATES = {
+	"bear_put_spread": (("option", "put", "short", 0), ("option", "put", "long", 1)),
+	"long_straddle": (("option", "call", "long", 0), ("option", "put", "long", 0)),
+	"short_strangle": (("option", "put", "short", 0), ("option", "call", "short", 1)),
+	"collar": (("option", "put", "long", 0), ("option", "call", "short", 1), ("stock", None, "long", None)),
+	"protective_put": (("option", "put", "long", 0), ("stock", None, "long", None)),
+}
+
+# the metrics spreadMetrics() returns, any of which can be the objective (the higher the better)
+METRICS = ("profit_per_risk", "breakeven_distance", "max_profit", "max_loss", "profit_at_spot", "expected_profit")
+
+# candidates with the same score are ranked by this metric, which is always finite
+TIEBREAK = "profit_at_spot"
+
+# profit_per_risk never takes the risk below this (a typical tick), so candidates which can't lose score finitely
+MIN_RISK = 0.01
+
+# profits are counted up to this many standard deviations of the price's move either side of the spot (see
+# spreadMetrics()), as any spread with a long call could otherwise make an unbounded profit
+MOVE_DEVIATIONS = 3
+
+# the number of candidates evaluated at once in a worker process
+BATCH_SIZE = 2 ** 16
+
+# options priced below this (a typical minimum tick) are left out, deep out of the
+# money strikes would otherwise be free to hold
+MIN_PREMIUM = 0.05
+
+# inst_functions kernels by (option_type, position), 0 being a stock
+KERNELS = {
+	(1, 1): inst_fncs.longCallArray,
+	(1, 2): inst_fncs.shortCallArray,
+	(2, 1): inst_fncs.longPutArray,
+	(2, 2): inst_fncs.shortPutArray,
+}
+STOCK_KERNELS = {1: inst_fncs.longStockArray, 2: inst_fncs.shortStockArray}
+
+OPTION_TYPE_CODES = {"call": 1, "put": 2}
+POSITION_CODES = {"long": 1, "short": 2}
+
+
+def spreadMetrics(option_types, positions, strikes, premiums, quantities, spot, upper=None, lower=None, move=None,
+	forward=None):
+	"""
+	Score a batch of candidate strategies which are made of the same legs:
+	$option_types (1 = call; 2 = put; 0 = stock) and $positions (1 = long;
+	2 = short) have one element per leg. $strikes, $premiums and $quantities
+	are (candidates x legs) arrays, stocks having their price as the premium.
+
+	Profits are only counted between the prices $lower and $upper (0 and
+	unbounded by default), the moves a candidate can be expected to profit
+	from. Losses are counted at any price.
+
+	Return a dictionary of arrays with one element per candidate:
+		max_profit, max_loss: the largest payoff at expiry in the range and
+			the smallest at any price (+/-inf when unbounded)
+		profit_per_risk: max_profit / -max_loss, with the risk never taken
+			below MIN_RISK, so candidates which can't lose still score (and
+			with $upper, every score is finite)
+		breakeven_distance: the distance from $spot to the nearest breakeven,
+			positive if the candidate is in profit at $spot (the move it can
+			take) and negative if it isn't (the move it needs). With a range,
+			it's at most the distance to the range's far end
+		profit_at_spot: the payoff at expiry if the price stays at $spot
+		expected_profit: the mean payoff at expiry, with the price lognormal
+			around $forward ($spot by default) with the standard deviation of
+			it's log $move (volatility * sqrt(time to expiry)). NaN without
+			$move
+	"""
+	strikes = np.asarray(strikes, dtype=float)
+	premiums = np.asarray(premiums, dtype=float)
+	quantities = np.asarray(quantities, dtype=float)
+	candidates, legs = strikes.shape
+	lower = MIN_PRICE if lower is None else lower
+
+	# a payoff can only have extremes at the range's ends and at it's kinks (the option strikes)
+	is_option = np.asarray(option_types) != 0
+	breakpoints = [np.full((candidates, 1), MIN_PRICE), np.full((candidates, 1), lower),
+		np.where(is_option, strikes, MIN_PRICE)]
+	if upper is not None:
+		breakpoints.append(np.full((candidates, 1), upper))
+	breakpoints = np.sort(np.concatenate(breakpoints, axis=1), axis=1)
+
+	# work on (points x candidates) arrays, so that reducing over the points is elementwise over rows
+	breakpoints = np.ascontiguousarray(breakpoints.T)
+	points = np.concatenate((breakpoints, np.full((1, candidates), spot)))
+
+	values = np.zeros(points.shape)
+	right_slope = np.zeros(candidates)
+	expected_profit = np.zeros(candidates) if move is not None else np.full(candidates, np.nan)
+	for leg in range(legs):
+		option_type, position = int(option_types[leg]), int(positions[leg])
+		premium, strike, quantity = premiums[:, leg], strikes[:, leg], quantities[:, leg]
+		if option_type == 0:
+			values += quantity * STOCK_KERNELS[position](points, premium)
+		else:
+			values += quantity * KERNELS[(option_type, position)](points, premium, strike)
+
+		# past the last strike, calls and stocks move with the price, puts are flat
+		if option_type != 2:
+			right_slope += quantity if position == 1 else -quantity
+
+		if move is not None:
+			# the mean payoff of an option is it's Black-Scholes value with no rate, over one "year" of $move
+			mean = forward if forward is not None else spot
+			worth = mean if option_type == 0 else blackScholes(option_type, mean, strike, 1, move, 0)
+			expected_profit += quantity * ((worth - premium) if position == 1 else (premium - worth))
+
+	values, profit_at_spot = values[:-1], values[-1]
+
+	in_range = breakpoints >= lower
+	if upper is not None:
+		in_range &= breakpoints <= upper
+	max_profit = np.where(in_range, values, -np.inf).max(axis=0)
+	if upper is None:
+		max_profit = np.where(right_slope > 0, np.inf, max_profit)
+	max_loss = np.where(right_slope < 0, -np.inf, values.min(axis=0))
+	with np.errstate(divide="ignore", invalid="ignore"):
+		profit_per_risk = max_profit / np.maximum(-max_loss, MIN_RISK)
+
+		# breakevens between two breakpoints, on a breakpoint, and past the last one
+		b0, b1, v0, v1 = breakpoints[:-1], breakpoints[1:], values[:-1], values[1:]
+		crossing = np.sign(v0) * np.sign(v1) < 0
+		roots = np.where(crossing, b0 - v0 * (b1 - b0) / (v1 - v0), np.nan)
+		on_breakpoint = np.where(values == 0, breakpoints, np.nan)
+		last = values[-1]
+		tail = breakpoints[-1] - last / right_slope
+		tail = np.where((right_slope != 0) & (last != 0) & (tail > breakpoints[-1]), tail, np.nan)
+
+	roots = np.concatenate((roots, on_breakpoint, tail[np.newaxis]))
+	distances = np.abs(roots - spot)
+	distances[np.isnan(distances)] = np.inf
+	distance = distances.min(axis=0)
+	if upper is not None:
+		distance = np.minimum(distance, max(spot - lower, upper - spot))
+	breakeven_distance = np.where(profit_at_spot > 0, distance, -distance)
+
+	return {
+		"profit_per_risk": profit_per_risk,
+		"breakeven_distance": breakeven_distance,
+		"max_profit": max_profit,
+		"max_loss": max_loss,
+		"profit_at_spot": profit_at_spot,
+		"expected_profit": expected_profit,
+	}
+
+
+def legCodes(legs):
+	""" Return (option_types, positions, slots): arrays of the codes spreadMetrics() takes for $legs (see TEMPLATES) """
+	option_types = np.array([OPTION_TYPE_CODES.get(leg[1], 0) for leg in legs])
+	positions = np.array([POSITION_CODES[leg[2]] for leg in legs])
+	slots = np.array([leg[3] if leg[3] is not None else 0 for leg in legs])
+	return option_types, positions, slots
+
+
+def candidateResult(legs, metrics, objective, strikes, premiums, quantities):
+	"""
+	Return the result dictionary of one candidate made of $legs (see
+	TEMPLATES): it's "score" ($objective), every metric and it's "lines_config".
+	$metrics holds the candidate's metrics, $strikes, $premiums and
+	$quantities hold one element per leg
+	"""
+	lines_config = []
+	for leg, (inst, option_type, position, slot) in enumerate(legs):
+		inst_config = {"position": position, "price": float(premiums[leg]), "quantity": toNumber(quantities[leg])}
+		if inst == "option":
+			inst_config.update(option_type=option_type, strike=toNumber(strikes[leg]))
+		lines_config.append({"inst": inst, "inst_config": inst_config})
+
+	result = {"score": float(metrics[objective])}
+	result.update({name: float(metrics[name]) for name in METRICS})
+	result["lines_config"] = lines_config
+	return result
+
+
+def topCandidates(scores, valid, top, tiebreak=None):
+	"""
+	Return the indices of the (at most) $top highest $scores which are $valid,
+	best first. Equal scores (including infinite ones) are ranked by the
+	highest $tiebreak
+	"""
+	indices = np.flatnonzero(valid & ~np.isnan(scores))
+	if tiebreak is None:
+		tiebreak = np.zeros(len(scores))
+
+	# infinite scores are ranked as the largest finite ones, so that they tie rather than compare arbitrarily
+	keys = np.clip(scores[indices], -np.finfo(float).max, np.finfo(float).max)
+	if len(indices) > top:
+		# keep every candidate scoring at least the $top-th best, so none of those tied with it are dropped
+		threshold = np.partition(keys, len(keys) - top)[len(keys) - top]
+		indices, keys = indices[keys >= threshold], keys[keys >= threshold]
+
+	order = np.lexsort((-np.nan_to_num(tiebreak[indices], nan=-np.inf), -keys))
+	return indices[order[:top]]
+
+
+def defaultStrikes(spot):
+	""" Return the strike grid searched by default: every whole number across the graph's range around $spot """
+	return np.arange(max(int(spot * MIN_X_MULTIPLIER), 1), int(spot * MAX_X_MULTIPLIER) + 1, dtype=float)
+
+
+def optimize(template, spot, strikes=None, quantities=(1,), objective="profit_per_risk", max_loss=None, top=10,
+	time_to_expiry=0.25, volatility=0.2, rate=0.01, processes=None, batch_size=BATCH_SIZE):
+	"""
+	Return the $top candidates of $template (a name in TEMPLATES, or a tuple
+	of legs in the same format) with the highest $objective (see METRICS), best
+	first. Candidates use every increasing combination of $strikes (see
+	defaultStrikes() for the default) and give every leg a quantity from
+	$quantities. With $max_loss, candidates which can lose more than it (at
+	expiry) are left out.
+
+	Options are priced with Black-Scholes, with the underlying at $spot,
+	$time_to_expiry years to expiry, the annual $volatility and the risk-free
+	$rate. Profits are counted within MOVE_DEVIATIONS standard deviations of
+	the price's move, and premiums cost their value at expiry (grown at
+	$rate). Batches of $batch_size candidates are evaluated in $processes worker
+	processes (every core by default, or in this process if $processes is 1).
+
+	Each result is a dictionary of it's "score", every metric and it's
+	"lines_config": the instrument configs of it's legs (see Instrumentium.lines).
+	"""
+	if objective not in METRICS:
+		raise ValueError(f"unknown objective: {objective}")
+	legs = TEMPLATES[template] if isinstance(template, str) else tuple(template)
+
+	strikes = np.unique(np.asarray(defaultStrikes(spot) if strikes is None else strikes, dtype=float))
+	quantity_combos = np.array(list(product(quantities, repeat=len(legs))), dtype=float)
+
+	# the premium of every option the candidates can hold, as they'd be quoted
+	call_premiums = np.round(blackScholes(1, spot, strikes, time_to_expiry, volatility, rate), 2)
+	put_premiums = np.round(blackScholes(2, spot, strikes, time_to_expiry, volatility, rate), 2)
+
+	slots = max((leg[3] for leg in legs if leg[3] is not None), default=-1) + 1
+	strike_combos = np.array(list(combinations(range(len(strikes)), slots)), dtype=np.intp).reshape(-1, slots)
+
+	# profits are counted within MOVE_DEVIATIONS standard deviations of the price's move. premiums are paid
+	# today, so at expiry they've cost their value grown at the rate (the forward is where the price is expected)
+	move = volatility * math.sqrt(time_to_expiry)
+	scoring = {"lower": spot * math.exp(-MOVE_DEVIATIONS * move), "upper": spot * math.exp(MOVE_DEVIATIONS * move),
+		"move": move, "forward": spot * math.exp(rate * time_to_expiry), "carry": math.exp(rate * time_to_expiry)}
+
+	# each batch holds whole strike combinations, with every quantity combination of them
+	rows = max(batch_size // len(quantity_combos), 1)
+	tasks = [(legs, strike_combos[start:start + rows], quantity_combos, strikes, call_premiums, put_premiums, spot,
+		scoring, objective, max_loss, top) for start in range(0, len(strike_combos), rows)]
+
+	if processes == 1:
+		batches = map(_optimizeBatch, tasks)
+	else:
+		executor = ProcessPoolExecutor(max_workers=processes or os.cpu_count())
+		batches = executor.map(_optimizeBatch, tasks)
+
+	try:
+		results = [result for batch in batches for result in batch]
+	finally:
+		if processes != 1:
+			executor.shutdown()
+
+	results.sort(key=lambda result: (result["score"], result[TIEBREAK]), reverse=True)
+	return results[:top]
+
+
+def _optimizeBatch(task):
+	""" Evaluate every candidate of one batch of strike combinations, returning it's top results """
+	legs, strike_combos, quantity_combos, strikes, call_premiums, put_premiums, spot, scoring, objective, max_loss, \
+		top = task
+
+	option_types, positions, slots = legCodes(legs)
+	is_option = option_types != 0
+
+	# candidate i holds strike combination rows[i] with quantity combination quantity_rows[i]
+	rows = np.repeat(np.arange(len(strike_combos)), len(quantity_combos))
+	quantity_rows = np.tile(np.arange(len(quantity_combos)), len(strike_combos))
+
+	strike_indices = strike_combos[rows][:, slots] if strike_combos.shape[1] else np.zeros((len(rows), len(legs)), int)
+	leg_strikes = np.where(is_option, strikes[strike_indices], 0)
+	leg_premiums = np.where(option_types == 1, call_premiums[strike_indices], put_premiums[strike_indices])
+	leg_premiums = np.where(is_option, leg_premiums, spot)
+	leg_quantities = quantity_combos[quantity_rows]
+
+	metrics = spreadMetrics(option_types, positions, leg_strikes, leg_premiums * scoring["carry"], leg_quantities,
+		spot, upper=scoring["upper"], lower=scoring["lower"], move=scoring["move"], forward=scoring["forward"])
+
+	# the Instrument Panel can't draw options priced at (or above) their strike
+	valid = np.all(~is_option | ((leg_premiums >= MIN_PREMIUM) & (leg_premiums < leg_strikes)), axis=1)
+	if max_loss is not None:
+		valid &= metrics["max_loss"] >= -max_loss
+
+	return [candidateResult(legs, {name: values[i] for name, values in metrics.items()}, objective,
+		leg_strikes[i], leg_premiums[i], leg_quantities[i])
+		for i in topCandidates(metrics[objective], valid, top, metrics[TIEBREAK])]
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Search the strikes and quantities of a strategy template.")
+	parser.add_argument("template", choices=TEMPLATES, help="strategy template")
+	parser.add_argument("--spot", type=float, required=True, help="price of the underlying today")
+	parser.add_argument("--strikes", type=float, nargs=3, metavar=("LOW", "HIGH", "STEP"),
+		help="strike grid (default: every whole number from 0.6x to 1.3x the spot)")
+	parser.add_argument("--quantities", type=float, nargs="+", default=[1], help="quantities to try for every leg")
+	parser.add_argument("--objective", choices=METRICS, default="profit_per_risk", help="metric to maximise")
+	parser.add_argument("--max-loss", type=float, help="largest loss at expiry allowed")
+	parser.add_argument("--top", type=int, default=10, help="number of results")
+	parser.add_argument("--time-to-expiry", type=float, default=0.25, help="in years")
+	parser.add_argument("--volatility", type=float, default=0.2, help="annual, as a decimal")
+	parser.add_argument("--rate", type=float, default=0.01, help="annual risk-free rate, as a decimal")
+	parser.add_argument("--processes", type=int, help="number of worker processes (default: every core)")
+	args = parser.parse_args(argv)
+
+	strikes = None
+	if args.strikes:
+		low, high, step = args.strikes
+		strikes = np.arange(low, high + step / 2, step)
+
+	results = optimize(args.template, args.spot, strikes, args.quantities, args.objective, args.max_loss, args.top,
+		args.time_to_expiry, args.volatility, args.rate, args.processes)
+
+	for result in results:
+		legs = ", ".join(f"{leg['inst_config']['quantity']}x {leg['inst_config']['position']} " +
+			(f"{leg['inst_config']['option_type']} {leg['inst_config']['strike']} @ {leg['inst_config']['price']}"
+			if leg["inst"] == "option" else f"stock @ {leg['inst_config']['price']}") for leg in result["lines_config"])
+		print(f"{result['score']:10.3f}  max profit {formatAmount(result['max_profit'])}  "
+			f"max loss {formatAmount(result['max_loss'])}  {legs}")
+
+	if not results:
+		print("no candidate meets the constraints", file=sys.stderr)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,267 @@
+# This module represents payoff patterns exactly, as continuous piecewise
+# linear functions (breakpoints plus slopes), rather than as sampled x/y arrays.
+# Legs can be added together into a strategy, which can then be evaluated at
+# any price and analysed (breakevens, max profit/loss) in closed form.
+# Sampling only has to happen when the payoff is drawn.
+import numpy as np
+
+# the underlying price can't fall below zero
+MIN_PRICE = 0
+
+
+class PiecewiseLinear():
+	"""
+	A continuous piecewise linear function, stored as sorted $breakpoints, the
+	function's $values at those breakpoints, and the slopes to the left of the
+	first and to the right of the last breakpoint.
+	"""
+	def __init__(self, breakpoints, values, left_slope, right_slope):
+		self.breakpoints = np.asarray(breakpoints, dtype=float)
+		self.values = np.asarray(values, dtype=float)
+		self.left_slope = float(left_slope)
+		self.right_slope = float(right_slope)
+
+	def __call__(self, x):
+		"""
+		Evaluate the function at $x (a number or an array). np.interp binary
+		searches the breakpoints, so each evaluation is O(log n).
+		"""
+		x = np.asarray(x, dtype=float)
+		b, v = self.breakpoints, self.values
+
+		y = np.interp(x, b, v)
+		y = np.where(x < b[0], v[0] + self.left_slope * (x - b[0]), y)
+		y = np.where(x > b[-1], v[-1] + self.right_slope * (x - b[-1]), y)
+
+		if y.ndim == 0:
+			return float(y)
+		return y
+
+	def __add__(self, other):
+		if other == 0:
+			# allows sum() to be used on a list of payoffs
+			return self
+		return sumPayoffs([self, other])
+
+	__radd__ = __add__
+
+	def __mul__(self, weight):
+		return PiecewiseLinear(self.breakpoints, self.values * weight,
+			self.left_slope * weight, self.right_slope * weight)
+
+	__rmul__ = __mul__
+
+	def slopes(self):
+		""" Return the slope of every segment, including both open ends """
+		inner = np.diff(self.values) / np.diff(self.breakpoints)
+		return np.concatenate(([self.left_slope], inner, [self.right_slope]))
+
+	def breakevens(self):
+		"""
+		Return a sorted array of the exact prices (>= MIN_PRICE) at which the
+		function is zero. Where the function is zero along a whole segment, the
+		segment's ends are returned.
+		"""
+		b, v = self.breakpoints, self.values
+		roots = list(b[v == 0])
+
+		# roots strictly inside of a segment between two breakpoints
+		crossing = np.sign(v[:-1]) * np.sign(v[1:]) < 0
+		x0, x1 = b[:-1][crossing], b[1:][crossing]
+		y0, y1 = v[:-1][crossing], v[1:][crossing]
+		roots.extend(x0 - y0 * (x1 - x0) / (y1 - y0))
+
+		# roots on the open ends
+		if self.left_slope != 0 and v[0] != 0:
+			root = b[0] - v[0] / self.left_slope
+			if root < b[0]:
+				roots.append(root)
+		if self.right_slope != 0 and v[-1] != 0:
+			root = b[-1] - v[-1] / self.right_slope
+			if root > b[-1]:
+				roots.append(root)
+
+		roots = np.unique(np.asarray(roots, dtype=float))
+		return roots[roots >= MIN_PRICE]
+
+	def maxProfit(self):
+		""" Return the largest value of the function (np.inf if it is unbounded) """
+		if self.right_slope > 0:
+			return np.inf
+		return float(np.max(self._extremeValues()))
+
+	def maxLoss(self):
+		""" Return the smallest value of the function (-np.inf if it is unbounded) """
+		if self.right_slope < 0:
+			return -np.inf
+		return float(np.min(self._extremeValues()))
+
+	def sample(self, x):
+		""" Return $x and the function evaluated on it, ready for plotting """
+		x = np.asarray(x, dtype=float)
+		return x, self(x)
+
+	def _extremeValues(self):
+		"""
+		Return the function's values at every point it can take an extreme
+		value on [MIN_PRICE, inf): MIN_PRICE and every breakpoint above it.
+		"""
+		b = self.breakpoints[self.breakpoints >= MIN_PRICE]
+		return np.concatenate(([self(MIN_PRICE)], self(b)))
+
+
+def sumPayoffs(payoffs):
+	""" Add a list of PiecewiseLinear functions into a single one """
+	if len(payoffs) == 0:
+		# an empty strategy pays nothing anywhere
+		return PiecewiseLinear([MIN_PRICE], [0], 0, 0)
+
+	breakpoints = np.unique(np.concatenate([payoff.breakpoints for payoff in payoffs]))
+	values = np.zeros(len(breakpoints))
+	left_slope, right_slope = 0, 0
+
+	for payoff in payoffs:
+		values += payoff(breakpoints)
+		left_slope += payoff.left_slope
+		right_slope += payoff.right_slope
+
+	return PiecewiseLinear(breakpoints, values, left_slope, right_slope)
+
+
+def analysePayoffs(groups, prices=None):
+	"""
+	Analyse the sum of every list of PiecewiseLinear payoffs in $groups (e.g.
+	the legs of many strategies) at once, as sumPayoffs(group).breakevens(),
+	.maxProfit() and .maxLoss() would, and evaluate each sum at $prices.
+
+	Every payoff is it's value at it's first breakpoint, plus it's left slope
+	times the distance from it, plus a kink (the change in slope) times
+	max(x - breakpoint, 0) at every breakpoint. So each sum's values at all
+	of it's breakpoints are cumulative sums over it's breakpoints in order,
+	and every group is analysed by the same few array operations.
+
+	Return a dictionary of "breakevens" (a list of sorted arrays), 
+	"max_profit" and "max_loss" (arrays, +/-inf when unbounded) and, with
+	$prices, "profit_at" (a groups x prices array).
+	"""
+	# an empty group pays nothing anywhere, as sumPayoffs([]) does
+	groups = [group if len(group) else [PiecewiseLinear([MIN_PRICE], [0], 0, 0)] for group in groups]
+	payoffs = [payoff for group in groups for payoff in group]
+	counts = np.array([len(group) for group in groups])
+
+	breakpoints = np.concatenate([payoff.breakpoints for payoff in payoffs])
+	kinks = np.concatenate([np.diff(payoff.slopes()) for payoff in payoffs])
+	points = np.array([len(payoff.breakpoints) for payoff in payoffs])
+	left_slopes = np.array([payoff.left_slope for payoff in payoffs])
+	right_slopes = np.array([payoff.right_slope for payoff in payoffs])
+	anchors = np.array([payoff.values[0] - payoff.left_slope * payoff.breakpoints[0] for payoff in payoffs])
+
+	# the group of every payoff and every breakpoint
+	strategies = len(groups)
+	payoff_owner = np.repeat(np.arange(strategies), counts)
+	owner = np.repeat(payoff_owner, points)
+	constant = np.bincount(payoff_owner, anchors, strategies)
+	left_slope = np.bincount(payoff_owner, left_slopes, strategies)
+	# (summed from the payoffs' own right slopes, as the inner slopes are only accurate to rounding)
+	right_slope = np.bincount(payoff_owner, right_slopes, strategies)
+
+	# each group's breakpoints in order, and it's sum at every one of them
+	sizes = np.bincount(owner, minlength=strategies)
+	starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+	order = np.lexsort((breakpoints, owner))
+	breakpoints, kinks = breakpoints[order], kinks[order]
+	values = (constant[owner] + left_slope[owner] * breakpoints + breakpoints * _segmentCumsum(kinks, starts, sizes)
+		- _segmentCumsum(kinks * breakpoints, starts, sizes))
+
+	# extremes are at MIN_PRICE or a breakpoint above it, unless the sum is unbounded to the right
+	at_min_price = (constant + left_slope * MIN_PRICE
+		+ np.bincount(owner, kinks * np.maximum(MIN_PRICE - breakpoints, 0), strategies))
+	above = breakpoints >= MIN_PRICE
+	max_profit = np.maximum(at_min_price, np.maximum.reduceat(np.where(above, values, -np.inf), starts))
+	max_loss = np.minimum(at_min_price, np.minimum.reduceat(np.where(above, values, np.inf), starts))
+	max_profit = np.where(right_slope > 0, np.inf, max_profit)
+	max_loss = np.where(right_slope < 0, -np.inf, max_loss)
+
+	# breakevens: on a breakpoint, between two of a group's breakpoints, and on either open end
+	first, last = starts, starts + sizes - 1
+	b0, b1, v0, v1 = breakpoints[:-1], breakpoints[1:], values[:-1], values[1:]
+	crossing = (owner[1:] == owner[:-1]) & (np.sign(v0) * np.sign(v1) < 0)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		between = b0 - v0 * (b1 - b0) / (v1 - v0)
+		left = breakpoints[first] - values[first] / left_slope
+		right = breakpoints[last] - values[last] / right_slope
+	left_root = (left_slope != 0) & (values[first] != 0) & (left < breakpoints[first])
+	right_root = (right_slope != 0) & (values[last] != 0) & (right > breakpoints[last])
+
+	roots = np.concatenate((breakpoints[values == 0], between[crossing], left[left_root], right[right_root]))
+	root_owner = np.concatenate((owner[values == 0], owner[:-1][crossing], np.flatnonzero(left_root),
+		np.flatnonzero(right_root)))
+	keep = roots >= MIN_PRICE
+	roots, root_owner = roots[keep], root_owner[keep]
+
+	# sort each group's roots and drop repeats
+	order = np.lexsort((roots, root_owner))
+	roots, root_owner = roots[order], root_owner[order]
+	unique = np.ones(len(roots), dtype=bool)
+	unique[1:] = (roots[1:] != roots[:-1]) | (root_owner[1:] != root_owner[:-1])
+	roots, root_owner = roots[unique], root_owner[unique]
+	breakevens = np.split(roots, np.cumsum(np.bincount(root_owner, minlength=strategies))[:-1])
+
+	analysis = {"breakevens": breakevens, "max_profit": max_profit, "max_loss": max_loss}
+	if prices is not None:
+		prices = np.asarray(prices, dtype=float)
+		kinked = np.add.reduceat(kinks[:, np.newaxis] * np.maximum(prices - breakpoints[:, np.newaxis], 0), starts)
+		analysis["profit_at"] = constant[:, np.newaxis] + left_slope[:, np.newaxis] * prices + kinked
+
+	return analysis
+
+
+def _segmentCumsum(values, starts, sizes):
+	""" Return the cumulative sum of $values restarted at every segment's start """
+	total = np.cumsum(values)
+	return total - np.repeat(total[starts] - values[starts], sizes)
+
+
+def optionPayoff(option_type, position, price, strike):
+	"""
+	Return the payoff of an option at expiry, as a PiecewiseLinear
+	option_type: 1 = call; 2 = put
+	position: 1 = long; 2 = short
+	"""
+	if option_type == 1:
+		# a long call is flat at -(price) up to the strike, then rises
+		payoff = PiecewiseLinear([strike], [-price], 0, 1)
+	else:
+		# a long put falls to -(price) at the strike, then is flat
+		payoff = PiecewiseLinear([strike], [-price], -1, 0)
+
+	if position == 2:
+		payoff = payoff * -1
+	return payoff
+
+
+def linearPayoff(position, price):
+	"""
+	Return the payoff of a stock or futures position, as a PiecewiseLinear
+	position: 1 = long; 2 = short
+	"""
+	payoff = PiecewiseLinear([price], [0], 1, 1)
+
+	if position == 2:
+		payoff = payoff * -1
+	return payoff
+
+
+def linePayoff(line):
+	""" Return the PiecewiseLinear payoff of an Option, Asset or Futures instance, for all of it's units """
+	if line.instrument_type == 1:
+		payoff = optionPayoff(line.option_type, line.position, line.price, line.strike)
+	elif hasattr(line, "delivery_price"):
+		payoff = linearPayoff(line.position, line.delivery_price)
+	else:
+		payoff = linearPayoff(line.position, line.price)
+
+	weight = line.quantity * line.multiplier
+	if weight != 1:
+		payoff = payoff * weight
+	return payoff
@@ -0,0 +1,119 @@
+# This module values options before expiry with the Black-Scholes model. The
+# kernels are vectorised: spot prices, strikes, times to expiry, volatilities
+# and rates may all be NumPy arrays which broadcast together, so pricing a
+# whole grid of spots for a whole book of legs is one array operation.
+import numpy as np
+
+
+def normCdf(x):
+	"""
+	Standard normal cumulative distribution function, vectorised. Uses the
+	complementary error function approximation from Numerical Recipes
+	(fractional error below 1.2e-7), so SciPy isn't required.
+	"""
+	x = np.asarray(x, dtype=float)
+	z = np.abs(x) / np.sqrt(2)
+	t = 1 / (1 + 0.5 * z)
+	erfc = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 +
+		t * (-0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 +
+		t * (-0.82215223 + t * 0.17087277)))))))))
+	return np.where(x >= 0, 1 - 0.5 * erfc, 0.5 * erfc)
+
+
+def normPdf(x):
+	""" Standard normal probability density function, vectorised """
+	x = np.asarray(x, dtype=float)
+	return np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+
+
+def _d1d2(spot, strike, time_to_expiry, volatility, rate):
+	""" Return Black-Scholes d1, d2 and vol * sqrt(time), all broadcast together """
+	vol_sqrt_t = volatility * np.sqrt(time_to_expiry)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		d1 = (np.log(spot / strike) + (rate + 0.5 * volatility ** 2) * time_to_expiry) / vol_sqrt_t
+	d2 = d1 - vol_sqrt_t
+	return d1, d2, vol_sqrt_t
+
+
+def blackScholes(option_type, spot, strike, time_to_expiry, volatility, rate):
+	"""
+	Return the Black-Scholes value of a European option.
+	option_type: 1 = call; 2 = put (a number or an array)
+	time_to_expiry is in years, volatility and rate are annual decimals (0.2 = 20%).
+	Options at (or past) expiry, or with no volatility, are worth their
+	discounted intrinsic value.
+	"""
+	spot = np.asarray(spot, dtype=float)
+	strike = np.asarray(strike, dtype=float)
+	time_to_expiry = np.maximum(np.asarray(time_to_expiry, dtype=float), 0)
+	volatility = np.asarray(volatility, dtype=float)
+	rate = np.asarray(rate, dtype=float)
+	is_call = np.asarray(option_type) == 1
+
+	discounted_strike = strike * np.exp(-rate * time_to_expiry)
+	d1, d2, vol_sqrt_t = _d1d2(spot, strike, time_to_expiry, volatility, rate)
+
+	call = spot * normCdf(d1) - discounted_strike * normCdf(d2)
+	put = discounted_strike * normCdf(-d2) - spot * normCdf(-d1)
+	value = np.where(is_call, call, put)
+
+	# with no time or volatility left, the option is worth it's intrinsic value
+	intrinsic = np.where(is_call, np.maximum(spot - discounted_strike, 0), np.maximum(discounted_strike - spot, 0))
+	return np.where(vol_sqrt_t > 0, value, intrinsic)
+
+
+# the Greeks greeks() returns, in order
+GREEKS = ("delta", "gamma", "theta", "vega", "rho")
+
+
+def greeks(option_type, spot, strike, time_to_expiry, volatility, rate, names=GREEKS):
+	"""
+	Return a dictionary of the Black-Scholes Greeks in $names of a long 
+	European option, each an array broadcast over the inputs (see 
+	blackScholes()):
+		delta: change in value per 1 change in spot
+		gamma: change in delta per 1 change in spot
+		theta: change in value per calendar day passing
+		vega: change in value per 1 percentage point rise in volatility
+		rho: change in value per 1 percentage point rise in the rate
+	At expiry (or with no volatility) delta is 1 (calls) or -1 (puts) when
+	in-the-money and everything else is 0.
+	"""
+	spot = np.asarray(spot, dtype=float)
+	strike = np.asarray(strike, dtype=float)
+	time_to_expiry = np.maximum(np.asarray(time_to_expiry, dtype=float), 0)
+	volatility = np.asarray(volatility, dtype=float)
+	rate = np.asarray(rate, dtype=float)
+	is_call = np.asarray(option_type) == 1
+
+	discounted_strike = strike * np.exp(-rate * time_to_expiry)
+	d1, d2, vol_sqrt_t = _d1d2(spot, strike, time_to_expiry, volatility, rate)
+	sqrt_t = np.sqrt(time_to_expiry)
+
+	# options with no time or volatility left behave like their payoff
+	alive = vol_sqrt_t > 0
+
+	values = {}
+	with np.errstate(divide="ignore", invalid="ignore"):
+		if "delta" in names:
+			expired_delta = np.where(is_call, (spot > strike) * 1.0, (spot < strike) * -1.0)
+			delta = np.where(is_call, normCdf(d1), normCdf(d1) - 1)
+			values["delta"] = np.where(alive, delta, expired_delta)
+		if "gamma" in names:
+			gamma = normPdf(d1) / (spot * vol_sqrt_t)
+			values["gamma"] = np.where(alive, gamma, 0)
+		if "theta" in names:
+			decay = -spot * normPdf(d1) * volatility / (2 * sqrt_t)
+			theta = np.where(is_call, decay - rate * discounted_strike * normCdf(d2),
+				decay + rate * discounted_strike * normCdf(-d2)) / 365
+			values["theta"] = np.where(alive, theta, 0)
+		if "vega" in names:
+			vega = spot * normPdf(d1) * sqrt_t / 100
+			values["vega"] = np.where(alive, vega, 0)
+		if "rho" in names:
+			rho = np.where(is_call, time_to_expiry * discounted_strike * normCdf(d2),
+				-time_to_expiry * discounted_strike * normCdf(-d2)) / 100
+			values["rho"] = np.where(alive, rho, 0)
+
+	# a spot of 0 gives 0/0 for some Greeks, where they are 0
+	return {greek: np.nan_to_num(value) for greek, value in values.items()}
@@ -0,0 +1,129 @@
+# This module holds opt-in instrumentation for the GUI's hot paths. A Profiler
+# times "frames" (a call of updateGraph, moveScale, resize, ...) and the phases
+# inside of them, keeps the latest timings of each in a rolling window for
+# percentiles, and can dump them as a trace file which chrome://tracing or
+# https://ui.perfetto.dev can display.
+#
+# Methods are timed by decorating them with @profiled(), and phases are marked
+# with laps: self.profiler.lap("ticks") records the time since the frame
+# started (or since the last lap) as the "ticks" phase. When the profiler is
+# disabled, both cost a single attribute check.
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from functools import wraps
+
+# the number of timings kept per frame and phase for percentiles
+WINDOW = 500
+
+# the number of trace events kept for dumpTrace()
+TRACE_EVENTS = 20000
+
+PERCENTILES = (50, 90, 99)
+
+
+class Profiler():
+	""" Records frame and phase timings while $enabled """
+	def __init__(self, enabled=False, window=WINDOW):
+		self.enabled = enabled
+		self.window = window
+		self.reset()
+
+	def reset(self):
+		""" Forget every timing """
+		self.timings = defaultdict(lambda: deque(maxlen=self.window))	# (frame, phase) -> seconds
+		self.calls = defaultdict(int)									# (frame, phase) -> count
+		self.trace = deque(maxlen=TRACE_EVENTS)
+		self._stack = []
+		self._origin = time.perf_counter()
+
+	def frame(self, name):
+		""" Return a context manager timing a call of $name, the phases inside of it are lapped """
+		return _Frame(self, name)
+
+	def lap(self, phase):
+		""" Record the time since the current frame started (or it's last lap) as $phase """
+		if not self.enabled or not self._stack:
+			return
+
+		frame = self._stack[-1]
+		now = time.perf_counter()
+		self._record(frame["name"], phase, frame["lap"], now)
+		frame["lap"] = now
+
+	def percentiles(self, frame, phase=None, percentiles=PERCENTILES):
+		""" Return a dictionary of percentile to seconds of $frame (or of it's $phase) """
+		timings = sorted(self.timings.get((frame, phase), ()))
+		if not timings:
+			return {}
+		return {p: timings[min(int(len(timings) * p / 100), len(timings) - 1)] for p in percentiles}
+
+	def summary(self):
+		"""
+		Return {frame: {phase: {"calls", "mean", percentile: seconds, ...}}} with
+		the whole frame under the phase None
+		"""
+		summary = defaultdict(dict)
+		for (frame, phase), timings in self.timings.items():
+			summary[frame][phase] = {"calls": self.calls[(frame, phase)], "mean": sum(timings) / len(timings),
+				**self.percentiles(frame, phase)}
+		return dict(summary)
+
+	def report(self):
+		""" Return the summary as a table, in milliseconds """
+		rows = [f"{'frame / phase':36} {'calls':>7} {'mean':>8} " + " ".join(f"{'p' + str(p):>8}" for p in PERCENTILES)]
+		for frame, phases in self.summary().items():
+			for phase, stats in sorted(phases.items(), key=lambda item: item[0] is not None):
+				name = frame if phase is None else f"  {phase}"
+				rows.append(f"{name:36} {stats['calls']:7} {stats['mean'] * 1000:8.2f} " +
+					" ".join(f"{stats[p] * 1000:8.2f}" for p in PERCENTILES))
+		return "\n".join(rows)
+
+	def dumpTrace(self, path):
+		""" Write the recorded frames and phases to $path in the Chrome trace event format """
+		with open(path, "w") as file:
+			json.dump({"traceEvents": list(self.trace), "displayTimeUnit": "ms"}, file)
+
+	def _record(self, frame, phase, start, end):
+		key = (frame, phase)
+		self.timings[key].append(end - start)
+		self.calls[key] += 1
+		self.trace.append({"name": frame if phase is None else phase, "cat": frame, "ph": "X",
+			"ts": (start - self._origin) * 1e6, "dur": (end - start) * 1e6,
+			"pid": os.getpid(), "tid": threading.get_ident()})
+
+
+class _Frame():
+	def __init__(self, profiler, name):
+		self.profiler = profiler
+		self.name = name
+
+	def __enter__(self):
+		if self.profiler.enabled:
+			now = time.perf_counter()
+			self.profiler._stack.append({"name": self.name, "start": now, "lap": now})
+		return self
+
+	def __exit__(self, *exc):
+		profiler = self.profiler
+		if profiler._stack and profiler._stack[-1]["name"] == self.name:
+			frame = profiler._stack.pop()
+			profiler._record(self.name, None, frame["start"], time.perf_counter())
+		return False
+
+
+def profiled(name=None):
+	""" Decorate a method so that every call is timed as a frame by it's instance's self.profiler """
+	def decorator(method):
+		frame = name or method.__name__
+
+		@wraps(method)
+		def wrapper(self, *args, **kwargs):
+			if not self.profiler.enabled:
+				return method(self, *args, **kwargs)
+			with self.profiler.frame(frame):
+				return method(self, *args, **kwargs)
+		return wrapper
+	return decorator
@@ -0,0 +1,190 @@
+# This module holds helpers which schedule GUI work with Tkinter's after() and
+# after_idle(), so that bursts of events (e.g. a scale being dragged) don't
+# each trigger an expensive redraw, and so that slow computations can run off
+# of the Tkinter thread.
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RedrawScheduler():
+	"""
+	Coalesces redraw requests so that $callback runs at most once per frame
+	(1/$fps seconds). Requests made while a redraw is pending are merged into
+	it. The callback reads the current state when it runs, so the last value
+	requested is always the one drawn.
+	"""
+	def __init__(self, widget, callback, fps=30):
+		self.widget = widget			# any Tkinter widget, used for after()
+		self.callback = callback
+		self.fps = fps
+		self._after_id = None
+		self._last_run = 0
+
+	def request(self):
+		""" Ask for a redraw, which will run on the next free frame """
+		if self._after_id is not None:
+			# a redraw is already pending, it will pick up this request too
+			return
+
+		# milliseconds left until the next frame is due
+		frame_ms = 1000 / self.fps
+		elapsed_ms = (time.perf_counter() - self._last_run) * 1000
+		delay = int(frame_ms - elapsed_ms)
+
+		if delay <= 0:
+			self._after_id = self.widget.after_idle(self._run)
+		else:
+			self._after_id = self.widget.after(delay, self._run)
+
+	def flush(self):
+		""" Run a pending redraw now """
+		if self._after_id is not None:
+			self.cancel()
+			self._run()
+
+	def cancel(self):
+		""" Drop a pending redraw without running it """
+		if self._after_id is not None:
+			self.widget.after_cancel(self._after_id)
+			self._after_id = None
+
+	def _run(self):
+		self._after_id = None
+		self._last_run = time.perf_counter()
+		self.callback()
+
+
+class ResizeManager():
+	"""
+	Handles a toplevel window's <Configure> events. Events from child widgets
+	and events which don't change the window's size (e.g. moves) are ignored.
+	A burst of resizes runs $callback at most once per idle loop, and
+	$settle_callback once the size has stopped changing for $delay ms (e.g.
+	at the end of a window drag).
+	"""
+	def __init__(self, toplevel, callback, settle_callback=None, delay=150):
+		self.toplevel = toplevel
+		self.callback = callback
+		self.settle_callback = settle_callback
+		self.delay = delay
+		self._size = None
+		self._idle_id = None
+		self._settle_id = None
+
+	def onConfigure(self, event):
+		""" bind this to the toplevel's <Configure> event """
+		if event.widget is not self.toplevel:
+			# binding to a toplevel also delivers every child's events
+			return
+
+		size = (event.width, event.height)
+		if size == self._size:
+			return
+		self._size = size
+
+		if self._idle_id is None:
+			self._idle_id = self.toplevel.after_idle(self._resize)
+
+		if self.settle_callback is not None:
+			if self._settle_id is not None:
+				self.toplevel.after_cancel(self._settle_id)
+			self._settle_id = self.toplevel.after(self.delay, self._settle)
+
+	def _resize(self):
+		self._idle_id = None
+		self.callback()
+
+	def _settle(self):
+		self._settle_id = None
+		self.settle_callback()
+
+
+class BackgroundTask():
+	"""
+	Runs functions in a worker thread, so that the GUI stays responsive while
+	they compute (NumPy releases the GIL during large array operations). 
+	Tkinter isn't thread safe, so the worker never touches widgets: $widget 
+	polls for the result every $poll ms with after(), and hands it to the 
+	callback on the Tkinter thread.
+
+	Runs share a single worker thread. Only the latest run's result is
+	delivered: a new run (or cancel()) drops an older one that hasn't started,
+	and tells a running one it's cancelled, so a long job that checks for it
+	(see run()) stops early rather than holding the worker. An exception
+	raised by a run is handed to $error_callback on the Tkinter thread, or
+	printed to stderr when there is none.
+	"""
+	def __init__(self, widget, poll=30, error_callback=None):
+		self.widget = widget
+		self.poll = poll
+		self.error_callback = error_callback
+		self._executor = ThreadPoolExecutor(max_workers=1)
+		self._future = None
+		self._cancelled = threading.Event()
+		self._result = None
+		self._after_id = None
+		self._lock = threading.Lock()
+
+	def run(self, function, callback, *args, cancellable=False):
+		"""
+		Compute function(*args) in the background, then call callback(result).
+		With $cancellable, the function is also passed a keyword argument
+		"cancelled": a function returning True once this run was superseded or
+		cancelled, which a long job should check now and then
+		"""
+		self.cancel()
+
+		# every run has it's own flag, so cancelling it can't stop a later one
+		cancelled = threading.Event()
+		with self._lock:
+			self._cancelled = cancelled
+		kwargs = {"cancelled": cancelled.is_set} if cancellable else {}
+		self._future = self._executor.submit(self._work, cancelled, function, args, kwargs)
+
+		self._after_id = self.widget.after(self.poll, self._check, callback)
+
+	def cancel(self):
+		""" Discard the current run: drop it if it hasn't started, and tell it it's cancelled if it has """
+		with self._lock:
+			self._cancelled.set()
+			self._result = None
+
+		if self._future is not None:
+			self._future.cancel()
+			self._future = None
+
+		if self._after_id is not None:
+			self.widget.after_cancel(self._after_id)
+			self._after_id = None
+
+	def _work(self, cancelled, function, args, kwargs):
+		try:
+			result = (function(*args, **kwargs), None)
+		except Exception as error:
+			result = (None, error)
+
+		with self._lock:
+			if not cancelled.is_set():
+				self._result = result
+
+	def _check(self, callback):
+		with self._lock:
+			result = self._result
+			self._result = None
+
+		if result is None:
+			self._after_id = self.widget.after(self.poll, self._check, callback)
+			return
+
+		self._after_id = None
+		self._future = None
+		value, error = result
+		if error is None:
+			callback(value)
+		elif self.error_callback is not None:
+			self.error_callback(error)
+		else:
+			traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
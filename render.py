@@ -0,0 +1,217 @@
+# This module manages the matplotlib artists drawn onto the payoff graph. The
+# artists are created once and then kept alive: updates go through set_data()
+# and set_visible(), and artists which are no longer needed are hidden and
+# recycled, rather than clearing the axes and plotting everything again.
+#
+# In blit mode the artists are animated: a full draw only renders the static
+# background (axes, spines, ticks and labels), which is cached. Later updates
+# restore the cached background and draw just the artists on top of it, and
+# only fall back to a full draw when the axis limits change. The background is
+# the whole figure rather than just the axes, as tick annotations can stick out
+# of the axes and would otherwise leave their old pixels behind.
+import numpy as np
+
+
+class GraphRenderer():
+	"""
+	Owns the artists on $ax: a dashed line per leg, the profit line, today's
+	value line, pools of tick lines and tick annotations, the calculated
+	position line and annotation, and the simulated profit histogram and it's
+	statistics.
+	"""
+	def __init__(self, ax, position_color, canvas=None, blit=False, value_color=(0, 0, 0)):
+		self.ax = ax
+		self.canvas = canvas
+		self.blit = blit and canvas is not None and canvas.supports_blit
+
+		# blit mode state: the cached background, and the limits it was drawn with
+		self._background = None
+		self._background_limits = None
+
+		# leg lines are stored by key (the IP row), hidden ones wait to be reused
+		self.leg_lines = {}
+		self.spare_leg_lines = []
+
+		self.profit_line, = ax.plot([], [], linewidth=2.75, color=(0, 0, 0), visible=False,
+			animated=self.blit)
+
+		# today's value of the strategy, when options are valued before expiry
+		self.value_line, = ax.plot([], [], linewidth=2, color=value_color, visible=False,
+			animated=self.blit)
+
+		# tick lines and their annotations are pooled, the first n are shown
+		self.tick_lines = []
+		self.tick_labels = []
+
+		# calculated position (from the analysis panel) line and annotation
+		self.position_line, = ax.plot([], [], color=position_color, linewidth=2, visible=False,
+			animated=self.blit)
+		self.position_label = ax.annotate("", (0, 0), fontsize=16, color=position_color,
+			fontweight="bold", visible=False, animated=self.blit)
+
+		# the simulated profit histogram is drawn sideways along the y-axis (profit),
+		# with it's statistics in the top right corner
+		self.histogram_line, = ax.plot([], [], color=position_color, linewidth=1.25, visible=False,
+			animated=self.blit)
+		self.stats_label = ax.text(0.98, 0.97, "", transform=ax.transAxes, ha="right", va="top",
+			fontsize=11, color=(0, 0, 0), visible=False, animated=self.blit)
+
+		if self.blit:
+			# every full draw (including those Tkinter triggers, e.g. on resize)
+			# refreshes the cached background
+			self.canvas.mpl_connect("draw_event", self._onDraw)
+
+	def setLegs(self, legs):
+		""" Show the dashed line of every leg in $legs, a dictionary of key to (x, y) """
+		for key in list(self.leg_lines):
+			if key not in legs:
+				line = self.leg_lines.pop(key)
+				line.set_visible(False)
+				self.spare_leg_lines.append(line)
+
+		for key, (x, y) in legs.items():
+			line = self.leg_lines.get(key)
+			if line is None:
+				if self.spare_leg_lines:
+					line = self.spare_leg_lines.pop()
+				else:
+					line, = self.ax.plot([], [], color=(0, 0, 0), linestyle='--', dashes=(8,5), linewidth=0.8,
+						animated=self.blit)
+				self.leg_lines[key] = line
+
+			line.set_data(x, y)
+			line.set_visible(True)
+
+	def setProfit(self, x, y):
+		""" Show the profit line """
+		self.profit_line.set_data(x, y)
+		self.profit_line.set_visible(True)
+
+	def hideProfit(self):
+		self.profit_line.set_visible(False)
+
+	def setValue(self, x, y):
+		""" Show the line of today's value """
+		self.value_line.set_data(x, y)
+		self.value_line.set_visible(True)
+
+	def hideValue(self):
+		self.value_line.set_visible(False)
+
+	def setTicks(self, ticks):
+		"""
+		Show a tick for every (x, height, text, ha) in $ticks: a vertical line
+		from 0 to $height at $x, annotated with $text above it.
+		"""
+		while len(self.tick_lines) < len(ticks):
+			line, = self.ax.plot([], [], color=(0, 0, 0), linewidth=1.75, visible=False,
+				animated=self.blit)
+			label = self.ax.annotate("", (0, 0), color=(0, 0, 0), fontsize=12, visible=False,
+				animated=self.blit)
+			self.tick_lines.append(line)
+			self.tick_labels.append(label)
+
+		for i, (x, height, text, ha) in enumerate(ticks):
+			self.tick_lines[i].set_data([x, x], [0, height])
+			self.tick_lines[i].set_visible(True)
+
+			label = self.tick_labels[i]
+			label.set_text(text)
+			label.xy = (x, height * 1.4)
+			label.set_position((x, height * 1.4))
+			label.set_horizontalalignment(ha)
+			label.set_visible(True)
+
+		for i in range(len(ticks), len(self.tick_lines)):
+			self.tick_lines[i].set_visible(False)
+			self.tick_labels[i].set_visible(False)
+
+	def setPosition(self, x, text):
+		""" Show a vertical line across the graph at $x, annotated with $text """
+		y_min, y_max = self.ax.get_ylim()
+		self.position_line.set_data([x, x], [y_min, y_max])
+		self.position_line.set_visible(True)
+
+		self.position_label.set_text(text)
+		self.position_label.xy = (x * 1.01, y_max * 0.88)
+		self.position_label.set_position((x * 1.01, y_max * 0.88))
+		self.position_label.set_visible(True)
+
+	def hidePosition(self):
+		self.position_line.set_visible(False)
+		self.position_label.set_visible(False)
+
+	def setHistogram(self, edges, counts, x, width):
+		"""
+		Show the histogram of profits with bin $edges and $counts as bars 
+		starting at $x, the tallest bar being $width long
+		"""
+		lengths = np.asarray(counts, dtype=float) / max(np.max(counts), 1) * width
+
+		# outline every bar: out along it's lower edge, then back along it's upper edge
+		hist_x = np.repeat(x + lengths, 2)
+		hist_y = np.column_stack((edges[:-1], edges[1:])).ravel()
+		self.histogram_line.set_data(np.concatenate(([x], hist_x, [x])),
+			np.concatenate(([edges[0]], hist_y, [edges[-1]])))
+		self.histogram_line.set_visible(True)
+
+	def setStats(self, text):
+		""" Show $text in the top right corner of the graph """
+		self.stats_label.set_text(text)
+		self.stats_label.set_visible(True)
+
+	def hideSimulation(self):
+		self.histogram_line.set_visible(False)
+		self.stats_label.set_visible(False)
+
+	def hide(self):
+		""" Hide every artist """
+		self.setLegs({})
+		self.hideProfit()
+		self.hideValue()
+		self.setTicks([])
+		self.hidePosition()
+		self.hideSimulation()
+
+	def draw(self):
+		"""
+		Draw the graph onto the canvas. In blit mode only the artists are
+		redrawn over the cached background, unless the axis limits changed
+		since it was cached.
+		"""
+		if not self.blit:
+			self.canvas.draw()
+			return
+
+		if self._background is None or self._limits() != self._background_limits:
+			# _onDraw caches the new background and draws the artists
+			self.canvas.draw()
+			return
+
+		self.canvas.restore_region(self._background)
+		self._drawArtists()
+		self.canvas.blit(self.ax.figure.bbox)
+
+	def invalidate(self):
+		""" Force the next draw() to be a full draw """
+		self._background = None
+
+	def artists(self):
+		""" Return every artist owned by the renderer """
+		return (list(self.leg_lines.values()) + self.spare_leg_lines + [self.profit_line, self.value_line] +
+			self.tick_lines + self.tick_labels + [self.position_line, self.position_label] +
+			[self.histogram_line, self.stats_label])
+
+	def _limits(self):
+		return (self.ax.get_xlim(), self.ax.get_ylim())
+
+	def _onDraw(self, event):
+		""" cache the freshly drawn background, then draw the artists over it """
+		self._background = self.canvas.copy_from_bbox(self.ax.figure.bbox)
+		self._background_limits = self._limits()
+		self._drawArtists()
+
+	def _drawArtists(self):
+		for artist in self.artists():
+			if artist.get_visible():
+				self.ax.draw_artist(artist)
@@ -0,0 +1,250 @@
+# This module scans an option chain for the best spreads. A chain is loaded from
+# a CSV file (a strike, call bid/ask and put bid/ask per row), and every
+# vertical, straddle, strangle, collar and butterfly it's strikes can make is
+# enumerated and scored.
+#
+# Strike combinations are built as NumPy index arrays (np.triu_indices and
+# broadcasts of index ranges) rather than by nested loops, and each batch of
+# candidates is priced from the chain's quotes by fancy indexing and scored
+# with the inst_functions kernels in a few array operations (see
+# optimizer.spreadMetrics()). Long legs are bought at the ask and short legs
+# sold at the bid. Candidates are ranked by their expected profit over the move
+# the chain's at the money straddle prices in, and their profits are only
+# counted within a few standard deviations of it, so neither far out of the
+# money lottery tickets nor spreads with unbounded profits crowd the results.
+#
+# e.g.
+#	chain = loadChain("chain.csv")
+#	results = scanChain(chain, objective="expected_profit", max_loss=5)
+#	results[0]["structure"], results[0]["lines_config"]
+#
+#	python scanner.py chain.csv --structures bull_call_spread long_call_butterfly --top 10
+import argparse
+import csv
+import math
+import sys
+
+import numpy as np
+
+from convert import formatAmount, toFloat
+from optimizer import BATCH_SIZE, METRICS, MOVE_DEVIATIONS, TIEBREAK, candidateResult, legCodes, spreadMetrics, \
+	topCandidates
+from pricing import blackScholes
+
+# the columns a chain's CSV file needs (any others are ignored)
+CHAIN_COLUMNS = ("strike", "call_bid", "call_ask", "put_bid", "put_ask")
+
+# by default, candidates must be able to make this much of what they risk (within the chain's implied move)
+MIN_PROFIT_PER_RISK = 0.1
+
+# the legs of each structure, in the format of optimizer.TEMPLATES, and the quantity of each leg
+STRUCTURES = {
+	"bull_call_spread": ((("option", "call", "long", 0), ("option", "call", "short", 1)), (1, 1)),
+	"bear_call_spread": ((("option", "call", "short", 0), ("option", "call", "long", 1)), (1, 1)),
+	"bull_put_spread": ((("option", "put", "long", 0), ("option", "put", "short", 1)), (1, 1)),
+	"bear_put_spread": ((("option", "put", "short", 0), ("option", "put", "long", 1)), (1, 1)),
+	"long_straddle": ((("option", "call", "long", 0), ("option", "put", "long", 0)), (1, 1)),
+	"short_straddle": ((("option", "call", "short", 0), ("option", "put", "short", 0)), (1, 1)),
+	"long_strangle": ((("option", "put", "long", 0), ("option", "call", "long", 1)), (1, 1)),
+	"short_strangle": ((("option", "put", "short", 0), ("option", "call", "short", 1)), (1, 1)),
+	"collar": ((("option", "put", "long", 0), ("option", "call", "short", 1), ("stock", None, "long", None)),
+		(1, 1, 1)),
+	"long_call_butterfly": ((("option", "call", "long", 0), ("option", "call", "short", 1),
+		("option", "call", "long", 2)), (1, 2, 1)),
+	"long_put_butterfly": ((("option", "put", "long", 0), ("option", "put", "short", 1),
+		("option", "put", "long", 2)), (1, 2, 1)),
+}
+
+
+def loadChain(path):
+	"""
+	Load the option chain in the CSV file at $path, which has a header row
+	naming (at least) the CHAIN_COLUMNS. Return a dictionary of column name to
+	array, sorted by strike. Missing quotes are NaN.
+	"""
+	columns = {name: [] for name in CHAIN_COLUMNS}
+	with open(path, newline="") as file:
+		reader = csv.DictReader(file)
+		fields = {field.strip().lower(): field for field in reader.fieldnames or ()}
+		missing = [name for name in CHAIN_COLUMNS if name not in fields]
+		if missing:
+			raise ValueError(f"{path} has no {', '.join(missing)} column")
+
+		for row in reader:
+			for name in CHAIN_COLUMNS:
+				columns[name].append(toFloat(row[fields[name]]))
+
+	chain = {name: np.array(values, dtype=float) for name, values in columns.items()}
+	order = np.argsort(chain["strike"], kind="stable")
+	return {name: values[order] for name, values in chain.items()}
+
+
+def impliedSpot(chain):
+	"""
+	Return the underlying's price implied by put-call parity at the strike
+	where calls and puts are priced closest (ignoring interest), from the
+	middle of each quote
+	"""
+	difference = (chain["call_bid"] + chain["call_ask"]) / 2 - (chain["put_bid"] + chain["put_ask"]) / 2
+	if np.all(np.isnan(difference)):
+		raise ValueError("the chain has no strike with both a call and a put quote")
+	i = np.nanargmin(np.abs(difference))
+	return float(chain["strike"][i] + difference[i])
+
+
+def impliedMove(chain, spot):
+	"""
+	Return the move the chain prices in: the standard deviation of the log
+	price at expiry (volatility * sqrt(time to expiry)) which values the
+	straddle at the strike closest to $spot at it's mid price (ignoring interest)
+	"""
+	straddles = (chain["call_bid"] + chain["call_ask"] + chain["put_bid"] + chain["put_ask"]) / 2
+	quoted = np.flatnonzero(~np.isnan(straddles))
+	if len(quoted) == 0:
+		raise ValueError("the chain has no strike with both a call and a put quote")
+	i = quoted[np.argmin(np.abs(chain["strike"][quoted] - spot))]
+	strike, straddle = chain["strike"][i], straddles[i]
+
+	# a straddle's value rises with the move, so bisect for it
+	low, high = 1e-6, 5.0
+	for iteration in range(60):
+		move = (low + high) / 2
+		value = blackScholes(1, spot, strike, 1, move, 0) + blackScholes(2, spot, strike, 1, move, 0)
+		if value < straddle:
+			low = move
+		else:
+			high = move
+	return (low + high) / 2
+
+
+def strikeCombinations(strikes, slots, batch_size=BATCH_SIZE):
+	""" Yield (candidates x $slots) arrays of every strictly increasing combination of $strikes indices, in batches """
+	if slots == 1:
+		combinations = np.arange(strikes)[:, np.newaxis]
+	elif slots == 2:
+		combinations = np.stack(np.triu_indices(strikes, 1), axis=1)
+	elif slots == 3:
+		# broadcast every lower and upper strike around each middle one
+		batch, size = [], 0
+		for middle in range(1, strikes - 1):
+			lower = np.arange(middle)[:, np.newaxis]
+			upper = np.arange(middle + 1, strikes)[np.newaxis, :]
+			combination = np.stack(np.broadcast_arrays(lower, middle, upper), axis=-1).reshape(-1, 3)
+			batch.append(combination)
+			size += len(combination)
+			if size >= batch_size:
+				yield np.concatenate(batch)
+				batch, size = [], 0
+		if batch:
+			yield np.concatenate(batch)
+		return
+	else:
+		raise ValueError(f"can't combine {slots} strikes")
+
+	for start in range(0, len(combinations), batch_size):
+		yield combinations[start:start + batch_size]
+
+
+def scanChain(chain, spot=None, structures=None, objective="expected_profit", max_loss=None, top=20,
+	batch_size=BATCH_SIZE, min_profit_per_risk=MIN_PROFIT_PER_RISK, cancelled=None):
+	"""
+	Return the $top candidates with the highest $objective (see
+	optimizer.METRICS) of every structure in $structures (names in STRUCTURES,
+	all of them by default) which the $chain (see loadChain()) can make, best
+	first. With $max_loss, candidates which can lose more than it are left out,
+	as are those with a profit_per_risk below $min_profit_per_risk. Stocks are
+	bought at $spot, which is implied by the chain by default (see
+	impliedSpot()).
+
+	Candidates are scored over the move the chain prices in (see
+	impliedMove()): expected profits average over it, and profits are counted
+	within MOVE_DEVIATIONS standard deviations of it, which is usually beyond
+	the chain's strikes.
+
+	Each result is a dictionary of it's "structure", "score", every metric and
+	it's "lines_config" (see optimizer.candidateResult()). $cancelled is an
+	optional function checked between batches: once it returns True, the scan
+	stops and None is returned.
+	"""
+	if objective not in METRICS:
+		raise ValueError(f"unknown objective: {objective}")
+	if spot is None:
+		spot = impliedSpot(chain)
+
+	strikes = chain["strike"]
+	move = impliedMove(chain, spot)
+	scoring = {"lower": spot * math.exp(-MOVE_DEVIATIONS * move), "upper": spot * math.exp(MOVE_DEVIATIONS * move),
+		"move": move}
+
+	# long legs are bought at the ask, short legs are sold at the bid
+	quotes = {(1, 1): chain["call_ask"], (1, 2): chain["call_bid"], (2, 1): chain["put_ask"], (2, 2): chain["put_bid"]}
+
+	results = []
+	for name in structures or STRUCTURES:
+		legs, quantities = STRUCTURES[name]
+		option_types, positions, slots = legCodes(legs)
+		is_option = option_types != 0
+
+		for combinations in strikeCombinations(len(strikes), int(slots[is_option].max()) + 1, batch_size):
+			if cancelled is not None and cancelled():
+				return None
+			indices = combinations[:, slots]
+			leg_strikes = np.where(is_option, strikes[indices], 0)
+			leg_premiums = np.column_stack([quotes[(option_type, position)][indices[:, leg]] if option_type
+				else np.full(len(indices), spot) for leg, (option_type, position) in enumerate(zip(option_types, positions))])
+			leg_quantities = np.broadcast_to(np.asarray(quantities, dtype=float), leg_premiums.shape)
+
+			metrics = spreadMetrics(option_types, positions, leg_strikes, leg_premiums, leg_quantities, spot, **scoring)
+
+			# every leg needs a quote, and the Instrument Panel can't draw options priced at (or above) their strike
+			valid = np.all(~is_option | ((leg_premiums > 0) & (leg_premiums < leg_strikes)), axis=1)
+			if max_loss is not None:
+				valid &= metrics["max_loss"] >= -max_loss
+			if min_profit_per_risk is not None:
+				valid &= metrics["profit_per_risk"] >= min_profit_per_risk
+
+			for i in topCandidates(metrics[objective], valid, top, metrics[TIEBREAK]):
+				result = candidateResult(legs, {key: values[i] for key, values in metrics.items()}, objective,
+					leg_strikes[i], leg_premiums[i], leg_quantities[i])
+				results.append({"structure": name, **result})
+
+		# keep only the best so far, so results stay small however many batches there are
+		results.sort(key=lambda result: (result["score"], result[TIEBREAK]), reverse=True)
+		del results[top:]
+
+	return results
+
+
+def describe(result):
+	""" Return a one line description of the scan $result, e.g. "bull call spread 45/50" """
+	strikes = [str(leg["inst_config"]["strike"]) for leg in result["lines_config"] if leg["inst"] == "option"]
+	return f"{result['structure'].replace('_', ' ')} {'/'.join(dict.fromkeys(strikes))}"
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Scan an option chain for the best spreads.")
+	parser.add_argument("path", help=f"CSV file with the columns {', '.join(CHAIN_COLUMNS)}")
+	parser.add_argument("--spot", type=float, help="price of the underlying (default: implied by the chain)")
+	parser.add_argument("--structures", nargs="+", help=f"structures to scan: {', '.join(STRUCTURES)} (default: all)")
+	parser.add_argument("--objective", choices=METRICS, default="expected_profit", help="metric to maximise")
+	parser.add_argument("--max-loss", type=float, help="largest loss at expiry allowed")
+	parser.add_argument("--min-profit-per-risk", type=float, default=MIN_PROFIT_PER_RISK,
+		help=f"smallest profit per risk allowed (default: {MIN_PROFIT_PER_RISK})")
+	parser.add_argument("--top", type=int, default=20, help="number of results")
+	args = parser.parse_args(argv)
+	for structure in args.structures or ():
+		if structure not in STRUCTURES:
+			parser.error(f"unknown structure: {structure}")
+
+	results = scanChain(loadChain(args.path), args.spot, args.structures, args.objective, args.max_loss, args.top,
+		min_profit_per_risk=args.min_profit_per_risk)
+	for result in results:
+		print(f"{result['score']:10.3f}  max profit {formatAmount(result['max_profit'])}  "
+			f"max loss {formatAmount(result['max_loss'])}  expected {result['expected_profit']:7.2f}  {describe(result)}")
+
+	if not results:
+		print("no candidate meets the constraints", file=sys.stderr)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,220 @@
+# This module simulates the profit distribution of a strategy. Terminal prices
+# of the underlying are drawn (from geometric Brownian motion, or resampled from
+# a sample of returns) in fixed size chunks, and the strategy's exact expiry
+# payoff (see piecewise.py) is evaluated on every chunk at once. Each chunk is
+# reduced to it's mean, sum of squared deviations and a fine histogram before
+# the next one is drawn, so memory stays bounded however many paths are
+# simulated. Chunks are merged with Chan et al.'s pairwise update, which keeps
+# the variance accurate where E[X^2] - E[X]^2 would cancel catastrophically
+# (large, nearly constant profits).
+#
+# Every chunk has it's own np.random.Generator, spawned from a single seed, so
+# chunks can be farmed out to a process pool and the results don't depend on
+# how many processes were used.
+#
+# e.g.
+#	lines = engine.configsToLines(lines_config)
+#	results = simulate(lines, spot=50, paths=10**7, volatility=0.3, processes=4)
+#	results["expected_profit"], results["probability_of_profit"]
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from piecewise import sumPayoffs
+
+# the number of paths drawn at once
+CHUNK_SIZE = 2 ** 20
+
+# the number of bins profits are counted into, percentiles are read from these
+HISTOGRAM_BINS = 10000
+
+# the number of standard deviations either side of the mean GBM prices are expected within
+PRICE_DEVIATIONS = 9
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def simulate(lines, spot, paths=10 ** 6, time_to_expiry=0.25, volatility=0.2, rate=0.01, returns=None,
+	seed=None, chunk_size=CHUNK_SIZE, processes=None, percentiles=PERCENTILES, bins=50, cancelled=None):
+	"""
+	Simulate the profit at expiry of the strategy made of $lines (a list or
+	dictionary of Lines) over $paths terminal prices of the underlying, which
+	is at $spot today.
+
+	Terminal prices follow geometric Brownian motion over $time_to_expiry years
+	with the annual $volatility and a drift of $rate, unless $returns is given:
+	an array of returns over the whole period (0.05 = 5%), which are resampled.
+
+	$seed makes the simulation repeatable. With $processes, chunks are
+	evaluated in that many processes. $cancelled is an optional function
+	checked between chunks: once it returns True, the simulation stops and
+	None is returned. Invalid inputs (e.g. an empty $returns) raise a
+	ValueError before anything is simulated.
+
+	Returns a dictionary of:
+		expected_profit, profit_std: mean and standard deviation of the profit
+		probability_of_profit: fraction of paths with a profit above 0
+		percentiles: dictionary of percentile to profit (accurate to one fine
+			histogram bin)
+		histogram: (edges, counts) of the profits in $bins bins
+	"""
+	if paths < 1:
+		raise ValueError(f"at least one path must be simulated, not {paths}")
+	if chunk_size < 1:
+		raise ValueError(f"chunks must hold at least one path, not {chunk_size}")
+	if bins < 1:
+		raise ValueError(f"the histogram needs at least one bin, not {bins}")
+	if not (np.isfinite(spot) and spot > 0):
+		raise ValueError(f"spot must be a price above 0, not {spot}")
+	if returns is not None:
+		returns = np.asarray(returns, dtype=float)
+		if returns.ndim != 1 or len(returns) == 0:
+			raise ValueError(f"returns must be a non-empty list of returns, not an array of shape {returns.shape}")
+		if not np.all(np.isfinite(returns)) or returns.min() < -1:
+			raise ValueError("returns must be finite, and no lower than -1 (a total loss)")
+	else:
+		for name, value in (("time_to_expiry", time_to_expiry), ("volatility", volatility)):
+			if not (np.isfinite(value) and value >= 0):
+				raise ValueError(f"{name} must be 0 or above, not {value}")
+		if not np.isfinite(rate):
+			raise ValueError(f"rate must be finite, not {rate}")
+
+	if isinstance(lines, dict):
+		lines = list(lines.values())
+	payoff = sumPayoffs([line.payoff for line in lines])
+
+	if returns is not None:
+		low, high = spot * (1 + returns.min()), spot * (1 + returns.max())
+	else:
+		drift = (rate - 0.5 * volatility ** 2) * time_to_expiry
+		deviation = PRICE_DEVIATIONS * volatility * np.sqrt(time_to_expiry)
+		low, high = spot * np.exp(drift - deviation), spot * np.exp(drift + deviation)
+	edges = _profitEdges(payoff, max(low, 0), high)
+
+	# split the paths into chunks, each with it's own random stream
+	sizes = [chunk_size] * (paths // chunk_size)
+	if paths % chunk_size:
+		sizes.append(paths % chunk_size)
+	streams = np.random.SeedSequence(seed).spawn(len(sizes))
+
+	chunks = [(payoff, edges, size, stream, spot, time_to_expiry, volatility, rate, returns)
+		for size, stream in zip(sizes, streams)]
+	if processes:
+		with ProcessPoolExecutor(max_workers=processes) as executor:
+			results = executor.map(_simulateChunk, chunks)
+			summary = _mergeChunks(results, cancelled)
+			if summary is None:
+				executor.shutdown(cancel_futures=True)
+	else:
+		summary = _mergeChunks(map(_simulateChunk, chunks), cancelled)
+	if summary is None:
+		return None
+
+	_, expected_profit, deviations, profitable, counts = summary
+
+	return {
+		"paths": paths,
+		"expected_profit": expected_profit,
+		"profit_std": np.sqrt(deviations / paths),
+		"probability_of_profit": profitable / paths,
+		"percentiles": histogramPercentiles(edges, counts, percentiles),
+		"histogram": rebin(edges, counts, bins),
+	}
+
+
+def terminalPrices(rng, size, spot, time_to_expiry, volatility, rate, returns=None):
+	"""
+	Return $size terminal prices drawn with the Generator $rng: resampled from
+	$returns if given, else from geometric Brownian motion
+	"""
+	if returns is not None:
+		sample = returns[rng.integers(0, len(returns), size)]
+		return np.maximum(spot * (1 + sample), 0)
+
+	drift = (rate - 0.5 * volatility ** 2) * time_to_expiry
+	shocks = rng.standard_normal(size) * (volatility * np.sqrt(time_to_expiry))
+	return spot * np.exp(drift + shocks)
+
+
+def histogramPercentiles(edges, counts, percentiles):
+	""" Return a dictionary of percentile to value, interpolated from a histogram """
+	cdf = np.concatenate(([0], np.cumsum(counts))) / np.sum(counts)
+
+	values = {}
+	for percentile in percentiles:
+		q = percentile / 100
+		# the first bin whose cumulative count reaches q, then interpolate inside it
+		i = min(max(np.searchsorted(cdf, q), 1), len(edges) - 1)
+		low, high = cdf[i - 1], cdf[i]
+		fraction = (q - low) / (high - low) if high > low else 0
+		values[percentile] = edges[i - 1] + fraction * (edges[i] - edges[i - 1])
+
+	return values
+
+
+def rebin(edges, counts, bins):
+	""" Return (edges, counts) of the fine histogram merged into about $bins bins """
+	step = max(len(counts) // bins, 1)
+	merged = np.add.reduceat(counts, np.arange(0, len(counts), step))
+	return np.append(edges[:-1:step], edges[-1]), merged
+
+
+def _profitEdges(payoff, low, high):
+	"""
+	Return the fine histogram's bin edges, which span every profit $payoff takes
+	on prices from $low to $high. Payoffs are piecewise linear, so the extremes
+	are at $low, $high or a breakpoint between them.
+	"""
+	b = payoff.breakpoints
+	prices = np.concatenate(([low, high], b[(b > low) & (b < high)]))
+	profits = payoff(prices)
+
+	min_profit, max_profit = float(np.min(profits)), float(np.max(profits))
+	if min_profit == max_profit:
+		min_profit, max_profit = min_profit - 1, max_profit + 1
+
+	return np.linspace(min_profit, max_profit, HISTOGRAM_BINS + 1)
+
+
+def _mergeChunks(results, cancelled=None):
+	"""
+	Merge the chunk $results (see _simulateChunk()) as they arrive into (paths,
+	mean, sum of squared deviations from the mean, profitable paths, histogram
+	counts), or return None as soon as $cancelled() is True
+	"""
+	merged = None
+	for result in results:
+		if cancelled is not None and cancelled():
+			return None
+		if merged is None:
+			merged = result
+			continue
+
+		# Chan et al.: the squared deviations of two samples about their combined mean
+		paths, mean, deviations, profitable, counts = merged
+		chunk_paths, chunk_mean, chunk_deviations, chunk_profitable, chunk_counts = result
+		total = paths + chunk_paths
+		delta = chunk_mean - mean
+		merged = (total, mean + delta * chunk_paths / total,
+			deviations + chunk_deviations + delta * delta * paths * chunk_paths / total,
+			profitable + chunk_profitable, counts + chunk_counts)
+
+	return merged
+
+
+def _simulateChunk(chunk):
+	"""
+	Simulate one chunk, returning (paths, mean profit, sum of squared deviations from it, profitable paths,
+	histogram counts)
+	"""
+	payoff, edges, size, stream, spot, time_to_expiry, volatility, rate, returns = chunk
+	rng = np.random.default_rng(stream)
+
+	profits = payoff(terminalPrices(rng, size, spot, time_to_expiry, volatility, rate, returns))
+
+	# profits outside of the edges (paths beyond PRICE_DEVIATIONS) count into the end bins
+	counts, _ = np.histogram(np.clip(profits, edges[0], edges[-1]), bins=edges)
+
+	mean = float(np.mean(profits))
+	deviations = profits - mean
+	return size, mean, float(np.dot(deviations, deviations)), int(np.sum(profits > 0)), counts
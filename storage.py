@@ -0,0 +1,311 @@
+# This module saves and loads strategies in a compact binary format: an
+# uncompressed .npz file holding a small JSON header, the legs' parameters as
+# typed columns (one array per parameter, one element per Instrument Panel row)
+# and, optionally, the payoff arrays already computed for them by a
+# StrategyModel (see strategy.py).
+#
+# The results of batch.py are saved in the same format (a header of kind
+# "batch"), as columns of the strategies' breakevens, max profits and losses and
+# profits at the given prices.
+#
+# The arrays are stored uncompressed, so loading memory-maps them straight out
+# of the file rather than reading and decoding them: reopening a large saved
+# book (or batch result) is instant, and cached payoffs don't have to be
+# recomputed.
+#
+# e.g.
+#	saveStrategy("strategy.npz", ui.lines, ui.strategyModel)
+#	lines_config, curves = loadStrategy("strategy.npz")
+#	results = loadBatchResults("results.npz")
+#	batchResult(results, 0)
+import json
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+from convert import toFloat, toNumber
+
+FORMAT = "instrumentium"
+VERSION = 1
+
+# instrument configs are stored as integer codes, 0 being an empty value
+INST_CODES = {"option": 1, "stock": 2, "futures": 3}
+OPTION_TYPE_CODES = {"call": 1, "put": 2}
+POSITION_CODES = {"long": 1, "short": 2}
+
+# the inst_config keys of each instrument
+INST_KEYS = {
+	"option": ("option_type", "position", "price", "strike"),
+	"stock": ("position", "price"),
+	"futures": ("position", "delivery_price"),
+}
+
+# numeric columns, empty (or non-numeric) values are stored as NaN. the text of a non-numeric entry (e.g. one
+# half typed) is kept in a "<column>_text" column, which is only written when the column has any
+NUMBER_COLUMNS = ("price", "strike", "delivery_price", "time_to_expiry", "volatility", "rate", "quantity",
+	"multiplier")
+
+# columns of inputs which are only in an instrument's config when they were set
+OPTIONAL_COLUMNS = ("time_to_expiry", "volatility", "rate", "quantity", "multiplier")
+
+# the columns of a batch result file, see saveBatchResults()
+BATCH_COLUMNS = ("index", "line", "error", "max_profit", "max_loss", "breakevens", "breakeven_offsets", "price_keys",
+	"profit_at")
+
+
+def saveStrategy(path, lines_config, model=None):
+	"""
+	Save the instrument configs $lines_config (see Instrumentium.lines) to the
+	file at $path. If the StrategyModel $model is given, it's cached payoffs
+	are saved too, so loading doesn't have to recompute them.
+	"""
+	rows = len(lines_config)
+	columns = {
+		"inst": np.zeros(rows, dtype=np.int8),
+		"option_type": np.zeros(rows, dtype=np.int8),
+		"position": np.zeros(rows, dtype=np.int8),
+	}
+	for key in NUMBER_COLUMNS:
+		columns[key] = np.full(rows, np.nan)
+	texts = {}
+
+	for i, line in enumerate(lines_config):
+		if line is None or line.get("inst") is None:
+			continue
+		inst_config = line["inst_config"] or {}
+
+		columns["inst"][i] = INST_CODES[line["inst"]]
+		columns["option_type"][i] = OPTION_TYPE_CODES.get(inst_config.get("option_type"), 0)
+		columns["position"][i] = POSITION_CODES.get(inst_config.get("position"), 0)
+		for key in NUMBER_COLUMNS:
+			value = inst_config.get(key)
+			columns[key][i] = toFloat(value)
+			if isinstance(value, str):
+				# the Instrument Panel only keeps an entry's text when it isn't a valid number
+				texts.setdefault(key, [""] * rows)[i] = value
+
+	for key, text in texts.items():
+		columns[f"{key}_text"] = np.array(text, dtype=str)
+
+	header = {"format": FORMAT, "version": VERSION, "kind": "strategy", "rows": rows, "curves": False}
+
+	if model is not None and len(model.leg_y) != 0:
+		keys = list(model.leg_y)
+		columns["x"] = np.asarray(model.x, dtype=float)
+		columns["leg_keys"] = np.asarray(keys, dtype=np.int64)
+		columns["leg_y"] = np.array([model.legY(key) for key in keys])
+		columns["y"] = np.asarray(model.y, dtype=float)
+		header["curves"] = True
+
+	_writeArrays(path, header, columns)
+
+
+def loadStrategy(path, mmap=True):
+	"""
+	Load a strategy saved by saveStrategy(). Return (lines_config, curves):
+	the instrument configs, and a dictionary of the cached payoffs ("x",
+	"leg_keys", "leg_y" and "y") or None if none were saved. With $mmap, the
+	arrays are read-only memory maps of the file, so they must be copied
+	before the file is saved over. A file which isn't a strategy raises a
+	ValueError.
+	"""
+	arrays, header = _readArrays(path, mmap, "strategy")
+
+	try:
+		lines_config = _linesConfig(arrays, header["rows"])
+	except (KeyError, IndexError) as error:
+		raise ValueError(f"{path} is missing strategy data ({error})") from None
+
+	curves = None
+	if header.get("curves"):
+		curves = {key: arrays[key] for key in ("x", "leg_keys", "leg_y", "y") if key in arrays}
+		if len(curves) != 4:
+			curves = None
+
+	return lines_config, curves
+
+
+def saveBatchResults(path, results):
+	"""
+	Save the results of batch.py (see batch.evaluateChunk()) $results to the
+	file at $path. Unbounded profits and losses are stored as +/-inf, and the
+	numbers of results which are errors as NaN.
+	"""
+	results = list(results)
+	rows = len(results)
+
+	# every strategy of a run is evaluated at the same prices, which batch.py writes as the keys of profit_at
+	price_keys = next((list(result["profit_at"]) for result in results if "profit_at" in result), [])
+
+	columns = {
+		"index": np.array([result["index"] for result in results], dtype=np.int64),
+		"line": np.array([result["line"] for result in results], dtype=np.int64),
+		"error": np.array([result.get("error", "") for result in results], dtype=str),
+		"max_profit": np.full(rows, np.nan),
+		"max_loss": np.full(rows, np.nan),
+		"breakeven_offsets": np.zeros(rows + 1, dtype=np.int64),
+		"price_keys": np.array(price_keys, dtype=str),
+		"profit_at": np.full((rows, len(price_keys)), np.nan),
+	}
+
+	# the breakevens of every strategy, one after another. strategy i's are breakevens[offsets[i]:offsets[i + 1]]
+	breakevens = []
+	for i, result in enumerate(results):
+		if "error" not in result:
+			columns["max_profit"][i] = np.inf if result["max_profit"] is None else result["max_profit"]
+			columns["max_loss"][i] = -np.inf if result["max_loss"] is None else result["max_loss"]
+			breakevens.extend(result["breakevens"])
+			if price_keys:
+				columns["profit_at"][i] = [result["profit_at"][key] for key in price_keys]
+		columns["breakeven_offsets"][i + 1] = len(breakevens)
+	columns["breakevens"] = np.array(breakevens, dtype=float)
+
+	_writeArrays(path, {"format": FORMAT, "version": VERSION, "kind": "batch", "rows": rows}, columns)
+
+
+def loadBatchResults(path, mmap=True):
+	"""
+	Load batch results saved by saveBatchResults(). Return a dictionary of their
+	columns ("index", "line", "error", "max_profit", "max_loss", "breakevens",
+	"breakeven_offsets", "price_keys" and "profit_at"), which are memory maps
+	of the file with $mmap (see loadStrategy()). A file which isn't a batch
+	result raises a ValueError.
+	"""
+	arrays, header = _readArrays(path, mmap, "batch")
+	columns = {key: arrays[key] for key in BATCH_COLUMNS if key in arrays}
+	if len(columns) != len(BATCH_COLUMNS):
+		missing = ", ".join(key for key in BATCH_COLUMNS if key not in arrays)
+		raise ValueError(f"{path} is missing batch data ({missing})")
+	return columns
+
+
+def batchResult(results, i):
+	""" Return the $i'th of the loaded batch $results as batch.py writes it """
+	result = {"index": int(results["index"][i]), "line": int(results["line"][i])}
+	if results["error"][i]:
+		result["error"] = str(results["error"][i])
+		return result
+
+	start, end = results["breakeven_offsets"][i], results["breakeven_offsets"][i + 1]
+	result["breakevens"] = results["breakevens"][start:end].tolist()
+	result["max_profit"] = float(results["max_profit"][i]) if np.isfinite(results["max_profit"][i]) else None
+	result["max_loss"] = float(results["max_loss"][i]) if np.isfinite(results["max_loss"][i]) else None
+	if len(results["price_keys"]):
+		result["profit_at"] = dict(zip(map(str, results["price_keys"]), results["profit_at"][i].tolist()))
+	return result
+
+
+def _writeArrays(path, header, columns):
+	""" Write $columns, and the JSON $header, to the .npz file at $path """
+	columns["header"] = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+
+	# np.savez stores it's arrays uncompressed, which loadStrategy() relies on to memory-map them. the file is
+	# written next to $path and swapped in, so a failed save (or a map of the old file) never sees half a file
+	temporary = f"{path}.tmp"
+	try:
+		with open(temporary, "wb") as file:
+			np.savez(file, **columns)
+		os.replace(temporary, path)
+	except BaseException:
+		if os.path.exists(temporary):
+			os.unlink(temporary)
+		raise
+
+
+def _readArrays(path, mmap, kind):
+	""" Return (arrays, header) of the .npz file at $path, raising a ValueError unless it holds a $kind """
+	try:
+		arrays = _openArrays(path, mmap)
+		header = json.loads(bytes(arrays["header"]).decode())
+	except (zipfile.BadZipFile, KeyError, struct.error, UnicodeDecodeError, EOFError) as error:
+		raise ValueError(f"{path} isn't a valid {FORMAT} file ({error})") from None
+
+	if not isinstance(header, dict) or header.get("format") != FORMAT:
+		raise ValueError(f"{path} isn't an {FORMAT} file")
+	if header["version"] > VERSION:
+		raise ValueError(f"{path} was saved by a newer version (format version {header['version']})")
+	# files saved before batch results could be are all strategies
+	if header.get("kind", "strategy") != kind:
+		raise ValueError(f"{path} is a {header['kind']} file, not a {kind}")
+
+	return arrays, header
+
+
+def _linesConfig(arrays, rows):
+	""" Return the instrument configs of the first $rows rows of the stored columns $arrays """
+	insts = {code: inst for inst, code in INST_CODES.items()}
+	option_types = {code: option_type for option_type, code in OPTION_TYPE_CODES.items()}
+	positions = {code: position for position, code in POSITION_CODES.items()}
+
+	lines_config = []
+	for i in range(rows):
+		inst = insts.get(int(arrays["inst"][i]))
+		if inst is None:
+			lines_config.append({"inst": None, "inst_config": None})
+			continue
+
+		inst_config = {}
+		for key in INST_KEYS[inst]:
+			if key == "option_type":
+				inst_config[key] = option_types.get(int(arrays[key][i]))
+			elif key == "position":
+				inst_config[key] = positions.get(int(arrays[key][i]))
+			else:
+				inst_config[key] = _entryValue(arrays, key, i)
+
+		# valuation inputs and sizes are only kept when they were set (files saved before sizes existed have none)
+		for key in OPTIONAL_COLUMNS:
+			if key in arrays:
+				value = _entryValue(arrays, key, i)
+				if value is not None:
+					inst_config[key] = value
+
+		lines_config.append({"inst": inst, "inst_config": inst_config})
+
+	return lines_config
+
+
+def _openArrays(path, mmap):
+	""" Return a dictionary of name to array of every array in the .npz file at $path """
+	if not mmap:
+		with np.load(path) as npz:
+			return {name: npz[name] for name in npz.files}
+
+	arrays = {}
+	with zipfile.ZipFile(path) as archive, open(path, "rb") as file:
+		for info in archive.infolist():
+			name = info.filename[:-len(".npy")]
+			if info.compress_type != zipfile.ZIP_STORED:
+				# a compressed array can't be mapped, decode it instead
+				arrays[name] = np.lib.format.read_array(archive.open(info))
+				continue
+
+			# skip the zip entry's local header (30 bytes, then the name and extra fields)
+			file.seek(info.header_offset)
+			name_length, extra_length = struct.unpack("<HH", file.read(30)[26:30])
+			file.seek(info.header_offset + 30 + name_length + extra_length)
+
+			# then the .npy header, after which the array's data starts
+			version = np.lib.format.read_magic(file)
+			if version == (1, 0):
+				shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+			else:
+				shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+			if np.prod(shape) == 0:
+				arrays[name] = np.empty(shape, dtype=dtype)
+			else:
+				arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=file.tell(), shape=shape,
+					order="F" if fortran_order else "C")
+
+	return arrays
+
+
+def _entryValue(arrays, key, i):
+	""" Return the $key entry of row $i of the stored columns $arrays: it's text if it wasn't a number """
+	text = arrays.get(f"{key}_text")
+	if text is not None and text[i]:
+		return str(text[i])
+	return toNumber(arrays[key][i])
+
@@ -0,0 +1,375 @@
+# This module packs a list of Lines (Option, Asset and Futures instances) into
+# a struct of arrays, so that the combined payoff of a whole strategy can be
+# evaluated as one (legs x points) NumPy broadcast instead of looping over
+# every leg and every x point.
+#
+# Every leg's payoff is computed for a single unit, and legs are weighted by
+# their quantity times their multiplier (Strategy.quantities) as the matrix is
+# summed, so a 1,000 lot leg costs the same as a single unit.
+import numpy as np
+
+from cache import PAYOFF_CACHE, gridKey
+from piecewise import sumPayoffs
+from pricing import blackScholes, greeks
+
+
+class Strategy():
+	""" A multi-leg strategy stored as one array per leg property. """
+
+	def __init__(self, instrument_types, option_types, positions, premiums, strikes, quantities=None,
+			times_to_expiry=None, volatilities=None, rates=None):
+		self.instrument_types = np.asarray(instrument_types, dtype=np.int8)	# 1 = option; 2 = stock/futures
+		self.option_types = np.asarray(option_types, dtype=np.int8)			# 1 = call; 2 = put; 0 = not an option
+		self.positions = np.asarray(positions, dtype=np.int8)				# 1 = long; 2 = short
+		self.premiums = np.asarray(premiums, dtype=float)					# option premium, or stock/delivery price
+		self.strikes = np.asarray(strikes, dtype=float)						# option strike, 0 for stocks/futures
+
+		# each leg's weight: it's quantity times it's contract multiplier
+		if quantities is None:
+			quantities = np.ones(len(self.instrument_types))
+		self.quantities = np.asarray(quantities, dtype=float)
+
+		# valuation inputs for options before expiry (see pricing.py). a time to
+		# expiry of 0 means the option expires now, and is worth it's payoff
+		legs = len(self.instrument_types)
+		self.times_to_expiry = np.zeros(legs) if times_to_expiry is None else np.asarray(times_to_expiry, dtype=float)
+		self.volatilities = np.zeros(legs) if volatilities is None else np.asarray(volatilities, dtype=float)
+		self.rates = np.zeros(legs) if rates is None else np.asarray(rates, dtype=float)
+
+	def __len__(self):
+		return len(self.instrument_types)
+
+	def payoffMatrix(self, x):
+		"""
+		Return a (legs x points) array holding every leg's payoff (for a 
+		single unit) at every value of $x. Values match the inst_functions 
+		kernels: the sloped part of each payoff is rounded to 2 decimals, the 
+		flat premium is not.
+		"""
+		x = np.asarray(x, dtype=float)[np.newaxis, :]
+		strikes = self.strikes[:, np.newaxis]
+		premiums = self.premiums[:, np.newaxis]
+		is_option = (self.instrument_types == 1)[:, np.newaxis]
+		is_call = (self.option_types == 1)[:, np.newaxis]
+		is_long = (self.positions == 1)[:, np.newaxis]
+
+		# the sloped part of each payoff, written in the same order of
+		# operations as the inst_functions kernels so rounding agrees exactly
+		long_sloped = np.where(is_option, np.where(is_call, x - strikes - premiums, strikes - x - premiums), x - premiums)
+		short_sloped = np.where(is_option, np.where(is_call, premiums - x + strikes, premiums + x - strikes), premiums - x)
+		sloped = np.round(np.where(is_long, long_sloped, short_sloped), 2)
+
+		# options sit on their flat (premium) part until they are in-the-money:
+		# calls above the strike, puts below it. stocks and futures never do
+		in_the_money = np.where(is_call, x > strikes, x < strikes)
+		flat = np.where(is_long, -premiums, premiums)
+
+		return np.where(~is_option | in_the_money, sloped, flat)
+
+	def payoff(self, x):
+		""" Return the overall payoff of the strategy at every value of $x """
+		return self.quantities @ self.payoffMatrix(x)
+
+	def valueMatrix(self, x, elapsed=0):
+		"""
+		Return a (legs x points) array holding every leg's (unit) profit today if the
+		underlying were at each value of $x: options are valued with
+		Black-Scholes (priced all at once, see pricing.py), less the premium
+		paid (or plus the premium received). Unlike payoffMatrix, nothing is
+		rounded, as the curve is only drawn.
+
+		With $elapsed (in years), the legs are valued that far into the future
+		instead, options past their expiry being worth their payoff.
+		"""
+		x = np.asarray(x, dtype=float)[np.newaxis, :]
+		column = lambda values: values[:, np.newaxis]
+		is_option = column(self.instrument_types == 1)
+		sign = column(np.where(self.positions == 1, 1.0, -1.0))
+		premiums = column(self.premiums)
+		times_to_expiry = np.maximum(self.times_to_expiry - elapsed, 0)
+
+		option_values = blackScholes(column(self.option_types), x, column(self.strikes),
+			column(times_to_expiry), column(self.volatilities), column(self.rates))
+
+		return sign * np.where(is_option, option_values - premiums, x - premiums)
+
+	def value(self, x, elapsed=0):
+		""" Return the overall profit of the strategy at every value of $x, $elapsed years from today """
+		return self.quantities @ self.valueMatrix(x, elapsed)
+
+	def valueSurface(self, x, elapsed):
+		"""
+		Return a (len($elapsed) x points) array of the strategy's overall profit
+		at every value of $x, for every time in $elapsed (years from today).
+		Each row is one time slice, so animating time only needs row lookups.
+		"""
+		x = np.asarray(x, dtype=float)
+		surface = np.empty((len(elapsed), len(x)))
+
+		# one slice at a time, so a large book never needs a (slices x legs x points) array
+		for i, t in enumerate(elapsed):
+			surface[i] = self.value(x, t)
+
+		return surface
+
+	def expiry(self):
+		""" Return the time (in years) until the last option expires """
+		if len(self.times_to_expiry) == 0:
+			return 0.0
+		return float(np.max(self.times_to_expiry))
+
+	def greekMatrix(self, x, greek):
+		"""
+		Return a (legs x points) array holding every leg's (unit) $greek (see 
+		pricing.greeks()) if the underlying were at each value of $x. Stocks 
+		and futures have a delta of 1 (long) or -1 (short) and no other Greeks.
+		"""
+		x = np.asarray(x, dtype=float)[np.newaxis, :]
+		column = lambda values: values[:, np.newaxis]
+		is_option = column(self.instrument_types == 1)
+		sign = column(np.where(self.positions == 1, 1.0, -1.0))
+
+		option_greek = greeks(column(self.option_types), x, column(self.strikes),
+			column(self.times_to_expiry), column(self.volatilities), column(self.rates),
+			names=(greek,))[greek]
+		linear_greek = 1.0 if greek == "delta" else 0.0
+
+		return sign * np.where(is_option, option_greek, linear_greek)
+
+	def greek(self, x, greek):
+		""" Return the overall $greek of the strategy at every value of $x """
+		return self.quantities @ self.greekMatrix(x, greek)
+
+
+def linesToStrategy(lines_list):
+	""" Pack the legs in $lines_list into a single Strategy instance """
+	instrument_types, option_types, positions = [], [], []
+	premiums, strikes, quantities = [], [], []
+	times_to_expiry, volatilities, rates = [], [], []
+
+	for line in lines_list:
+		instrument_types.append(line.instrument_type)
+		positions.append(line.position)
+		quantities.append(line.quantity * line.multiplier)
+
+		# only options which don't expire now have valuation inputs
+		if line.instrument_type == 1 and not line.expire_now:
+			times_to_expiry.append(line.time_to_expiry)
+			volatilities.append(line.volatility)
+			rates.append(line.rate)
+		else:
+			times_to_expiry.append(0)
+			volatilities.append(0)
+			rates.append(0)
+
+		if line.instrument_type == 1:
+			option_types.append(line.option_type)
+			premiums.append(line.price)
+			strikes.append(line.strike)
+		else:
+			# stocks store a price, futures store a delivery price
+			option_types.append(0)
+			premiums.append(getattr(line, "price", getattr(line, "delivery_price", None)))
+			strikes.append(0)
+
+	return Strategy(instrument_types, option_types, positions, premiums, strikes, quantities,
+		times_to_expiry=times_to_expiry, volatilities=volatilities, rates=rates)
+
+
+class StrategyModel():
+	"""
+	A persistent strategy, which caches every leg's payoff array on a shared x
+	grid along with their running sum in self.y. When $greek is given (see 
+	pricing.GREEKS), the model caches that Greek of every leg instead.
+
+	When a single leg changes, it's old payoff is subtracted from the sum and
+	the new one added, so an edit costs O(points) rather than O(legs x points).
+	Grids are laid out over gridRange(), which stays put while the legs move
+	around inside of it. An expiry payoff grid also holds every leg's kinks,
+	so moving a strike changes it. Expiry payoffs are linear between the
+	points of the grid they were computed on (which held their kinks), so
+	then only self.y is moved onto the new grid by interpolation, and each
+	other leg's array is kept on it's own grid (self.leg_x) until legY()
+	needs it on self.x. A drag so costs O(points) however many legs there
+	are. Only a change of range (or of a Greek grid) requires every leg to
+	be recomputed, which is done in a single Strategy pass.
+	"""
+	# how many incremental updates to make before resumming self.y from the
+	# cached legs, so floating point drift can't build up
+	REFRESH_INTERVAL = 500
+
+	# gridRange() lays grids out GRID_MARGIN of the legs' range wider on either side, and keeps them
+	# until the legs leave them or span less than GRID_SHRINK of them
+	GRID_MARGIN = 0.25
+	GRID_SHRINK = 0.5
+
+	def __init__(self, greek=None):
+		self.greek = greek
+		self.x = np.array([])
+		self.y = np.array([])
+		self.legs = {}					# key (e.g. IP row) -> line instance
+		self.leg_y = {}					# key -> payoff array of that line on self.leg_x[key]
+		self.leg_x = {}					# key -> the grid leg_y[key] is on, self.x or an earlier one
+		self.leg_signatures = {}		# key -> legSignature() of that line
+		self._updates = 0
+		self._payoff = None
+
+	def update(self, legs, x):
+		"""
+		Bring the model up to date with $legs (a dictionary of key to line
+		instance) evaluated on the grid $x, recomputing only what has changed.
+		"""
+		x = np.asarray(x, dtype=float)
+
+		if not np.array_equal(x, self.x):
+			if self.greek is None and len(self.x) > 1 and self.x[0] <= x[0] and x[-1] <= self.x[-1]:
+				# only the kinks have moved, keep every leg's payoff on it's grid
+				self.y = np.interp(x, self.x, self.y)
+				self.x = x
+			else:
+				# the grid has changed, every leg has to be recomputed
+				self.x = x
+				self._rebuild(legs)
+				return
+
+		for key in list(self.legs):
+			if key not in legs:
+				self.removeLeg(key)
+
+		for key, line in legs.items():
+			self.setLeg(key, line)
+
+	def setLeg(self, key, line):
+		""" Add or replace the leg stored under $key. Return True if anything changed """
+		signature = legSignature(line)
+		if self.leg_signatures.get(key) == signature:
+			# the leg is unchanged, keep it's cached payoff
+			self.legs[key] = line
+			return False
+
+		if key in self.leg_y:
+			self.y -= self.legY(key)
+
+		y = self._legArrays([line])[0]
+		self._storeLeg(key, line, y)
+		self.y += y
+
+		self._updated()
+		return True
+
+	def removeLeg(self, key):
+		""" Remove the leg stored under $key, if there is one """
+		if key in self.legs:
+			self.y -= self.legY(key)
+			del self.legs[key], self.leg_y[key], self.leg_x[key], self.leg_signatures[key]
+			self._updated()
+
+	def legY(self, key):
+		""" Return the payoff array of the leg stored under $key on self.x """
+		if self.leg_x[key] is not self.x:
+			self.leg_y[key] = np.interp(self.x, self.leg_x[key], self.leg_y[key])
+			self.leg_x[key] = self.x
+		return self.leg_y[key]
+
+	def gridRange(self, min_x, max_x):
+		"""
+		Return the (min_x, max_x) range to lay the model's grid out over, for
+		legs spanning $min_x to $max_x: the current grid's range while it holds
+		them, so that edits keep the grid, else a range with some headroom
+		"""
+		if len(self.x) > 1:
+			low, high = self.x[0], self.x[-1]
+			if low <= min_x and max_x <= high and (max_x - min_x) >= (high - low) * self.GRID_SHRINK:
+				return float(low), float(high)
+
+		margin = (max_x - min_x) * self.GRID_MARGIN
+		return max(min_x - margin, 0), max_x + margin
+
+	def clear(self):
+		""" Remove every leg """
+		self.__init__(self.greek)
+
+	def restore(self, legs, x, leg_keys, leg_y):
+		"""
+		Fill the model with payoffs computed earlier (e.g. loaded by 
+		storage.loadStrategy()) rather than recomputing them: $leg_y holds the
+		payoff on $x of the line in $legs under each of $leg_keys
+		"""
+		# the arrays are copied, as loaded ones may be memory maps of a file which can be saved over
+		self.clear()
+		self.x = np.array(x, dtype=float)
+		leg_y = np.array(leg_y, dtype=float)
+		for key, y in zip(leg_keys, leg_y):
+			self._storeLeg(key, legs[key], y)
+
+		self.y = np.sum(leg_y, axis=0) if len(leg_y) else np.zeros(len(self.x))
+
+	@property
+	def payoff(self):
+		""" The exact (PiecewiseLinear) payoff of all legs, see piecewise.py """
+		if self._payoff is None:
+			self._payoff = sumPayoffs([line.payoff for line in self.legs.values()])
+		return self._payoff
+
+	def _rebuild(self, legs):
+		""" Recompute every leg's payoff and the sum in one array pass """
+		self.legs, self.leg_y, self.leg_x, self.leg_signatures = {}, {}, {}, {}
+		self.y = np.zeros(len(self.x))
+
+		if len(legs) != 0:
+			keys = list(legs)
+			arrays = self._legArrays([legs[key] for key in keys])
+			for key, y in zip(keys, arrays):
+				self._storeLeg(key, legs[key], y)
+			self.y = self.y + np.sum(arrays, axis=0)
+
+		self._updates = 0
+		self._payoff = None
+
+	def _legArrays(self, lines):
+		"""
+		Return a list of the (read-only) array the model caches for each of 
+		$lines. Arrays already in PAYOFF_CACHE are reused, the rest are computed 
+		together in one Strategy pass.
+		"""
+		grid_key = gridKey(self.x)
+		keys = [(self.greek, legSignature(line), grid_key) for line in lines]
+		arrays = [PAYOFF_CACHE.get(key) for key in keys]
+
+		missing = [i for i, array in enumerate(arrays) if array is None]
+		if missing:
+			strategy = linesToStrategy([lines[i] for i in missing])
+			if self.greek is None:
+				matrix = strategy.payoffMatrix(self.x)
+			else:
+				matrix = strategy.greekMatrix(self.x, self.greek)
+			matrix = matrix * strategy.quantities[:, np.newaxis]
+
+			for i, y in zip(missing, matrix):
+				arrays[i] = PAYOFF_CACHE.put(keys[i], y)
+
+		return arrays
+
+	def _storeLeg(self, key, line, y):
+		self.legs[key] = line
+		self.leg_y[key] = y
+		self.leg_x[key] = self.x
+		self.leg_signatures[key] = legSignature(line)
+
+	def _updated(self):
+		self._payoff = None
+		self._updates += 1
+
+		if self._updates >= self.REFRESH_INTERVAL:
+			self.y = np.sum([self.legY(key) for key in self.leg_y], axis=0) if self.leg_y else np.zeros(len(self.x))
+			self._updates = 0
+
+
+def legSignature(line):
+	""" Return a tuple identifying the payoff of $line, used to detect changes """
+	weight = line.quantity * line.multiplier
+	if line.instrument_type == 1:
+		valuation = () if line.expire_now else (line.time_to_expiry, line.volatility, line.rate)
+		return (1, line.option_type, line.position, line.price, line.strike, weight) + valuation
+	return (line.instrument_type, 0, line.position, getattr(line, "price", getattr(line, "delivery_price", None)), 0,
+		weight)
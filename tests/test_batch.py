@@ -0,0 +1,102 @@
+import json
+
+import numpy as np
+
+from batch import evaluateChunk, evaluateStream, main, recordToLines
+from lines import JSONtoLines, Option, Asset
+from storage import batchResult, loadBatchResults
+
+BUTTERFLY = [
+	{"instrument_type": 1, "option_type": 1, "position": 1, "price": 6, "strike": 45},
+	{"instrument_type": 1, "option_type": 1, "position": 2, "price": 3, "strike": 50, "quantity": 2},
+	{"instrument_type": 1, "option_type": 1, "position": 1, "price": 1, "strike": 55},
+]
+
+
+def testJSONtoLinesAcceptsAStringDictionaryOrList():
+	for data in (BUTTERFLY, json.dumps(BUTTERFLY), {str(i): leg for i, leg in enumerate(BUTTERFLY)}):
+		lines = JSONtoLines(data)
+		assert [type(line) for line in lines] == [Option, Option, Option]
+		assert [line.strike for line in lines] == [45, 50, 55]
+		assert lines[1].quantity == 2
+
+	stock, = JSONtoLines([{"instrument_type": 2, "position": 2, "price": 45, "multiplier": 100}])
+	assert isinstance(stock, Asset) and stock.multiplier == 100
+
+
+def testBatchBuildsJSONStrategiesWithJSONtoLines():
+	assert len(recordToLines(BUTTERFLY)) == 3
+	assert len(recordToLines(json.dumps(BUTTERFLY))) == 3
+
+	result, = evaluateChunk([(0, 1, BUTTERFLY)], prices=[45, 50])
+	# debit of 6 - 2 * 3 + 1 = 1, the wings are 5 wide
+	assert np.allclose(result["breakevens"], [46, 54])
+	assert result["max_profit"] == 4 and result["max_loss"] == -1
+	assert result["profit_at"] == {"45": -1, "50": 4}
+
+
+def testBatchReportsLoaderErrors():
+	unknown = [{"instrument_type": 3, "position": 1, "price": 5}]
+	incomplete = [{"instrument_type": 1, "option_type": 1, "position": 1, "price": 5}]
+
+	results = evaluateChunk([(0, 1, unknown), (1, 2, incomplete), (2, 3, [])])
+
+	assert [result["line"] for result in results] == [1, 2, 3]
+	assert results[0]["error"].startswith("ValueError: unknown instrument_type")
+	assert results[1]["error"].startswith("KeyError")
+	assert results[2]["error"] == "ValueError: the strategy has no legs"
+
+
+def testBatchResultsRoundTripThroughStorage(tmp_path):
+	strategies = tmp_path / "strategies.jsonl"
+	strategies.write_text(json.dumps(BUTTERFLY) + "\n" + json.dumps([{"instrument_type": 2, "position": 1,
+		"price": 45}]) + "\n{\n")
+	output = tmp_path / "results.npz"
+
+	main([str(strategies), "--prices", "45", "50", "--output", str(output), "--processes", "1"])
+
+	expected = list(evaluateStream(str(strategies), [45.0, 50.0], processes=1))
+	results = loadBatchResults(output)
+	assert [batchResult(results, i) for i in range(len(expected))] == expected
+	assert batchResult(results, 1)["max_profit"] is None
+	assert "error" in batchResult(results, 2)
+
+
+def testBatchCLIOnValidAndMalformedRecords(tmp_path, capsys):
+	# the same bull call spread in both formats, then records the batch can't evaluate
+	spread = [{"inst": "option", "inst_config": {"option_type": "call", "position": "long", "price": 3, "strike": 50}},
+		{"inst": None, "inst_config": None},
+		{"inst": "option", "inst_config": {"option_type": "call", "position": "short", "price": 1, "strike": 55}}]
+	records = [json.dumps(spread), json.dumps(BUTTERFLY[:1] + [dict(BUTTERFLY[2], price=1, strike=55, position=2)]),
+		"{not json", json.dumps([{"inst": "option", "inst_config": {"option_type": "call", "position": "long", "price": 2,
+			"strike": None}}]),
+		"", json.dumps([])]
+	path = tmp_path / "strategies.jsonl"
+	path.write_text("\n".join(records) + "\n")
+	output = tmp_path / "results.jsonl"
+
+	main([str(path), "--prices", "50", "60", "--output", str(output), "--processes", "1"])
+
+	results = [json.loads(line) for line in output.read_text().splitlines()]
+	assert [result["line"] for result in results] == [1, 2, 3, 4, 6]
+	assert results[0]["breakevens"] == [52] and results[0]["max_profit"] == 3 and results[0]["max_loss"] == -2
+	assert results[0]["profit_at"] == {"50.0": -2, "60.0": 3}
+	# a long 45 call for 6 and a short 55 call for 1
+	assert results[1]["breakevens"] == [50] and results[1]["max_profit"] == 5 and results[1]["max_loss"] == -5
+	assert results[2]["error"].startswith("JSONDecodeError")
+	assert results[3]["error"] == "ValueError: leg 0 is incomplete or invalid"
+	assert results[4]["error"] == "ValueError: the strategy has no legs"
+	assert capsys.readouterr().err.strip() == "evaluated 5 strategies, 3 malformed"
+
+
+def testBatchCLIReadsAJSONList(tmp_path, capsys):
+	path = tmp_path / "strategies.json"
+	path.write_text(json.dumps([BUTTERFLY, [{"instrument_type": 2, "position": 2, "price": 45}]]))
+
+	main([str(path), "--processes", "1"])
+
+	out, err = capsys.readouterr()
+	butterfly, stock = (json.loads(line) for line in out.splitlines())
+	assert butterfly["max_profit"] == 4 and butterfly["max_loss"] == -1
+	assert stock["breakevens"] == [45] and stock["max_profit"] == 45 and stock["max_loss"] is None
+	assert err.strip() == "evaluated 2 strategies, 0 malformed"
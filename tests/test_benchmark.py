@@ -0,0 +1,18 @@
+import json
+
+import benchmark
+
+RESULTS = {"results": {"kernels/longCall": {"best": 1e-6, "median": 1e-6, "calls": 1, "peak_bytes": 1024}}}
+
+
+def testComparingWithoutABaselineFails(tmp_path, monkeypatch, capsys):
+	monkeypatch.setattr(benchmark, "runBenchmarks", lambda groups: RESULTS)
+	baseline = tmp_path / "baseline.json"
+
+	assert benchmark.main(["--baseline", str(baseline)]) == 2
+	assert "--save-baseline" in capsys.readouterr().err
+	assert benchmark.main(["--baseline", str(baseline), "--no-compare"]) == 0
+
+	assert benchmark.main(["--baseline", str(baseline), "--save-baseline"]) == 0
+	assert json.loads(baseline.read_text()) == RESULTS
+	assert benchmark.main(["--baseline", str(baseline)]) == 0
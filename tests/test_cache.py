@@ -0,0 +1,26 @@
+import numpy as np
+
+from cache import PayoffCache, gridKey
+
+
+def testPutCachesAFrozenCopy():
+	cache = PayoffCache()
+	array = np.arange(4.0)
+
+	cached = cache.put("key", array)
+	array[0] = 9
+
+	assert array.flags.writeable
+	assert not cached.flags.writeable
+	assert cache.get("key")[0] == 0
+
+
+def testGridKeyTellsGridsApart():
+	x = np.linspace(0, 100, 101)
+	moved = x.copy()
+	moved[50] += 1e-9
+
+	assert gridKey(x) == gridKey(list(x))
+	assert gridKey(x) != gridKey(moved)
+	assert gridKey(x) != gridKey(x[:-1])
+	assert gridKey([]) == gridKey(np.array([]))
@@ -0,0 +1,78 @@
+import csv
+
+import numpy as np
+
+from chainstore import ChainStore, ingestChain, readSnapshot
+
+
+def writeSnapshot(path, strikes, ask=1.2, expiry="2026-12-18"):
+	""" Write a snapshot quoting a call and a put at every strike in $strikes """
+	with open(path, "w", newline="") as file:
+		writer = csv.DictWriter(file, fieldnames=["strike", "expiry", "type", "bid", "ask", "iv"])
+		writer.writeheader()
+		for strike in strikes:
+			for option_type in ("c", "p"):
+				writer.writerow({"strike": strike, "expiry": expiry, "type": option_type, "bid": 1, "ask": ask,
+					"iv": 0.2})
+
+
+def testReadSnapshotKeepsEveryRowAcrossChunks(tmp_path):
+	path = tmp_path / "snapshot.csv"
+	writeSnapshot(path, range(5))
+
+	columns = readSnapshot(path, chunk_size=3)
+
+	assert len(columns["strike"]) == 10
+	assert sorted(columns["strike"]) == sorted(list(range(5)) * 2)
+
+
+def testIngestSpansMoreThanOneChunk(tmp_path):
+	snapshot = tmp_path / "snapshot.csv"
+	writeSnapshot(snapshot, range(90, 101))
+
+	assert ingestChain(tmp_path / "store", snapshot, chunk_size=4) == 22
+
+	store = ChainStore(tmp_path / "store")
+	assert len(store) == 22
+	assert list(store.strikes("2026-12-18", 1)) == list(range(90, 101))
+	assert list(store.strikes("2026-12-18", 2)) == list(range(90, 101))
+
+
+def testIngestReplacesQuotesAndOldGenerations(tmp_path):
+	first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+	writeSnapshot(first, [90, 100])
+	writeSnapshot(second, [100, 110], ask=9)
+	store_path = tmp_path / "store"
+
+	ingestChain(store_path, first)
+	ingestChain(store_path, second)
+
+	store = ChainStore(store_path)
+	assert store.generation == 2
+	assert len(store) == 6
+	assert store.quote("2026-12-18", 1, 90)["ask"] == 1.2
+	assert store.quote("2026-12-18", 1, 100)["ask"] == 9
+	assert not any(name.endswith(".1.npy") for name in (path.name for path in store_path.iterdir()))
+
+	chain = store.chain("2026-12-18")
+	assert np.array_equal(chain["strike"], [90, 100, 110])
+
+
+def testIngestLeavesMappedGenerationsForTheNextIngest(tmp_path, monkeypatch):
+	snapshot = tmp_path / "snapshot.csv"
+	writeSnapshot(snapshot, [90, 100])
+	store_path = tmp_path / "store"
+	ingestChain(store_path, snapshot)
+
+	# as on Windows, where a memory-mapped file can't be removed
+	def unlink(path):
+		raise PermissionError(path)
+	with monkeypatch.context() as patch:
+		patch.setattr("os.unlink", unlink)
+		ingestChain(store_path, snapshot)
+	assert any(path.name.endswith(".1.npy") for path in store_path.iterdir())
+	assert ChainStore(store_path).generation == 2
+
+	ingestChain(store_path, snapshot)
+	assert sorted(path.name for path in store_path.iterdir() if path.suffix == ".npy") == \
+		sorted(f"{name}.3.npy" for name in ("expiry", "type", "strike", "bid", "ask", "iv"))
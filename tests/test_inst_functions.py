@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import inst_functions as inst_fncs
+
+
+# the per-element loops the kernels replaced, as the baseline had them
+def originalLongCall(x_list, price, strike):
+	return [-price if x <= strike else round(x - strike - price, 2) for x in x_list]
+
+
+def originalShortCall(x_list, price, strike):
+	return [price if x <= strike else round(price - x + strike, 2) for x in x_list]
+
+
+def originalLongPut(x_list, price, strike):
+	return [round(strike - x - price, 2) if x < strike else -price for x in x_list]
+
+
+def originalShortPut(x_list, price, strike):
+	return [round(price + x - strike, 2) if x < strike else price for x in x_list]
+
+
+def originalLong(x_list, price):
+	return [round(x - price, 2) for x in x_list]
+
+
+def originalShort(x_list, price):
+	return [round(price - x, 2) for x in x_list]
+
+
+X = list(np.round(np.arange(0, 100.01, 0.25), 2)) + [37.37, 42.42, 50.01]
+
+OPTIONS = [
+	(inst_fncs.longCall, inst_fncs.longCallArray, originalLongCall),
+	(inst_fncs.shortCall, inst_fncs.shortCallArray, originalShortCall),
+	(inst_fncs.longPut, inst_fncs.longPutArray, originalLongPut),
+	(inst_fncs.shortPut, inst_fncs.shortPutArray, originalShortPut),
+]
+
+LINEAR = [
+	(inst_fncs.longStock, inst_fncs.longStockArray, originalLong),
+	(inst_fncs.shortStock, inst_fncs.shortStockArray, originalShort),
+	(inst_fncs.longFutures, inst_fncs.longFuturesArray, originalLong),
+	(inst_fncs.shortFutures, inst_fncs.shortFuturesArray, originalShort),
+]
+
+
+@pytest.mark.parametrize("function, kernel, original", OPTIONS)
+@pytest.mark.parametrize("price, strike", [(2.5, 50), (0.35, 42.42), (7, 37.37)])
+def testOptionKernelsMatchTheOriginalLoops(function, kernel, original, price, strike):
+	expected = original(X, price, strike)
+
+	assert function(X, price, strike) == expected
+	assert np.array_equal(kernel(np.array(X), price, strike), expected)
+
+
+@pytest.mark.parametrize("function, kernel, original", LINEAR)
+@pytest.mark.parametrize("price", [45, 50.01, 0.35])
+def testLinearKernelsMatchTheOriginalLoops(function, kernel, original, price):
+	expected = original(X, price)
+
+	assert function(X, price) == expected
+	assert np.array_equal(kernel(np.array(X), price), expected)
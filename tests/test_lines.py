@@ -0,0 +1,15 @@
+import pytest
+
+from lines import Asset, Futures, Option
+
+
+@pytest.mark.parametrize("makeLine, field", [
+	(lambda: Option(3, 1, 2, 50, None), "option_type"),
+	(lambda: Option(1, 0, 2, 50, None), "position"),
+	(lambda: Option(2, 3, 2, 50, None), "position"),
+	(lambda: Asset(50, 0, None), "position"),
+	(lambda: Futures(50, 3, None), "position"),
+])
+def testUnknownCodesRaiseValueError(makeLine, field):
+	with pytest.raises(ValueError, match=f"unknown {field}"):
+		makeLine()
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from lines import Asset, Futures, Option
+from piecewise import analysePayoffs, sumPayoffs
+from strategy import linesToStrategy
+
+# a grid of whole cents, which holds every strike and price below
+X = np.round(np.arange(0, 200.005, 0.01), 2)
+
+
+def randomStrategies(count, seed=0):
+	""" Return $count random strategies of 1 to 6 legs, priced and struck in whole cents """
+	rng = np.random.default_rng(seed)
+	strategies = []
+	for _ in range(count):
+		lines = []
+		for _ in range(int(rng.integers(1, 7))):
+			kind, position = rng.integers(0, 4), int(rng.integers(1, 3))
+			price, strike = round(float(rng.uniform(0.5, 10)), 2), round(float(rng.uniform(20, 150)), 2)
+			quantity = int(rng.integers(1, 4))
+			if kind < 2:
+				lines.append(Option(int(kind) + 1, position, price, strike, None, quantity=quantity))
+			elif kind == 2:
+				lines.append(Asset(strike, position, None, quantity=quantity))
+			else:
+				lines.append(Futures(strike, position, None, multiplier=quantity))
+		strategies.append(lines)
+	return strategies
+
+
+@pytest.mark.parametrize("lines", randomStrategies(50))
+def testPiecewiseMatchesDenseEvaluation(lines):
+	payoff = sumPayoffs([line.payoff for line in lines])
+	dense = linesToStrategy(lines).payoff(X)
+
+	assert np.allclose(payoff(X), dense, atol=1e-9)
+
+	# each leg's own (dense, rounded) line matches too
+	for line in lines:
+		assert np.allclose(line.payoff(line.x), line.y, atol=1e-9)
+
+
+def testAnalysePayoffsMatchesDenseEvaluation():
+	strategies = randomStrategies(200, seed=1)
+	prices = [25, 50.5, 100]
+
+	analysis = analysePayoffs([[line.payoff for line in lines] for lines in strategies], prices)
+
+	for i, lines in enumerate(strategies):
+		dense = linesToStrategy(lines).payoff(X)
+		payoff = sumPayoffs([line.payoff for line in lines])
+
+		# the grid holds every breakpoint, so the extremes over it are exact unless a tail slopes away
+		if payoff.right_slope <= 0:
+			assert analysis["max_profit"][i] == pytest.approx(dense.max(), abs=1e-9)
+		else:
+			assert analysis["max_profit"][i] == np.inf
+		if payoff.right_slope >= 0:
+			assert analysis["max_loss"][i] == pytest.approx(dense.min(), abs=1e-9)
+		else:
+			assert analysis["max_loss"][i] == -np.inf
+
+		# every breakeven is a root, and the dense curve changes sign only around them
+		breakevens = analysis["breakevens"][i]
+		assert np.allclose(payoff(breakevens), 0, atol=1e-9)
+		changes = X[1:][np.sign(dense[1:]) * np.sign(dense[:-1]) < 0]
+		assert all(np.any(np.abs(breakevens - x) <= 0.01 + 1e-9) for x in changes)
+
+		assert np.allclose(analysis["profit_at"][i], payoff(np.array(prices)), atol=1e-9)
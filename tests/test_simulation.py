@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from lines import Option
+from simulation import simulate
+
+LINES = [Option(1, 1, 2, 50, None)]
+
+
+@pytest.mark.parametrize("options, message", [
+	({"returns": []}, "non-empty"),
+	({"returns": [[0.1, 0.2]]}, "non-empty"),
+	({"returns": [0.1, np.nan]}, "finite"),
+	({"returns": [-1.5, 0.1]}, "no lower than -1"),
+	({"spot": 0}, "spot"),
+	({"volatility": -0.2}, "volatility"),
+	({"time_to_expiry": np.inf}, "time_to_expiry"),
+	({"rate": np.nan}, "rate"),
+	({"paths": 0}, "path"),
+	({"bins": 0}, "bin"),
+])
+def testInvalidInputsRaiseValueError(options, message):
+	options = {"spot": 50, **options}
+	with pytest.raises(ValueError, match=message):
+		simulate(LINES, paths=options.pop("paths", 1000), **options)
+
+
+def testResampledReturnsBoundTheProfits():
+	results = simulate(LINES, 50, paths=10000, returns=[-0.1, 0, 0.1], seed=1)
+
+	# a long 50 call bought for 2 makes -2 at 45 and 50, and 3 at 55
+	assert results["probability_of_profit"] == pytest.approx(1 / 3, abs=0.02)
+	assert results["expected_profit"] == pytest.approx(-1 / 3, abs=0.1)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from engine import configsToLines
+from storage import loadBatchResults, loadStrategy, saveStrategy
+from strategy import StrategyModel
+
+LINES = [
+	{"inst": "option", "inst_config": {"option_type": "call", "position": "long", "price": 2.5, "strike": 50,
+		"quantity": 3}},
+	{"inst": None, "inst_config": None},
+	{"inst": "stock", "inst_config": {"position": "short", "price": 48}},
+	{"inst": "futures", "inst_config": {"position": "long", "delivery_price": 51.25, "multiplier": 100}},
+]
+
+
+def testStrategyRoundTrip(tmp_path):
+	path = tmp_path / "strategy.npz"
+	saveStrategy(path, LINES)
+
+	lines_config, curves = loadStrategy(path)
+
+	assert lines_config == LINES
+	assert curves is None
+
+
+def testCurvesRoundTrip(tmp_path):
+	model = StrategyModel()
+	legs = configsToLines(LINES)
+	model.update(legs, np.linspace(0, 100, 201))
+	path = tmp_path / "strategy.npz"
+	saveStrategy(path, LINES, model)
+
+	lines_config, curves = loadStrategy(path)
+
+	assert [int(key) for key in curves["leg_keys"]] == list(legs)
+	assert np.array_equal(curves["x"], model.x)
+	assert np.array_equal(curves["y"], model.y)
+	assert np.array_equal(curves["leg_y"], [model.leg_y[key] for key in legs])
+
+
+def testHalfTypedEntriesKeepTheirText(tmp_path):
+	lines = [{"inst": "option", "inst_config": {"option_type": "put", "position": "short", "price": "2..5",
+		"strike": 45, "volatility": "-"}}]
+	path = tmp_path / "strategy.npz"
+	saveStrategy(path, lines)
+
+	lines_config, _ = loadStrategy(path)
+
+	assert lines_config == lines
+
+
+def testKindsAreNotMixedUp(tmp_path):
+	path = tmp_path / "strategy.npz"
+	saveStrategy(path, LINES)
+
+	with pytest.raises(ValueError, match="not a batch"):
+		loadBatchResults(path)
@@ -0,0 +1,23 @@
+import numpy as np
+
+from lines import Option, createStrategyXInputs
+from strategy import StrategyModel, linesToStrategy
+
+
+def testStrikeDragRecomputesOnlyTheMovedLeg():
+	legs = {i: Option(1 + i % 2, 1 + (i % 3 == 0), 2, 40 + i, None) for i in range(6)}
+	model = StrategyModel()
+	model.update(legs, createStrategyXInputs(list(legs.values()), *model.gridRange(30, 60)))
+	first_grid = model.x
+
+	for strike in (42.5, 47, 51.5):
+		legs[3] = Option(2, 2, 2, strike, None)
+		model.update(legs, createStrategyXInputs(list(legs.values()), *model.gridRange(30, 60)))
+
+		assert model.leg_x[3] is model.x
+		assert model.leg_x[0] is first_grid
+		assert np.allclose(model.y, linesToStrategy(list(legs.values())).payoff(model.x))
+
+	for key, line in legs.items():
+		assert np.allclose(model.legY(key), linesToStrategy([line]).payoff(model.x))
+		assert model.leg_x[key] is model.x